@@ -0,0 +1,48 @@
+"""Массовая загрузка прайс-листа: core.importer.MedicineImport на CSV из --lines строк
+(часть названий уже есть в БД, часть строк с ошибками).
+
+    python benchmarks/bulk_import.py --lines 200000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from common import make_engine, seed
+
+from sqlalchemy.orm import sessionmaker
+
+from core.importer import MedicineImport
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="URL БД (по умолчанию временная SQLite)")
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--existing', type=int, default=10000, help="медикаментов в БД до загрузки")
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    options = parser.parse_args()
+
+    engine = make_engine(options.url)
+    # seed() называет медикаменты "Medicine {i}" – первые --existing строк файла окажутся повторами
+    seed(engine, suppliers=10, medicines=options.existing)
+    rnd = random.Random(1)
+    path = os.path.join(tempfile.mkdtemp(prefix="apteka-bench-"), "price.csv")
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write("MName;Price;Count;Description;Category;BT;Supplier\n")
+        for i in range(options.lines):
+            price = rnd.randint(10, 5000) if i % 100 else "n/a"  # 1% строк с ошибкой
+            f.write(f"Medicine {i};{price};{rnd.randrange(500)};Description {i};Category {i % 20};"
+                    f"2031-{1 + i % 12:02d}-01;Supplier {i % 10}\n")
+
+    with sessionmaker(bind=engine)() as db:
+        started = time.perf_counter()
+        result = MedicineImport(db, chunk_size=options.chunk_size).run(path)
+        elapsed = time.perf_counter() - started
+    print(f"{options.lines} строк, порция {options.chunk_size}: загружено {result.inserted}, "
+          f"пропущено {result.skipped} за {elapsed:.1f} с ({options.lines / elapsed:.0f} строк/с)")
+
+
+if __name__ == '__main__':
+    main()
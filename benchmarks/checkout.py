@@ -0,0 +1,54 @@
+"""Продажи на кассе: корзина из нескольких позиций через OrderController.checkout
+против оформления каждой позиции отдельным create_order (как раньше, по диалогу на позицию).
+
+    python benchmarks/checkout.py --latency 1 --lines 8 --checkouts 200
+"""
+import argparse
+import datetime
+import random
+import time
+
+from common import make_engine, seed
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from controllers.OrderController import OrderController
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="URL БД (по умолчанию временная SQLite)")
+    parser.add_argument('--latency', type=float, default=1.0, help="задержка на запрос, мс")
+    parser.add_argument('--lines', type=int, default=8, help="позиций в корзине")
+    parser.add_argument('--checkouts', type=int, default=200)
+    options = parser.parse_args()
+
+    engine = make_engine(options.url, options.latency)
+    seed(engine, medicines=500, count=10 ** 6)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+    rnd = random.Random(1)
+    baskets = [[{'Medicine': m, 'Amount': rnd.randint(1, 3)} for m in rnd.sample(range(1, 501), options.lines)]
+               for _ in range(options.checkouts)]
+
+    print(f"{options.checkouts} продаж по {options.lines} позиций, задержка {options.latency:g} мс на запрос")
+    print(f"{'режим':<12} {'запросов/продажу':>16} {'продаж/с':>10}")
+    for name in ("create_order", "checkout"):
+        with sessionmaker(bind=engine)() as db:
+            ctrl = OrderController(db)
+            statements.clear()
+            started = time.perf_counter()
+            for basket in baskets:
+                if name == "checkout":
+                    ctrl.checkout(basket, employee_id=1)
+                else:
+                    for line in basket:
+                        ctrl.create_order({'DateReg': datetime.date.today(), 'Status': True,
+                                           'Employee': 1, **line})
+            elapsed = time.perf_counter() - started
+        print(f"{name:<12} {len(statements) / options.checkouts:>16.1f} {options.checkouts / elapsed:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
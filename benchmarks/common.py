@@ -0,0 +1,98 @@
+"""Общие заготовки для бенчмарков: временная БД SQLite, имитация задержки сети и тестовые данные.
+
+Бенчмарки запускаются из корня проекта, например: python benchmarks/gui_stall.py
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, insert, literal, select
+from sqlalchemy.orm import sessionmaker
+
+from models.base import Base
+from models.daily_sales import DailySales
+from models.employee import Employee
+from models.medicine import Medicine
+from models.order import Order
+from models.shipment import Shipment
+from models.shipment_item import ShipmentItem
+from models.stock_movement import StockMovement
+from models.supplier import Supplier
+
+
+def make_engine(url=None, latency_ms=0.0, create=True, immediate=False):
+    """Движок для бенчмарка: url (например, MySQL) или временный файл SQLite.
+    latency_ms добавляет задержку перед каждым запросом – так локальная SQLite
+    ведет себя как сервер MySQL по сети. create=False подключается к уже созданной БД
+    (например, из дочернего процесса). immediate=True – транзакции SQLite начинаются
+    с BEGIN IMMEDIATE (нужно для конкурентной записи, см. ниже)."""
+    if url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="apteka-bench-"), "bench.db")
+        url = f"sqlite:///{path}"
+    engine = create_engine(url, connect_args={'check_same_thread': False} if url.startswith("sqlite") else {})
+    engine.lock_waits = []
+    if url.startswith("sqlite"):
+        @event.listens_for(engine, "connect")
+        def _sqlite_pragmas(dbapi_connection, record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA busy_timeout=30000")
+            cursor.close()
+            if immediate:
+                # Транзакции начинаем сами (см. _sqlite_begin)
+                dbapi_connection.isolation_level = None
+    if url.startswith("sqlite") and immediate:
+        @event.listens_for(engine, "begin")
+        def _sqlite_begin(conn):
+            # SQLite игнорирует FOR UPDATE: BEGIN IMMEDIATE сразу берет блокировку записи,
+            # поэтому транзакции-писатели ждут друг друга, а не падают с "database is locked".
+            # Время ожидания блокировки учитывается в engine.lock_waits (секунды).
+            started = time.perf_counter()
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            waited = time.perf_counter() - started
+            if waited > 0.001:
+                engine.lock_waits.append(waited)
+    if latency_ms:
+        @event.listens_for(engine, "before_cursor_execute")
+        def _network_latency(conn, cursor, statement, parameters, context, executemany):
+            time.sleep(latency_ms / 1000)
+    if create:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+    return engine
+
+
+def seed(engine, suppliers=10, medicines=1000, employees=5, count=1000):
+    """Заполняет БД тестовыми поставщиками, сотрудниками и медикаментами."""
+    with sessionmaker(bind=engine)() as session:
+        session.add_all(Supplier(CompName=f"Supplier {i}", Address=f"Street {i}",
+                                 Number=f"7900000{i:04d}", INN=f"77{i:08d}")
+                        for i in range(suppliers))
+        session.add_all(Employee(FName=f"Name{i}", LName=f"Last{i}", Number=f"7911000{i:04d}",
+                                 Position="Фармацевт", Login=f"user{i}", Pass="-",
+                                 DTB=datetime.date(1990, 1, 1), Admin=i == 0)
+                        for i in range(employees))
+        session.flush()
+        session.add_all(Medicine(MName=f"Medicine {i}", Price=10 + i % 500, Count=count,
+                                 Description=f"Description {i}", Category=f"Category {i % 20}",
+                                 BT=datetime.date(2030, 1, 1), Supplier=1 + i % suppliers)
+                        for i in range(medicines))
+        # Начальные остатки в журнале движения (как при создании через MedicineController)
+        session.execute(insert(StockMovement).from_select(
+            ['Medicine', 'Delta', 'Reason'],
+            select(Medicine.id, Medicine.Count, literal('opening')).where(Medicine.Count != 0),
+        ))
+        session.commit()
+
+
+def percentile(values, p):
+    """p-й перцентиль (0..100) списка значений."""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, max(0, round(p / 100 * (len(values) - 1))))
+    return values[k]
@@ -0,0 +1,62 @@
+"""Медикаменты с истекающим сроком годности: MedicineController.get_expiring на большой таблице
+(диапазон по индексу ix_medicines_bt) – строки и итоги по поставщикам и категориям.
+
+    python benchmarks/expiry.py --medicines 1000000 --days 30
+"""
+import argparse
+import datetime
+import random
+import time
+
+from common import make_engine, percentile, seed
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+
+from controllers.MedicineController import MedicineController
+from models.medicine import Medicine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="URL БД (по умолчанию временная SQLite)")
+    parser.add_argument('--medicines', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=30, help="окно срока годности, дней")
+    parser.add_argument('--limit', type=int, default=200, help="строк медикаментов (первая страница)")
+    parser.add_argument('--repeat', type=int, default=20)
+    options = parser.parse_args()
+
+    engine = make_engine(options.url)
+    seed(engine, suppliers=50, medicines=0)
+    # Сроки годности равномерно на 5 лет вперед
+    today = datetime.date.today()
+    rnd = random.Random(1)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for start in range(0, options.medicines, 10000):
+            conn.execute(insert(Medicine), [
+                {'MName': f"M{i}", 'Price': 10 + i % 500, 'Count': i % 50, 'Category': f"Category {i % 20}",
+                 'BT': today + datetime.timedelta(days=rnd.randrange(5 * 365)), 'Supplier': 1 + i % 50}
+                for i in range(start, min(start + 10000, options.medicines))
+            ])
+    print(f"{options.medicines} медикаментов загружено за {time.perf_counter() - started:.0f} с")
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as conn:
+            conn.execute(text("ANALYZE"))
+
+    with sessionmaker(bind=engine)() as db:
+        ctrl = MedicineController(db)
+        print(f"окно {options.days} дней, {options.repeat} повторов")
+        print(f"{'запрос':<12} {'строк':>8} {'p50, мс':>9} {'p99, мс':>9}")
+        for group_by in (None, 'Supplier', 'Category'):
+            timings = []
+            for _ in range(options.repeat):
+                started = time.perf_counter()
+                rows = ctrl.get_expiring(options.days, group_by=group_by, limit=options.limit)
+                timings.append(time.perf_counter() - started)
+            print(f"{group_by or 'медикаменты':<12} {len(rows):>8} "
+                  f"{percentile(timings, 50) * 1000:>9.1f} {percentile(timings, 99) * 1000:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
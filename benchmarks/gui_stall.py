@@ -0,0 +1,120 @@
+"""Максимальное "замирание" GUI при обращениях диалогов к контроллерам.
+
+Таймер в главном потоке тикает каждые TICK_MS миллисекунд; максимальный интервал между
+тиками и есть самое долгое время, когда окно не перерисовывалось и не реагировало на ввод.
+Сравниваются синхронные вызовы контроллера в потоке GUI (как было в диалогах main.py)
+и те же вызовы через AsyncController.
+
+    python benchmarks/gui_stall.py --latency 20 --calls 50
+"""
+import argparse
+import time
+
+from common import make_engine, seed
+
+from PyQt5.QtCore import QCoreApplication, QTimer
+from sqlalchemy.orm import sessionmaker, scoped_session
+
+from controllers.MedicineController import MedicineController
+from core.session import UnitOfWorkController
+from core.workers import AsyncController
+
+TICK_MS = 5
+
+
+class StallMeter:
+    """Измеряет максимальный интервал между тиками таймера главного потока."""
+
+    def __init__(self):
+        self.timer = QTimer()
+        self.timer.setInterval(TICK_MS)
+        self.timer.timeout.connect(self._tick)
+        self.max_gap = 0.0
+        self._last = None
+
+    def _tick(self):
+        now = time.perf_counter()
+        if self._last is not None:
+            self.max_gap = max(self.max_gap, now - self._last)
+        self._last = now
+
+    def start(self):
+        self._last = time.perf_counter()
+        self.timer.start()
+
+    def stop(self):
+        self._tick()
+        self.timer.stop()
+
+
+def workload(i):
+    """Вызовы, которые делает диалог заказа: список лекарств и выбранное лекарство."""
+    return ('get_all', ()) if i % 10 == 0 else ('get_medicine_by_id', (1 + i % 100,))
+
+
+def run_sync(app, registry, calls):
+    ctrl = UnitOfWorkController(MedicineController(registry))
+    meter = StallMeter()
+    state = {'i': 0}
+
+    def step():
+        if state['i'] == calls:
+            app.quit()
+            return
+        method, args = workload(state['i'])
+        getattr(ctrl, method)(*args)
+        state['i'] += 1
+        QTimer.singleShot(0, step)
+
+    meter.start()
+    started = time.perf_counter()
+    QTimer.singleShot(0, step)
+    app.exec_()
+    meter.stop()
+    return time.perf_counter() - started, meter.max_gap
+
+
+def run_async(app, registry, calls):
+    ctrl = AsyncController(UnitOfWorkController(MedicineController(registry)))
+    meter = StallMeter()
+    state = {'i': 0}
+
+    def step(_=None):
+        if state['i'] == calls:
+            app.quit()
+            return
+        method, args = workload(state['i'])
+        state['i'] += 1
+        # Следующий вызов – после ответа на предыдущий, как в диалогах
+        ctrl.call(method, *args, on_result=step, on_error=lambda e: (print(e), app.quit()))
+
+    meter.start()
+    started = time.perf_counter()
+    QTimer.singleShot(0, step)
+    app.exec_()
+    meter.stop()
+    return time.perf_counter() - started, meter.max_gap
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="URL БД (по умолчанию временная SQLite)")
+    parser.add_argument('--latency', type=float, default=20.0, help="задержка на запрос, мс")
+    parser.add_argument('--calls', type=int, default=50)
+    parser.add_argument('--medicines', type=int, default=1000)
+    options = parser.parse_args()
+
+    app = QCoreApplication([])
+    engine = make_engine(options.url, options.latency)
+    seed(engine, medicines=options.medicines)
+    registry = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+
+    print(f"{options.calls} вызовов, задержка {options.latency:g} мс на запрос")
+    print(f"{'режим':<8} {'всего, с':>10} {'макс. замирание GUI, мс':>25}")
+    for name, run in (('sync', run_sync), ('async', run_async)):
+        total, stall = run(app, registry, options.calls)
+        print(f"{name:<8} {total:>10.2f} {stall * 1000:>25.1f}")
+
+
+if __name__ == '__main__':
+    main()
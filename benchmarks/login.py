@@ -0,0 +1,87 @@
+"""Задержка входа при одновременной работе нескольких касс (терминалов).
+
+Каждый терминал – поток со своей сессией (scoped_session), который входит под своим
+сотрудником. Сравниваются: первый вход (миграция пароля из Fernet в хеш), повторные входы
+без кеша проверенных паролей (каждый раз считается scrypt) и с кешем.
+
+    python benchmarks/login.py --terminals 8 --logins 20
+"""
+import argparse
+import datetime
+import threading
+import time
+
+from common import make_engine, percentile
+
+from sqlalchemy.orm import sessionmaker, scoped_session
+
+from controllers.EmployeeController import EmployeeController
+from core.security import Security
+from core.session import UnitOfWorkController
+from models.employee import Employee
+
+
+def run_phase(ctrl, terminals, logins):
+    """Все терминалы одновременно выполняют logins входов; возвращает задержки (с) и общее время."""
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(terminals)
+
+    def terminal(i):
+        own = []
+        barrier.wait()
+        for _ in range(logins):
+            started = time.perf_counter()
+            user = ctrl.authenticate(f"user{i}", f"password{i}")
+            own.append(time.perf_counter() - started)
+            assert user is not None
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=terminal, args=(i,)) for i in range(terminals)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="URL БД (по умолчанию временная SQLite)")
+    parser.add_argument('--latency', type=float, default=1.0, help="задержка на запрос, мс")
+    parser.add_argument('--terminals', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=20)
+    options = parser.parse_args()
+
+    engine = make_engine(options.url, options.latency)
+    registry = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+    with sessionmaker(bind=engine)() as db:
+        # Пароли в старом формате (Fernet), как в существующей БД
+        db.add_all(Employee(FName="Name", LName=f"Last{i}", Number="79110000000", Position="Кассир",
+                            Login=f"user{i}", Pass=Security.encrypt_password(f"password{i}"),
+                            DTB=datetime.date(1990, 1, 1), Admin=False)
+                   for i in range(options.terminals))
+        db.commit()
+    ctrl = UnitOfWorkController(EmployeeController(registry))
+    ttl = Security.credentials.ttl
+
+    print(f"{options.terminals} терминалов, scrypt n={Security.hasher.n} r={Security.hasher.r} p={Security.hasher.p}")
+    print(f"{'режим':<22} {'входов':>7} {'p50, мс':>9} {'p99, мс':>9} {'входов/с':>10}")
+    phases = (
+        ("миграция из Fernet", 1, 0),
+        ("хеш без кеша", options.logins, 0),
+        ("хеш + кеш", options.logins, ttl or 300),
+    )
+    for name, logins, cache_ttl in phases:
+        Security.credentials.ttl = cache_ttl
+        Security.credentials.forget()
+        latencies, total = run_phase(ctrl, options.terminals, logins)
+        print(f"{name:<22} {len(latencies):>7} {percentile(latencies, 50) * 1000:>9.1f} "
+              f"{percentile(latencies, 99) * 1000:>9.1f} {len(latencies) / total:>10.0f}")
+    Security.credentials.ttl = ttl
+
+
+if __name__ == '__main__':
+    main()
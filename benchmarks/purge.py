@@ -0,0 +1,54 @@
+"""Пакетное удаление: MedicineController.delete_many для всех просроченных медикаментов
+против поштучного delete_medicine.
+
+    python benchmarks/purge.py --medicines 100000 --expired 10000
+"""
+import argparse
+import datetime
+import time
+
+from common import make_engine, seed
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import sessionmaker
+
+from controllers.MedicineController import MedicineController
+from models.medicine import Medicine
+from models.order import Order
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="URL БД (по умолчанию временная SQLite)")
+    parser.add_argument('--medicines', type=int, default=100000)
+    parser.add_argument('--expired', type=int, default=10000, help="просроченных медикаментов")
+    parser.add_argument('--single', type=int, default=200, help="сколько удалить поштучно для сравнения")
+    options = parser.parse_args()
+
+    engine = make_engine(options.url)
+    seed(engine, suppliers=10, medicines=options.medicines)
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    with engine.begin() as conn:
+        conn.execute(update(Medicine).where(Medicine.id <= options.expired + options.single).values(BT=yesterday))
+        conn.execute(insert(Order), [
+            {'DateReg': yesterday, 'Amount': 1, 'Status': True, 'Employee': 1, 'Medicine': 1 + i % options.medicines}
+            for i in range(options.medicines)
+        ])
+
+    with sessionmaker(bind=engine)() as db:
+        ctrl = MedicineController(db)
+        expired = [medicine_id for medicine_id, in db.query(Medicine.id).filter(Medicine.BT < datetime.date.today())]
+        single, bulk = expired[:options.single], expired[options.single:]
+        started = time.perf_counter()
+        for medicine_id in single:
+            ctrl.delete_medicine(medicine_id)
+        elapsed = time.perf_counter() - started
+        print(f"delete_medicine: {len(single)} по одному за {elapsed:.2f} с "
+              f"(~{elapsed / max(len(single), 1) * len(bulk):.0f} с на {len(bulk)})")
+        started = time.perf_counter()
+        deleted = ctrl.delete_many(bulk)
+        print(f"delete_many: {deleted} медикаментов с заказами и движениями за {time.perf_counter() - started:.2f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Автозаказ: ReorderEngine по всему каталогу – расчет плана (NumPy) и создание черновиков поставок.
+
+    python benchmarks/reorder.py --medicines 100000 --orders 300000
+"""
+import argparse
+import datetime
+import random
+import time
+
+from common import make_engine, seed
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import sessionmaker
+
+from controllers.ShipmentController import ShipmentController
+from core.reorder import ReorderEngine
+from models.medicine import Medicine
+from models.order import Order
+from models.supplier import Supplier
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="URL БД (по умолчанию временная SQLite)")
+    parser.add_argument('--medicines', type=int, default=100000)
+    parser.add_argument('--suppliers', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=300000, help="продаж за последние 30 дней")
+    options = parser.parse_args()
+
+    engine = make_engine(options.url)
+    seed(engine, suppliers=options.suppliers, medicines=0)
+    rnd = random.Random(1)
+    today = datetime.date.today()
+    with engine.begin() as conn:
+        conn.execute(update(Supplier).values(LeadTime=Supplier.id % 30 + 1))
+        for start in range(0, options.medicines, 10000):
+            conn.execute(insert(Medicine), [
+                {'MName': f"M{i}", 'Price': 10 + i % 500, 'Count': rnd.randrange(100),
+                 'Supplier': 1 + i % options.suppliers}
+                for i in range(start, min(start + 10000, options.medicines))
+            ])
+        for start in range(0, options.orders, 10000):
+            conn.execute(insert(Order), [
+                {'DateReg': today - datetime.timedelta(days=rnd.randrange(1, 31)), 'Amount': rnd.randint(1, 5),
+                 'Status': True, 'Employee': 1, 'Medicine': rnd.randrange(1, options.medicines + 1)}
+                for _ in range(start, min(start + 10000, options.orders))
+            ])
+
+    with sessionmaker(bind=engine)() as db:
+        reorder = ReorderEngine(db, ShipmentController(db))
+        started = time.perf_counter()
+        plan = reorder.plan()
+        planned = time.perf_counter() - started
+        started = time.perf_counter()
+        shipment_ids = reorder.run(employee_id=1)
+        created = time.perf_counter() - started
+    lines = sum(len(items) for items in plan.values())
+    print(f"{options.medicines} медикаментов, {options.orders} продаж, {options.suppliers} поставщиков")
+    print(f"план: {lines} позиций у {len(plan)} поставщиков за {planned:.2f} с")
+    print(f"черновики: {len(shipment_ids)} поставок (расчет и создание) за {created:.2f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Пакетное обновление цен: MedicineController.update_prices (временная таблица и UPDATE ... FROM)
+по прайс-листу из --prices пар против поштучного update_medicine.
+
+    python benchmarks/reprice.py --medicines 200000 --prices 50000
+"""
+import argparse
+import random
+import time
+
+from common import make_engine, seed
+
+from sqlalchemy.orm import sessionmaker
+
+from controllers.MedicineController import MedicineController
+from models.medicine import Medicine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="URL БД (по умолчанию временная SQLite)")
+    parser.add_argument('--medicines', type=int, default=200000)
+    parser.add_argument('--prices', type=int, default=50000, help="пар (название, цена) в прайс-листе")
+    parser.add_argument('--single', type=int, default=500, help="сколько цен менять поштучно для сравнения")
+    options = parser.parse_args()
+
+    engine = make_engine(options.url)
+    seed(engine, suppliers=10, medicines=options.medicines)
+    rnd = random.Random(1)
+    # seed() называет медикаменты "Medicine {i}"; часть названий прайс-листа неизвестна
+    prices = {f"Medicine {rnd.randrange(int(options.medicines * 1.05))}": rnd.randint(10, 5000)
+              for _ in range(options.prices)}
+
+    with sessionmaker(bind=engine)() as db:
+        ctrl = MedicineController(db)
+        started = time.perf_counter()
+        result = ctrl.update_prices(prices, key='MName')
+        elapsed = time.perf_counter() - started
+        print(f"update_prices: {result.received} пар, найдено {result.matched}, изменено {result.changed} "
+              f"за {elapsed:.2f} с")
+
+        ids = [rnd.randrange(1, options.medicines + 1) for _ in range(options.single)]
+        started = time.perf_counter()
+        for medicine_id in ids:
+            medicine = db.get(Medicine, medicine_id)
+            ctrl.update_medicine(medicine_id, {'Price': medicine.Price + 1, 'Count': medicine.Count})
+        elapsed = time.perf_counter() - started
+        print(f"update_medicine: {options.single} цен по одной за {elapsed:.2f} с "
+              f"(~{elapsed / options.single * result.received:.0f} с на {result.received})")
+
+
+if __name__ == '__main__':
+    main()
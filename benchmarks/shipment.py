@@ -0,0 +1,72 @@
+"""Создание поставки на 10/100/1000 позиций: пакетный ShipmentController.create_shipment
+против прежнего алгоритма с запросами к Medicine на каждую позицию.
+
+    python benchmarks/shipment.py --latency 1 --sizes 10 100 1000
+"""
+import argparse
+import datetime
+import time
+
+from common import make_engine, seed
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from controllers.ShipmentController import ShipmentController
+from models.medicine import Medicine
+from models.shipment import Shipment
+from models.shipment_item import ShipmentItem
+
+
+def per_item_create_shipment(db, shipment_data, items):
+    """Прежняя реализация: по запросу на позицию для цены и еще по одному для остатка."""
+    total_price = 0
+    for item in items:
+        medication = db.query(Medicine).filter(Medicine.id == item["id"]).first()
+        total_price += medication.Price * item["Count"]
+    shipment = Shipment(**shipment_data, Price=total_price)
+    db.add(shipment)
+    db.flush()
+    for item in items:
+        db.add(ShipmentItem(Shipment=shipment.id, Medicine=item["id"], Quantity=item["Count"]))
+        db.flush()
+    for item in items:
+        medication = db.query(Medicine).filter(Medicine.id == item["id"]).first()
+        medication.Count += item["Count"]
+        db.flush()
+    db.commit()
+    return shipment
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="URL БД (по умолчанию временная SQLite)")
+    parser.add_argument('--latency', type=float, default=1.0, help="задержка на запрос, мс")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    options = parser.parse_args()
+
+    engine = make_engine(options.url, options.latency)
+    seed(engine, medicines=max(options.sizes))
+    maker = sessionmaker(bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+    shipment_data = {"Supplier": 1, "Employee": 1, "DateReg": datetime.date.today(), "Status": True}
+    print(f"задержка {options.latency:g} мс на запрос")
+    print(f"{'позиций':>8} {'режим':<10} {'запросов':>9} {'время, мс':>10}")
+    for size in options.sizes:
+        items = [{"id": i, "Count": 5} for i in range(1, size + 1)]
+        for name in ("per-item", "batched"):
+            with maker() as db:
+                statements.clear()
+                started = time.perf_counter()
+                if name == "batched":
+                    ShipmentController(db).create_shipment(dict(shipment_data), items)
+                else:
+                    per_item_create_shipment(db, dict(shipment_data), items)
+                elapsed = time.perf_counter() - started
+            print(f"{size:>8} {name:<10} {len(statements):>9} {elapsed * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
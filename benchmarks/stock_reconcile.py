@@ -0,0 +1,60 @@
+"""Сверка остатков с журналом движения: StockController.reconcile() на большом каталоге
+(диапазоны id медикаментов, суммы движений по индексу ix_stock_movements_medicine).
+
+    python benchmarks/stock_reconcile.py --medicines 1000000 --movements 3
+"""
+import argparse
+import random
+import time
+
+from common import make_engine, seed
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+
+from controllers.StockController import StockController
+from models.medicine import Medicine
+from models.stock_movement import StockMovement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="URL БД (по умолчанию временная SQLite)")
+    parser.add_argument('--medicines', type=int, default=1000000)
+    parser.add_argument('--movements', type=int, default=3, help="движений на медикамент, кроме начального")
+    parser.add_argument('--batch-size', type=int, action='append', help="можно указать несколько раз")
+    options = parser.parse_args()
+
+    engine = make_engine(options.url)
+    seed(engine, suppliers=10, medicines=0)
+    rnd = random.Random(1)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for start in range(0, options.medicines, 10000):
+            ids = range(start + 1, min(start + 10000, options.medicines) + 1)
+            deltas = {i: [100] + [rnd.randint(-5, 5) for _ in range(options.movements)] for i in ids}
+            conn.execute(insert(Medicine), [
+                {'id': i, 'MName': f"M{i}", 'Price': 10, 'Count': sum(deltas[i]), 'Supplier': 1} for i in ids
+            ])
+            conn.execute(insert(StockMovement), [
+                {'Medicine': i, 'Delta': delta, 'Reason': StockController.ADJUSTMENT}
+                for i in ids for delta in deltas[i]
+            ])
+        # Несколько медикаментов с остатком, измененным в обход журнала
+        conn.execute(text("UPDATE medicines SET Count = Count + 1 WHERE id % 100000 = 7"))
+    print(f"{options.medicines} медикаментов, {options.medicines * (options.movements + 1)} движений "
+          f"загружено за {time.perf_counter() - started:.0f} с")
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as conn:
+            conn.execute(text("ANALYZE"))
+
+    with sessionmaker(bind=engine)() as db:
+        for batch_size in options.batch_size or [1000, 10000, 100000]:
+            started = time.perf_counter()
+            mismatches = StockController(db).reconcile(batch_size=batch_size)
+            print(f"порция {batch_size:>6}: расхождений {len(mismatches)}, "
+                  f"{time.perf_counter() - started:.2f} с")
+
+
+if __name__ == '__main__':
+    main()
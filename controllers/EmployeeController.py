@@ -1,10 +1,16 @@
 from typing import Optional, Type, Any
 import sqlalchemy
-from sqlalchemy import Row
+from sqlalchemy import Row, or_
 from sqlalchemy.orm import Session
 
-from core.security import Security
+from core.security import Security, PasswordHasher
+from models.daily_sales import DailySales
 from models.employee import Employee
+from models.order import Order
+from models.shipment import Shipment
+from models.shipment_item import ShipmentItem
+from core.events import changes
+from core.pagination import keyset_page
 
 
 class EmployeeController:
@@ -32,6 +38,7 @@ class EmployeeController:
         self.db.add(employee)
         self.db.commit()
         self.db.refresh(employee)  # Обновляем объект, чтобы получить сгенерированный ID и др.
+        changes.emit(Employee.__tablename__, changes.INSERTED, [employee.id])
         return employee
 
     def get_employee_by_id(self, employee_id: int) -> Type[Employee]:
@@ -53,25 +60,57 @@ class EmployeeController:
             or update_data['Login'] == '' \
             or update_data['DTB'] == '' or update_data['Admin'] == '':
             raise ValueError("Fill in all fields")
-        # Если в обновлении присутствует новый пароль, захешировать его
+        # Если в обновлении присутствует новый пароль, захешировать его;
+        # пустой пароль означает "не менять" (старый пароль из хеша не восстановить)
         if "Pass" in update_data:
-            update_data["Pass"] = Security.get_password_hash(update_data["Pass"])
+            if update_data["Pass"]:
+                update_data["Pass"] = Security.get_password_hash(update_data["Pass"])
+            else:
+                del update_data["Pass"]
         # Обновляем указанные поля
         for field, value in update_data.items():
             setattr(employee, field, value)
         self.db.commit()
         self.db.refresh(employee)
+        changes.emit(Employee.__tablename__, changes.UPDATED, [employee_id])
+        # Имя сотрудника отображается во вкладках заказов и поставок
+        changes.emit(Order.__tablename__, changes.RESET)
+        changes.emit(Shipment.__tablename__, changes.RESET)
         return employee
 
     def delete_employee(self, employee_id: int) -> Type[Employee] | None:
-        """Удаляет сотрудника по ID. Возвращает удалённый объект или None, если не найден."""
+        """Удаляет сотрудника по ID вместе со связанными записями, в том числе строками сводки
+        продаж (см. delete_many). Возвращает удалённый объект (отсоединенный от сессии)."""
         employee = self.db.get(Employee, employee_id)
         if not employee:
             raise ValueError("Employee not found")
-        self.db.delete(employee)
-        self.db.commit()
+        self.db.expunge(employee)
+        self.delete_many([employee_id])
         return employee
 
+    def delete_many(self, employee_ids: list[int]) -> int:
+        """Удаляет сотрудников пакетом вместе с их заказами, поставками (и позициями поставок)
+        и строками сводки продаж – как каскадные внешние ключи БД, остатки не меняются.
+        Одна транзакция, по одному запросу на таблицу. Возвращает число удаленных сотрудников."""
+        employee_ids = list({int(row_id) for row_id in employee_ids})  # из таблиц GUI id могут прийти строками
+        if not employee_ids:
+            return 0
+        shipments = self.db.query(Shipment.id).filter(Shipment.Employee.in_(employee_ids))
+        try:
+            self.db.query(ShipmentItem).filter(ShipmentItem.Shipment.in_(shipments.scalar_subquery())).delete(
+                synchronize_session=False)
+            for model in (Shipment, Order, DailySales):
+                self.db.query(model).filter(model.Employee.in_(employee_ids)).delete(synchronize_session=False)
+            deleted = self.db.query(Employee).filter(Employee.id.in_(employee_ids)).delete(synchronize_session=False)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        changes.emit(Employee.__tablename__, changes.DELETED, employee_ids)
+        changes.emit(Order.__tablename__, changes.RESET)
+        changes.emit(Shipment.__tablename__, changes.RESET)
+        return deleted
+
     def get_all(self) -> list[Row[tuple[Any, Any, Any, Any, Any, Any, Any, Any]]]:
         """Возвращает список всех сотрудников (ограниченный набор полей для эффективности)."""
         # Используем load_only, чтобы загрузить только нужные поля (например, id, name, login)
@@ -92,16 +131,89 @@ class EmployeeController:
         return employees
         # Примечание: load_only загрузит только указанные столбцы и первичный ключ
 
+    def _display_query(self):
+        return self.db.query(
+            Employee.id,
+            Employee.FName,
+            Employee.LName,
+            Employee.Position,
+            Employee.Number,
+            Employee.Login,
+            Employee.DTB,
+            Employee.Admin,
+        )
+
+    def get_page(self, limit: int = 100, after: tuple | None = None,
+                 sort_field: str = 'id', descending: bool = False) -> list[Row]:
+        """Возвращает страницу сотрудников после курсора after = (значение sort_field, id).
+        Сортировка выполняется в БД (ORDER BY sort_field, id), без OFFSET."""
+        if sort_field not in Employee.__table__.columns:
+            raise ValueError("Unknown sort field {}".format(sort_field))
+        return keyset_page(self._display_query(), getattr(Employee, sort_field), Employee.id,
+                           limit, after, descending)
+
+    def get_rows_by_ids(self, ids: list[int]) -> list[Row]:
+        """Возвращает строки для отображения (как в get_page) только для указанных id."""
+        return self._display_query().filter(Employee.id.in_(ids)).all()
+
+    def search(self, text: str, limit: int = 50, offset: int = 0) -> list[int]:
+        """Поиск сотрудников по подстроке в имени, фамилии, должности, телефоне и логине.
+        Возвращает страницу id; каждое слово должно встретиться хотя бы в одном из полей."""
+        words = text.split()
+        if not words:
+            return []
+        query = (
+            self.db.query(Employee.id)
+            .filter(*(or_(Employee.FName.ilike(f"%{word}%"),
+                          Employee.LName.ilike(f"%{word}%"),
+                          Employee.Position.ilike(f"%{word}%"),
+                          Employee.Number.ilike(f"%{word}%"),
+                          Employee.Login.ilike(f"%{word}%")) for word in words))
+            .order_by(Employee.id)
+        )
+        return [row.id for row in query.limit(limit).offset(offset).all()]
+
     def authenticate(self, login: str, password: str) -> Type[Employee] | None:
         """Аутентифицирует сотрудника по логину и паролю. Возвращает объект Employee или None."""
-        # Ищем сотрудника по логину
+        # Ищем сотрудника по логину (индекс ix_employees_login)
         employee = self.db.query(Employee).filter(Employee.Login == login).first()
         if not employee:
             return None
-        # Проверяем пароль с помощью Security (сравнение хеша пароля)
-        if Security.verify_password(password, str(employee.Pass)):
+        stored = str(employee.Pass)
+        # Повторный вход с тем же паролем не пересчитывает дорогой хеш
+        if Security.credentials.check(login, password, stored):
             return employee
-        return None
+        if not Security.verify_password(password, stored):
+            return None
+        if Security.needs_rehash(stored):
+            # Прозрачная миграция: Fernet-токен или хеш с прежней стоимостью заменяется новым хешем
+            employee.Pass = Security.get_password_hash(password)
+            self.db.commit()
+        Security.credentials.remember(login, password, employee.Pass)
+        return employee
+
+    def rehash_legacy_passwords(self, batch_size: int = 100) -> int:
+        """Переводит все пароли, еще хранящиеся в Fernet, на хеши (без ожидания входа сотрудников).
+        Возвращает количество обновленных записей."""
+        updated = 0
+        last_id = 0
+        while True:
+            employees = (
+                self.db.query(Employee)
+                .filter(Employee.id > last_id, ~Employee.Pass.startswith(PasswordHasher.PREFIX + "$"))
+                .order_by(Employee.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not employees:
+                return updated
+            for employee in employees:
+                password = Security.decrypt_password(employee.Pass)
+                if password:
+                    employee.Pass = Security.get_password_hash(password)
+                    updated += 1
+            last_id = employees[-1].id
+            self.db.commit()
 
     def get_experience(self, employee_id: int) -> Optional[int]:
         """Вычисляет стаж сотрудника (в годах) на основе даты найма."""
@@ -1,12 +1,103 @@
+import re
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 import sqlalchemy
 from sqlalchemy.orm import Session, load_only
+from sqlalchemy import (Engine, Row, func, or_, table, column, text as text_clause, Column, Integer, MetaData,
+                        String, Table, insert, select, update)
+from sqlalchemy.dialects.mysql import match as mysql_match
+from dataclasses import dataclass, field
 from typing import Optional, Type
 from models.medicine import Medicine
+from models.supplier import Supplier
+from models.daily_sales import DailySales
+from models.order import Order
+from models.shipment_item import ShipmentItem
+from models.stock_movement import StockMovement
+from controllers.StockController import StockController
+from core.cache import LRUCache
+from core.events import changes
+from core.pagination import keyset_page
+
+
+# Таблица FTS5, которую models/medicine.py создает для SQLite
+_medicines_fts = table('medicines_fts', column('rowid'), column('rank'))
+
+
+def expiry_date(value: date | str | None) -> date | None:
+    """Срок годности из date или строки в формате ГГГГ-ММ-ДД или ДД.ММ.ГГГГ."""
+    if value is None or isinstance(value, date):
+        return value
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except ValueError:
+            pass
+    raise ValueError("Invalid expiry date {}".format(value))
+
+
+@dataclass
+class MedicineFilter:
+    """Условия фильтрации медикаментов. Незаданные (None) условия не ограничивают выборку,
+    заданные объединяются через AND в одном запросе."""
+    category: Optional[str] = None
+    supplier: Optional[int] = None
+    price_min: Optional[int] = None
+    price_max: Optional[int] = None
+    count_min: Optional[int] = None
+    count_max: Optional[int] = None
+    expires_from: Optional[date | str] = None  # срок годности (BT), включительно
+    expires_to: Optional[date | str] = None
+
+    def conditions(self) -> list:
+        """Условия WHERE для запроса к medicines."""
+        conditions = []
+        if self.category is not None:
+            conditions.append(Medicine.Category == self.category)
+        if self.supplier is not None:
+            conditions.append(Medicine.Supplier == self.supplier)
+        if self.price_min is not None:
+            conditions.append(Medicine.Price >= self.price_min)
+        if self.price_max is not None:
+            conditions.append(Medicine.Price <= self.price_max)
+        if self.count_min is not None:
+            conditions.append(Medicine.Count >= self.count_min)
+        if self.count_max is not None:
+            conditions.append(Medicine.Count <= self.count_max)
+        if self.expires_from is not None:
+            conditions.append(Medicine.BT >= expiry_date(self.expires_from))
+        if self.expires_to is not None:
+            conditions.append(Medicine.BT <= expiry_date(self.expires_to))
+        return conditions
+
+
+@dataclass
+class PriceUpdateResult:
+    """Итог пакетного обновления цен: получено пар, найдено медикаментов, изменено строк
+    (у найденных цена могла уже совпадать) и ключи, которых нет в таблице."""
+    received: int = 0
+    matched: int = 0
+    changed: int = 0
+    unknown: list = field(default_factory=list)
 
 
 class MedicineController:
-    def __init__(self, db_session: Session):
+    PRICE_KEYS = ('id', 'MName')
+
+    def __init__(self, db_session: Session, read_bind: Engine | None = None):
         self.db = db_session
+        # Движок реплики для справочных запросов только на чтение (см. _reading)
+        self.read_bind = read_bind
+        # Кэш списков для фильтров (SELECT DISTINCT), сбрасывается при изменении медикаментов и поставщиков
+        self._distinct_cache = {}
+        changes.subscribe(Medicine.__tablename__, self._invalidate_distinct)
+        changes.subscribe(Supplier.__tablename__, self._invalidate_distinct)
+        # Кэш справочных данных (медикамент по id, список для выпадающих списков),
+        # записи сбрасываются событиями об изменении медикаментов, в том числе от продаж и поставок
+        self._cache = LRUCache.from_config()
+        changes.subscribe(Medicine.__tablename__, self._invalidate_cache)
+        # Начальный остаток и ручные правки Count записываются в журнал движения
+        self.stock = StockController(db_session)
 
     def create_medicine(self, medicine_data: dict) -> Medicine:
         """Создает новый медикамент."""
@@ -19,64 +110,311 @@ class MedicineController:
         if not self.is_name_unique(medicine_data['MName']):
             raise sqlalchemy.exc.IntegrityError(statement="UNIQUE constraint failed", params="UNIQUE constraint failed",
                                                 orig="UNIQUE constraint failed")
-        medicine = Medicine(**medicine_data)
+        medicine = Medicine(**{**medicine_data, 'BT': expiry_date(medicine_data['BT'])})
         self.db.add(medicine)
+        self.db.flush()
+        self.stock.record({medicine.id: medicine.Count}, StockController.OPENING)
         self.db.commit()
         self.db.refresh(medicine)
+        changes.emit(Medicine.__tablename__, changes.INSERTED, [medicine.id])
         return medicine
 
     def get_medicine_by_id(self, medicine_id: int) -> Type[Medicine]:
         """Возвращает медикамент по ID или None, если не найден."""
-        medicine = self.db.get(Medicine, medicine_id)
+        return self._cache.get_or_load(('medicine', medicine_id), lambda: self._load_medicine(medicine_id))
+
+    def _load_medicine(self, medicine_id: int) -> Type[Medicine]:
+        with self._reading() as db:
+            medicine = db.get(Medicine, medicine_id)
         if medicine is None:
-            self.db.commit()
             raise ValueError("Medicine not found")
-        else:
-            self.db.commit()
-            return medicine
-
+        else: return medicine
 
     def update_medicine(self, medicine_id: int, update_data: dict) -> Type[Medicine] | None:
-        """Обновляет данные медикамента по ID. Возвращает обновленный объект или None."""
-        if update_data['Price'] < 0 or update_data['Count'] < 0:
+        """Обновляет данные медикамента по ID. Возвращает обновленный объект или None.
+        Новый остаток (Count) применяется как правка на разницу с прочитанным значением
+        (Count = Count + разница), поэтому продажи, прошедшие в это время, не теряются."""
+        # Поля можно передавать частично: отсутствующие не проверяются и не меняются
+        if update_data.get('Price', 0) < 0 or update_data.get('Count', 0) < 0:
             raise ValueError("The value cannot be less than zero.")
         medicine = self.db.get(Medicine, medicine_id)
         if not medicine:
             raise ValueError("Medicine not found")
-        for field, value in update_data.items():
-            setattr(medicine, field, value)
-        self.db.commit()
+        update_data = dict(update_data)
+        delta = update_data.pop('Count') - medicine.Count if 'Count' in update_data else 0
+        try:
+            for field, value in update_data.items():
+                setattr(medicine, field, expiry_date(value) if field == 'BT' else value)
+            self.db.flush()
+            self.stock.apply({medicine_id: delta}, StockController.ADJUSTMENT)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
         self.db.refresh(medicine)
+        changes.emit(Medicine.__tablename__, changes.UPDATED, [medicine_id])
         return medicine
 
+    def update_prices(self, prices, key: str = 'id') -> PriceUpdateResult:
+        """Пакетно меняет цены (например, по новому прайс-листу поставщика). prices – словарь
+        или пары (ключ, новая цена), ключ – ID медикамента (key='id') или название (key='MName');
+        при повторе ключа берется последняя цена. Пары загружаются во временную таблицу одной
+        пакетной вставкой, цены меняются одним UPDATE ... FROM (JOIN) по ней – все в одной
+        транзакции, число запросов не зависит от числа пар."""
+        if key not in self.PRICE_KEYS:
+            raise ValueError("Unknown price key {}".format(key))
+        prices = dict(prices.items() if isinstance(prices, dict) else prices)
+        for value, price in prices.items():
+            if not isinstance(price, int) or isinstance(price, bool) or price < 0:
+                raise ValueError("Invalid price {} for {}".format(price, value))
+        result = PriceUpdateResult(received=len(prices))
+        if not prices:
+            return result
+
+        medicine_key = getattr(Medicine, key)
+        new_prices = Table(
+            'tmp_medicine_prices', MetaData(),
+            Column('Key', Integer if key == 'id' else String(100), primary_key=True),
+            Column('Price', Integer, nullable=False),
+            prefixes=['TEMPORARY'],
+        )
+        try:
+            connection = self.db.connection()
+            self._drop_temporary(new_prices)  # MySQL: остаток прерванного вызова в этом соединении
+            new_prices.create(connection)
+            self.db.execute(insert(new_prices), [{'Key': value, 'Price': price} for value, price in prices.items()])
+            result.unknown = list(self.db.execute(
+                select(new_prices.c.Key).where(~select(Medicine.id).where(medicine_key == new_prices.c.Key).exists())
+            ).scalars())
+            result.matched = result.received - len(result.unknown)
+            # ID изменяемых медикаментов – для событий вкладкам и сброса кэша
+            changed_ids = list(self.db.execute(
+                select(Medicine.id).where(medicine_key == new_prices.c.Key, Medicine.Price != new_prices.c.Price)
+            ).scalars())
+            if changed_ids:
+                result.changed = self.db.execute(
+                    update(Medicine)
+                    .where(medicine_key == new_prices.c.Key, Medicine.Price != new_prices.c.Price)
+                    .values(Price=new_prices.c.Price)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+            self._drop_temporary(new_prices)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        if changed_ids:
+            changes.emit(Medicine.__tablename__, changes.UPDATED, changed_ids)
+        return result
+
+    def _drop_temporary(self, temporary_table: Table):
+        """Удаляет временную таблицу, если она есть. В MySQL – DROP TEMPORARY TABLE:
+        обычный DROP TABLE неявно завершает (commit) текущую транзакцию."""
+        temporary = 'TEMPORARY ' if self.db.get_bind().dialect.name == 'mysql' else ''
+        self.db.execute(text_clause(f"DROP {temporary}TABLE IF EXISTS {temporary_table.name}"))
+
     def delete_medicine(self, medicine_id: int) -> Type[Medicine] | None:
-        """Удаляет медикамент по ID. Возвращает удалённый объект или None."""
+        """Удаляет медикамент по ID вместе со связанными записями (см. delete_many).
+        Возвращает удалённый объект (отсоединенный от сессии)."""
         medicine = self.db.get(Medicine, medicine_id)
         if not medicine:
             raise ValueError("Medicine not found")
-        self.db.delete(medicine)
-        self.db.commit()
+        self.db.expunge(medicine)
+        self.delete_many([medicine_id])
         return medicine
 
+    def delete_many(self, medicine_ids: list[int]) -> int:
+        """Удаляет медикаменты пакетом (например, все просроченные) вместе со связанными записями:
+        заказами, позициями поставок, строками сводки продаж и журнала движения – как каскадные
+        внешние ключи БД. Одна транзакция, по одному DELETE ... WHERE ... IN на таблицу.
+        Возвращает число удаленных медикаментов."""
+        medicine_ids = list({int(row_id) for row_id in medicine_ids})  # из таблиц GUI id могут прийти строками
+        if not medicine_ids:
+            return 0
+        try:
+            for model in (Order, ShipmentItem, DailySales, StockMovement):
+                self.db.query(model).filter(model.Medicine.in_(medicine_ids)).delete(synchronize_session=False)
+            deleted = self.db.query(Medicine).filter(Medicine.id.in_(medicine_ids)).delete(synchronize_session=False)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        changes.emit(Medicine.__tablename__, changes.DELETED, medicine_ids)
+        changes.emit(Order.__tablename__, changes.RESET)
+        return deleted
+
     def get_all(self) -> list[Type[Medicine]]:
-        """Возвращает список всех медикаментов (с ограниченным набором полей)."""
-        return self.db.query(Medicine).options(
-            load_only(Medicine.id, Medicine.MName, Medicine.Price)
-        ).all()
+        """Возвращает список всех медикаментов (с ограниченным набором полей), кэшируется."""
+        def load():
+            with self._reading() as db:
+                return db.query(Medicine).options(load_only(Medicine.id, Medicine.MName, Medicine.Price)).all()
+        return self._cache.get_or_load('all', load)
 
-    def is_name_unique(self, name: str) -> bool:
-        """Проверяет, уникален ли указанный логин (True, если такого логина нет в базе)."""
-        existing = self.db.query(Medicine).filter(Medicine.MName == name).first()
-        self.db.commit()
-        return existing is None
+    @contextmanager
+    def _reading(self):
+        """Сессия для запросов только на чтение. Без commit: объекты сессии не сбрасываются
+        (expire) и не перечитываются при следующем обращении к атрибутам. Если задана реплика,
+        запрос выполняется в короткой отдельной сессии на ней, объекты возвращаются отсоединенными."""
+        if self.read_bind is None:
+            yield self.db
+            return
+        with Session(self.read_bind, expire_on_commit=False) as db:
+            yield db
 
-    def get_medicines_by_supplier(self, id):
-        """Возвращает медикамент по ID поставщика или None, если не найден."""
-        medicine = self.db.query(Medicine).filter(Medicine.Supplier == id).all()
-        if medicine is None:
-            self.db.commit()
-            return None
-            #raise ValueError("Medicine not found")
+    def _invalidate_cache(self, kind, ids):
+        if kind == changes.RESET:
+            self._cache.clear()
         else:
-            self.db.commit()
-            return medicine
\ No newline at end of file
+            self._cache.invalidate('all', *(('medicine', medicine_id) for medicine_id in ids))
+
+    def cache_stats(self) -> dict:
+        """Попадания и промахи кэша справочных данных (для мониторинга)."""
+        return self._cache.stats()
+
+    def _display_columns(self) -> dict:
+        """Колонки строки для отображения: вместо ID поставщика – его название."""
+        return {
+            'id': Medicine.id,
+            'MName': Medicine.MName,
+            'Price': Medicine.Price,
+            'Count': Medicine.Count,
+            'Description': Medicine.Description,
+            'Category': Medicine.Category,
+            'BT': Medicine.BT,
+            'Supplier': Supplier.CompName,
+        }
+
+    def _display_query(self):
+        return (
+            self.db.query(*(column.label(name) for name, column in self._display_columns().items()))
+            .outerjoin(Supplier, Medicine.Supplier == Supplier.id)
+        )
+
+    def get_page(self, limit: int = 100, after: tuple | None = None,
+                 sort_field: str = 'id', descending: bool = False,
+                 filters: MedicineFilter | None = None) -> list[Row]:
+        """Возвращает страницу медикаментов после курсора after = (значение sort_field, id).
+        Название поставщика подтягивается JOIN-ом в том же запросе, строки – легкие кортежи.
+        Сортировка и фильтры выполняются в БД (WHERE ... ORDER BY sort_field, id), без OFFSET."""
+        columns = self._display_columns()
+        if sort_field not in columns:
+            raise ValueError("Unknown sort field {}".format(sort_field))
+        query = self._display_query()
+        if filters is not None:
+            query = query.filter(*filters.conditions())
+        return keyset_page(query, columns[sort_field], Medicine.id, limit, after, descending)
+
+    def get_rows_by_ids(self, ids: list[int], filters: MedicineFilter | None = None) -> list[Row]:
+        """Возвращает строки для отображения (как в get_page) только для указанных id."""
+        query = self._display_query().filter(Medicine.id.in_(ids))
+        if filters is not None:
+            query = query.filter(*filters.conditions())
+        return query.all()
+
+    def get_categories(self) -> list[str]:
+        """Список категорий для фильтра (кэшируется до изменения медикаментов)."""
+        if 'categories' not in self._distinct_cache:
+            with self._reading() as db:
+                rows = (
+                    db.query(Medicine.Category).distinct()
+                    .filter(Medicine.Category.isnot(None))
+                    .order_by(Medicine.Category).all()
+                )
+            self._distinct_cache['categories'] = [row.Category for row in rows]
+        return self._distinct_cache['categories']
+
+    def get_medicine_suppliers(self) -> list[Row]:
+        """Поставщики (id, CompName), у которых есть медикаменты, – для фильтра (кэшируется)."""
+        if 'suppliers' not in self._distinct_cache:
+            with self._reading() as db:
+                self._distinct_cache['suppliers'] = (
+                    db.query(Supplier.id, Supplier.CompName).distinct()
+                    .join(Medicine, Medicine.Supplier == Supplier.id)
+                    .order_by(Supplier.CompName).all()
+                )
+        return self._distinct_cache['suppliers']
+
+    def get_expiring(self, days: int = 30, group_by: str | None = None,
+                     today: date | None = None, limit: int | None = None) -> list[Row]:
+        """Медикаменты в наличии, срок годности которых истекает в ближайшие days дней
+        (с today включительно); отбор – диапазон по покрывающему индексу ix_medicines_bt.
+        group_by=None – строки медикаментов (id, MName, BT, Count, Category, Supplier, StockValue)
+        по возрастанию срока, не больше limit; 'Supplier' или 'Category' – итоги по группам:
+        Items (позиций), Units (штук), StockValue (Price * Count) и Earliest (ближайший срок)."""
+        today = today or date.today()
+        window = (Medicine.BT >= today, Medicine.BT <= today + timedelta(days=days), Medicine.Count > 0)
+        stock_value = Medicine.Price * Medicine.Count
+        if group_by is None:
+            query = (
+                self.db.query(Medicine.id, Medicine.MName, Medicine.BT, Medicine.Count, Medicine.Category,
+                              Supplier.CompName.label('Supplier'), stock_value.label('StockValue'))
+                .outerjoin(Supplier, Medicine.Supplier == Supplier.id)
+                .filter(*window)
+                .order_by(Medicine.BT, Medicine.id)
+            )
+            return query.limit(limit).all() if limit is not None else query.all()
+        if group_by not in ('Supplier', 'Category'):
+            raise ValueError("Unknown group field {}".format(group_by))
+        key = getattr(Medicine, group_by)
+        # Сначала итоги по индексу, затем к нескольким группам – названия поставщиков
+        totals = (
+            self.db.query(key.label('key'), func.count(Medicine.id).label('Items'),
+                          func.sum(Medicine.Count).label('Units'), func.sum(stock_value).label('StockValue'),
+                          func.min(Medicine.BT).label('Earliest'))
+            .filter(*window)
+            .group_by(key)
+            .subquery()
+        )
+        if group_by == 'Supplier':
+            keys = (totals.c.key.label('id'), Supplier.CompName.label('Supplier'))
+        else:
+            keys = (totals.c.key.label('Category'),)
+        query = self.db.query(*keys, totals.c.Items, totals.c.Units, totals.c.StockValue, totals.c.Earliest)
+        if group_by == 'Supplier':
+            query = query.outerjoin(Supplier, totals.c.key == Supplier.id)
+        return query.order_by(totals.c.StockValue.desc()).all()
+
+    def _invalidate_distinct(self, kind, ids):
+        self._distinct_cache.clear()
+
+    def search(self, text: str, limit: int = 50, offset: int = 0) -> list[int]:
+        """Полнотекстовый поиск по названию, описанию и категории.
+        Каждое слово ищется как префикс, результат – страница id по убыванию релевантности.
+        MySQL – индекс FULLTEXT (MATCH ... AGAINST), SQLite – таблица FTS5."""
+        words = re.findall(r"\w+", text)
+        if not words:
+            return []
+        dialect = self.db.get_bind().dialect.name
+        if dialect == 'mysql':
+            score = mysql_match(Medicine.MName, Medicine.Description, Medicine.Category,
+                                against=" ".join(f"+{word}*" for word in words)).in_boolean_mode()
+            query = (
+                self.db.query(Medicine.id)
+                .filter(score > 0)
+                .order_by(score.desc(), Medicine.id)
+            )
+        elif dialect == 'sqlite':
+            query = (
+                self.db.query(_medicines_fts.c.rowid)
+                .filter(text_clause("medicines_fts MATCH :fts_query").bindparams(
+                    fts_query=" ".join('"{}"*'.format(word) for word in words)))
+                .order_by(_medicines_fts.c.rank)
+            )
+        else:
+            # Без полнотекстового индекса – простой LIKE по всем словам
+            query = self.db.query(Medicine.id).filter(*(
+                or_(Medicine.MName.ilike(f"%{word}%"), Medicine.Description.ilike(f"%{word}%"),
+                    Medicine.Category.ilike(f"%{word}%"))
+                for word in words
+            )).order_by(Medicine.id)
+        return [row[0] for row in query.limit(limit).offset(offset).all()]
+
+    def is_name_unique(self, name: str) -> bool:
+        """Проверяет, уникально ли указанное название (True, если такого названия нет в базе).
+        Проверка перед вставкой всегда идет в основную БД: реплика может отставать."""
+        return self.db.query(Medicine.id).filter(Medicine.MName == name).first() is None
+
+    def get_medicines_by_supplier(self, id) -> list[Type[Medicine]]:
+        """Возвращает медикаменты поставщика по его ID."""
+        with self._reading() as db:
+            return db.query(Medicine).filter(Medicine.Supplier == id).all()
\ No newline at end of file
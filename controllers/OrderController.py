@@ -1,12 +1,35 @@
+import random
+import time
+from datetime import date
+from sqlalchemy import Row, or_, case, func, insert, literal, select
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session, load_only
 from typing import Optional, Type
+from models.employee import Employee
 from models.medicine import Medicine
 from models.order import Order
+from controllers.SalesController import SalesController
+from controllers.StockController import StockController
+from core.config import Config
+from core.events import changes
+from core.pagination import keyset_page
 
 
 class OrderController:
-    def __init__(self, db_session: Session):
+    PESSIMISTIC = 'pessimistic'
+    OPTIMISTIC = 'optimistic'
+
+    def __init__(self, db_session: Session, stock_locking: str | None = None):
         self.db = db_session
+        # Способ списания остатков задается для установки в [orders] stock_locking
+        self.stock_locking = stock_locking or Config.get("orders", "stock_locking", self.PESSIMISTIC)
+        if self.stock_locking not in (self.PESSIMISTIC, self.OPTIMISTIC):
+            raise ValueError("Unknown stock locking mode {}".format(self.stock_locking))
+        self.retries = Config.get_int("orders", "retries", 3)
+        # Сводка продаж по дням обновляется в той же транзакции, что и заказы
+        self.sales = SalesController(db_session)
+        # Журнал движения остатков – тоже в той же транзакции
+        self.stock = StockController(db_session)
 
     def create_order(self, order_data: dict) -> Order:
         """Создает новый заказ и уменьшает количество медикамента на складе."""
@@ -15,34 +38,133 @@ class OrderController:
         if any(not order_data.get(field) for field in required_fields):
             raise ValueError("Все обязательные поля должны быть заполнены")
 
-        if self.db.in_transaction():
-            self.db.commit()
+        # Заказ из одной позиции – частный случай оформления корзины
+        order_id, = self.checkout(
+            [{'Medicine': order_data['Medicine'], 'Amount': order_data['Amount']}],
+            employee_id=order_data['Employee'], date_reg=order_data['DateReg'], status=order_data['Status'],
+        )
+        return self.db.get(Order, order_id)
+
+    def checkout(self, lines: list[dict], employee_id: int, date_reg: date | None = None,
+                 status: bool = True) -> list[int]:
+        """Оформляет продажу из нескольких позиций (корзину) одной транзакцией.
+        lines – список словарей с ключами 'Medicine' (ID медикамента) и 'Amount' (количество);
+        позиции с одним медикаментом объединяются. Остатки списываются одним UPDATE
+        (см. _reserve_locked и _reserve_optimistic), заказы вставляются пакетом.
+        Возвращает ID созданных заказов."""
+        if not employee_id:
+            raise ValueError("Все обязательные поля должны быть заполнены")
+        quantities = {}
+        for line in lines:
+            if not line.get('Medicine') or not line.get('Amount') or line['Amount'] < 0:
+                raise ValueError("Все обязательные поля должны быть заполнены")
+            quantities[line['Medicine']] = quantities.get(line['Medicine'], 0) + line['Amount']
+        if not quantities:
+            raise ValueError("Корзина пуста")
+        date_reg = date_reg or date.today()
 
-        # Начинаем транзакцию
-        self.db.begin()
+        # Взаимная блокировка или таймаут ожидания блокировки (OperationalError) –
+        # транзакция откатывается и повторяется заново
+        for attempt in range(self.retries + 1):
+            try:
+                if self.stock_locking == self.OPTIMISTIC:
+                    reserved = self._reserve_optimistic(quantities)
+                else:
+                    reserved = self._reserve_locked(quantities)
+                if not reserved:
+                    # Условный UPDATE списал не все позиции: откатываем и смотрим актуальные остатки
+                    self.db.rollback()
+                    self._check_stock(quantities, self._stock(quantities))
+                    continue  # остатка хватает – между UPDATE и проверкой был приход, повторяем
 
-        # Получаем медикамент и блокируем запись для обновления
-        medicine = self.db.query(Medicine).filter_by(id=order_data['Medicine']).with_for_update().first()
-        if not medicine:
-            raise ValueError("Медикамент не найден")
+                # Создаем заказы пакетной вставкой; цена продажи берется подзапросом в том же INSERT
+                order_ids = self._insert_orders([
+                    {'DateReg': date_reg, 'Amount': amount, 'Status': status,
+                     'Employee': employee_id, 'Medicine': medicine_id, 'Price': self._price(medicine_id)}
+                    for medicine_id, amount in quantities.items()
+                ])
+                self.sales.record(date_reg, employee_id, quantities)
+                self.stock.record({medicine_id: -amount for medicine_id, amount in quantities.items()},
+                                  StockController.SALE, order_ids=dict(zip(quantities, order_ids)))
 
-        # Проверяем достаточное количество
-        if medicine.Count < order_data['Amount']:
-            raise ValueError(f"Недостаточно медикамента на складе. Доступно: {medicine.Count}")
+                # Сохраняем изменения
+                self.db.commit()
+                break
+            except OperationalError:
+                self.db.rollback()
+                if attempt == self.retries:
+                    raise
+                time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+            except Exception:
+                self.db.rollback()
+                raise
+        else:
+            raise ValueError("Не удалось списать медикаменты: остатки постоянно меняются, повторите позже")
 
-        # Уменьшаем количество медикамента
-        medicine.Count -= order_data['Amount']
+        # Вкладкам достаточно добавить строки заказов и обновить остатки проданных медикаментов
+        changes.emit(Order.__tablename__, changes.INSERTED, order_ids)
+        changes.emit(Medicine.__tablename__, changes.UPDATED, list(quantities))
+        return order_ids
 
-        # Создаем заказ
-        order = Order(**order_data)
-        self.db.add(order)
+    @staticmethod
+    def _price(medicine_id: int):
+        """Текущая цена медикамента – подзапросом (для записи цены продажи в заказ)."""
+        return select(Medicine.Price).where(Medicine.id == medicine_id).scalar_subquery()
 
-        # Сохраняем изменения
-        self.db.commit()
-        self.db.refresh(order)
-        self.db.refresh(medicine)
+    def _stock(self, quantities: dict, for_update: bool = False) -> dict:
+        """Остатки медикаментов {id: Count}; for_update блокирует строки в порядке id
+        (одинаковый порядок у всех касс исключает взаимные блокировки)."""
+        query = self.db.query(Medicine.id, Medicine.Count).filter(Medicine.id.in_(quantities))
+        if for_update:
+            query = query.order_by(Medicine.id).with_for_update()
+        return dict(query.all())
 
-        return order
+    @staticmethod
+    def _check_stock(quantities: dict, stock: dict):
+        """Проверяет наличие и достаточное количество медикаментов."""
+        for medicine_id, amount in quantities.items():
+            if medicine_id not in stock:
+                raise ValueError("Медикамент не найден")
+            if stock[medicine_id] < amount:
+                raise ValueError(f"Недостаточно медикамента на складе. Доступно: {stock[medicine_id]}")
+
+    def _reserve_locked(self, quantities: dict) -> bool:
+        """Пессимистичный режим: блокирует строки медикаментов (SELECT ... FOR UPDATE),
+        проверяет остатки в памяти и уменьшает их одним UPDATE ... CASE."""
+        self._check_stock(quantities, self._stock(quantities, for_update=True))
+        self.db.query(Medicine).filter(Medicine.id.in_(quantities)).update(
+            {Medicine.Count: Medicine.Count - case(quantities, value=Medicine.id, else_=0)},
+            synchronize_session=False,
+        )
+        return True
+
+    def _reserve_optimistic(self, quantities: dict) -> bool:
+        """Оптимистичный режим: без предварительной блокировки, одним условным UPDATE
+        (Count = Count - n WHERE Count >= n). Строки блокируются только на время этого UPDATE,
+        поэтому продажи популярного медикамента не выстраиваются в очередь за блокировкой.
+        Возвращает False, если какой-то позиции не хватило (или медикамента нет)."""
+        amount = case(quantities, value=Medicine.id, else_=0)
+        updated = self.db.query(Medicine).filter(
+            Medicine.id.in_(quantities), Medicine.Count >= amount,
+        ).update({Medicine.Count: Medicine.Count - amount}, synchronize_session=False)
+        return updated == len(quantities)
+
+    def _insert_orders(self, rows: list[dict]) -> list[int]:
+        """Вставляет заказы одним INSERT ... VALUES (...), (...) и возвращает их ID в порядке rows
+        (медикаменты в rows не повторяются)."""
+        statement = insert(Order).values(rows)
+        if self.db.get_bind().dialect.insert_returning:
+            # SQLite, PostgreSQL, MariaDB: RETURNING; порядок его строк не гарантирован,
+            # поэтому ID сопоставляются по медикаменту
+            inserted = dict(
+                (medicine_id, order_id) for order_id, medicine_id in
+                self.db.execute(statement.returning(Order.id, Order.Medicine))
+            )
+            return [inserted[row['Medicine']] for row in rows]
+        # MySQL: LAST_INSERT_ID() – ID первой строки; для многострочного INSERT с известным
+        # числом строк InnoDB выдает ID подряд (при auto_increment_increment = 1)
+        first_id = self.db.execute(statement).lastrowid
+        return list(range(first_id, first_id + len(rows)))
 
     def get_order_by_id(self, order_id: int) -> Type[Order]:
         """Возвращает заказ по ID или None, если не найден."""
@@ -56,10 +178,28 @@ class OrderController:
         order = self.db.get(Order, order_id)
         if not order:
             raise ValueError("Order not found")
-        for field, value in update_data.items():
-            setattr(order, field, value)
-        self.db.commit()
+        # В сводке продаж и на складе заказ переносится: возвращается по старым значениям
+        # (в сводке – по цене продажи), списывается по новым
+        old_medicine, old_amount = order.Medicine, order.Amount
+        try:
+            self.sales.record_orders([order_id], sign=-1)
+            for field, value in update_data.items():
+                setattr(order, field, value)
+            if order.Medicine != old_medicine:
+                order.Price = self._price(order.Medicine)
+            self.db.flush()
+            self.sales.record_orders([order_id])
+            deltas = {old_medicine: old_amount}
+            deltas[order.Medicine] = deltas.get(order.Medicine, 0) - order.Amount
+            self.stock.apply(deltas, StockController.SALE, order_ids=dict.fromkeys(deltas, order_id))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
         self.db.refresh(order)
+        changes.emit(Order.__tablename__, changes.UPDATED, [order_id])
+        if any(deltas.values()):
+            changes.emit(Medicine.__tablename__, changes.UPDATED, [m for m, d in deltas.items() if d])
         return order
 
     def delete_order(self, order_id: int) -> Type[Order] | None:
@@ -67,10 +207,50 @@ class OrderController:
         order = self.db.get(Order, order_id)
         if not order:
             raise ValueError("Order not found")
-        self.db.delete(order)
-        self.db.commit()
+        # Удаленный заказ возвращает медикамент на склад, из сводки вычитается по цене продажи
+        try:
+            self.sales.record_orders([order_id], sign=-1)
+            self.stock.apply({order.Medicine: order.Amount}, StockController.SALE_CANCEL,
+                             order_ids={order.Medicine: order_id})
+            self.db.delete(order)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        changes.emit(Order.__tablename__, changes.DELETED, [order_id])
+        changes.emit(Medicine.__tablename__, changes.UPDATED, [order.Medicine])
         return order
 
+    def delete_many(self, order_ids: list[int]) -> int:
+        """Удаляет заказы пакетом, как delete_order: медикаменты возвращаются на склад, сводка продаж
+        и журнал движения исправляются – все одной транзакцией, каждый шаг – один запрос по
+        списку id (число запросов не зависит от числа заказов). Возвращает число удаленных заказов."""
+        order_ids = list({int(row_id) for row_id in order_ids})  # из таблиц GUI id могут прийти строками
+        if not order_ids:
+            return 0
+        try:
+            quantities = dict(
+                self.db.query(Order.Medicine, func.sum(Order.Amount))
+                .filter(Order.id.in_(order_ids))
+                .group_by(Order.Medicine)
+                .all()
+            )
+            self.sales.record_orders(order_ids, sign=-1)
+            self.stock.change(quantities)
+            self.stock.record_select(
+                select(Order.Medicine, Order.Amount, Order.id, literal(None)).where(Order.id.in_(order_ids)),
+                StockController.SALE_CANCEL,
+            )
+            deleted = self.db.query(Order).filter(Order.id.in_(order_ids)).delete(synchronize_session=False)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        changes.emit(Order.__tablename__, changes.DELETED, order_ids)
+        if quantities:
+            changes.emit(Medicine.__tablename__, changes.UPDATED, list(quantities))
+        return deleted
+
     def get_all(self) -> list[Type[Order]]:
         """Возвращает список всех заказов (с ограниченным набором полей)."""
         # Например, выбираем поля: id, количество и ссылку на медикамент (можно имя медикамента через join, если нужно)
@@ -78,16 +258,65 @@ class OrderController:
             load_only(Order.id, Order.Amount, Order.Medicine)
         ).all()
 
-    def get_total_cost(self, order_id: int) -> Optional[float]:
-        """Вычисляет общую стоимость заказа (Price * Amount). Возвращает сумму или None, если заказ не найден."""
-        order = self.db.get(Order, order_id)
-        if not order:
+    def _display_columns(self) -> dict:
+        """Колонки строки для отображения: вместо ID сотрудника и медикамента – их имена."""
+        return {
+            'id': Order.id,
+            'DateReg': Order.DateReg,
+            'Amount': Order.Amount,
+            'Status': Order.Status,
+            'Employee': Employee.LName + ' ' + Employee.FName,
+            'Medicine': Medicine.MName,
+        }
+
+    def _display_query(self):
+        return (
+            self.db.query(*(column.label(name) for name, column in self._display_columns().items()))
+            .outerjoin(Employee, Order.Employee == Employee.id)
+            .outerjoin(Medicine, Order.Medicine == Medicine.id)
+        )
+
+    def get_page(self, limit: int = 100, after: tuple | None = None,
+                 sort_field: str = 'id', descending: bool = False) -> list[Row]:
+        """Возвращает страницу заказов после курсора after = (значение sort_field, id).
+        Имена сотрудника и медикамента подтягиваются JOIN-ом в том же запросе.
+        Сортировка выполняется в БД (ORDER BY sort_field, id), без OFFSET."""
+        columns = self._display_columns()
+        if sort_field not in columns:
+            raise ValueError("Unknown sort field {}".format(sort_field))
+        return keyset_page(self._display_query(), columns[sort_field], Order.id, limit, after, descending)
+
+    def get_rows_by_ids(self, ids: list[int]) -> list[Row]:
+        """Возвращает строки для отображения (как в get_page) только для указанных id."""
+        return self._display_query().filter(Order.id.in_(ids)).all()
+
+    def search(self, text: str, limit: int = 50, offset: int = 0) -> list[int]:
+        """Поиск заказов по подстроке в имени сотрудника или названии медикамента.
+        Возвращает страницу id; каждое слово должно встретиться хотя бы в одном из полей."""
+        words = text.split()
+        if not words:
+            return []
+        query = (
+            self.db.query(Order.id)
+            .outerjoin(Employee, Order.Employee == Employee.id)
+            .outerjoin(Medicine, Order.Medicine == Medicine.id)
+            .filter(*(or_(Employee.FName.ilike(f"%{word}%"),
+                          Employee.LName.ilike(f"%{word}%"),
+                          Medicine.MName.ilike(f"%{word}%")) for word in words))
+            .order_by(Order.id)
+        )
+        return [row.id for row in query.limit(limit).offset(offset).all()]
+
+    def get_total_cost(self, order_id: int) -> Optional[int]:
+        """Вычисляет общую стоимость заказа (Price * Amount) в БД.
+        Возвращает сумму или None, если у заказа нет медикамента."""
+        row = self.db.query(Order.total_cost.label('total_cost')).filter(Order.id == order_id).first()
+        if row is None:
             raise ValueError("Order not found")
-        # Предполагаем, что у заказа есть связанный объект medicine и поле amount (количество)
-        medicine = order.Medicine  # может выполниться ленивой загрузкой Medicine, если не загружен
-        amount = getattr(order, "amount", None)  # количество заказанного товара
-        if medicine is None or amount is None:
-            return None
-        # Общая стоимость = цена медикамента * количество
-        total = medicine.price * amount
-        return total
+        return row.total_cost
+
+    def get_total_costs(self, order_ids: list[int]) -> dict[int, int]:
+        """Стоимости заказов одним запросом: {ID заказа: Price * Amount}."""
+        if not order_ids:
+            return {}
+        return dict(self.db.query(Order.id, Order.total_cost).filter(Order.id.in_(order_ids)).all())
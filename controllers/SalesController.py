@@ -0,0 +1,105 @@
+from datetime import date
+from sqlalchemy import Date, Row, case, func, literal, select
+from sqlalchemy.orm import Session
+from models.daily_sales import DailySales
+from models.medicine import Medicine
+from models.order import Order
+
+
+class SalesController:
+    """Сводка продаж по дням (таблица daily_sales): отчеты за период читают ее,
+    а не все заказы с ценами медикаментов."""
+
+    GROUP_FIELDS = ('Date', 'Medicine', 'Employee')
+
+    def __init__(self, db_session: Session):
+        self.db = db_session
+
+    def _upsert(self, select_statement):
+        """INSERT ... SELECT в daily_sales; для существующих строк (дата, медикамент, сотрудник)
+        Units и Revenue увеличиваются на вставляемые значения."""
+        columns = ['Date', 'Medicine', 'Employee', 'Units', 'Revenue']
+        dialect = self.db.get_bind().dialect.name
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            statement = insert(DailySales).from_select(columns, select_statement)
+            statement = statement.on_duplicate_key_update(
+                Units=DailySales.Units + statement.inserted.Units,
+                Revenue=DailySales.Revenue + statement.inserted.Revenue,
+            )
+        else:
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            statement = insert(DailySales).from_select(columns, select_statement)
+            statement = statement.on_conflict_do_update(
+                index_elements=[DailySales.Date, DailySales.Medicine, DailySales.Employee],
+                set_={'Units': DailySales.Units + statement.excluded.Units,
+                      'Revenue': DailySales.Revenue + statement.excluded.Revenue},
+            )
+        self.db.execute(statement)
+
+    @staticmethod
+    def _sale_price():
+        """Цена продажи заказа; у заказов без сохраненной цены – текущая цена медикамента."""
+        return func.coalesce(Order.Price, Medicine.Price)
+
+    def record(self, day: date, employee_id: int, quantities: dict, sign: int = 1):
+        """Добавляет в сводку продажу (sign=1) или отменяет ее (sign=-1) одним запросом:
+        quantities – {ID медикамента: количество}, выручка считается по текущей цене медикамента
+        (для отмены уже записанных заказов – record_orders, по цене продажи).
+        Выполняется в транзакции вызывающего контроллера, commit не делает."""
+        units = case(quantities, value=Medicine.id, else_=0) * sign
+        self._upsert(
+            select(literal(day, Date), Medicine.id, literal(employee_id), units, Medicine.Price * units)
+            .where(Medicine.id.in_(quantities))
+        )
+
+    def record_orders(self, order_ids: list[int], sign: int = 1):
+        """Добавляет в сводку (sign=1) или вычитает из нее (sign=-1) уже записанные заказы одним
+        INSERT ... SELECT по таблице orders (например, перед удалением) – по цене продажи
+        из заказа, поэтому смена цены медикамента не оставляет в сводке лишней выручки.
+        commit не делает."""
+        self._upsert(
+            select(Order.DateReg, Order.Medicine, Order.Employee, func.sum(Order.Amount) * sign,
+                   func.sum(Order.Amount * self._sale_price()) * sign)
+            .join(Medicine, Order.Medicine == Medicine.id)
+            .where(Order.id.in_(order_ids))
+            .group_by(Order.DateReg, Order.Medicine, Order.Employee)
+        )
+
+    def backfill(self, batch_size: int = 10000) -> int:
+        """Пересчитывает сводку по всем заказам: таблица очищается и заполняется порциями
+        по batch_size заказов (диапазонами id), каждая порция – отдельная транзакция.
+        Запускать, когда заказы не удаляются (например, ночью). Возвращает число учтенных заказов."""
+        self.db.query(DailySales).delete(synchronize_session=False)
+        self.db.commit()
+        min_id, max_id = self.db.query(func.min(Order.id), func.max(Order.id)).one()
+        if min_id is None:
+            return 0
+        for start in range(min_id, max_id + 1, batch_size):
+            self._upsert(
+                select(Order.DateReg, Order.Medicine, Order.Employee, func.sum(Order.Amount),
+                       func.sum(Order.Amount * self._sale_price()))
+                .join(Medicine, Order.Medicine == Medicine.id)
+                .where(Order.id >= start, Order.id < start + batch_size)
+                .group_by(Order.DateReg, Order.Medicine, Order.Employee)
+            )
+            self.db.commit()
+        return self.db.query(func.count(Order.id)).filter(Order.id <= max_id).scalar()
+
+    def get_totals(self, date_from: date | None = None, date_to: date | None = None,
+                   group_by: str = 'Date') -> list[Row]:
+        """Продажи за период (границы включительно), сгруппированные по дате, медикаменту
+        или сотруднику: строки (значение group_by, Units, Revenue)."""
+        if group_by not in self.GROUP_FIELDS:
+            raise ValueError("Unknown group field {}".format(group_by))
+        key = getattr(DailySales, group_by)
+        query = self.db.query(key, func.sum(DailySales.Units).label('Units'),
+                              func.sum(DailySales.Revenue).label('Revenue'))
+        if date_from is not None:
+            query = query.filter(DailySales.Date >= date_from)
+        if date_to is not None:
+            query = query.filter(DailySales.Date <= date_to)
+        return query.group_by(key).having(func.sum(DailySales.Units) != 0).order_by(key).all()
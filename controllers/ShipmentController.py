@@ -1,3 +1,4 @@
+from sqlalchemy import Row, or_, case, func, literal, select
 from sqlalchemy.orm import Session, load_only
 from typing import Optional, List, Type
 from models.medicine import Medicine
@@ -5,11 +6,16 @@ from models.shipment import Shipment
 from models.employee import Employee
 from models.supplier import Supplier
 from models.shipment_item import ShipmentItem
+from controllers.StockController import StockController
+from core.events import changes
+from core.pagination import keyset_page
 
 
 class ShipmentController:
     def __init__(self, db_session: Session):
         self.db = db_session
+        # Приход и отмена поставок пишутся в журнал движения остатков в той же транзакции
+        self.stock = StockController(db_session)
 
     def get_all_suppliers(self):
         """Получение всех поставщиков для выпадающего списка"""
@@ -23,48 +29,64 @@ class ShipmentController:
         """
         Создает новую поставку и связанные записи ShipmentItem.
         shipment_data – данные для Shipment (например, supplier_id, date и др.).
-        items – список словарей с ключами 'medication_id' и 'quantity' для каждого медикамента в поставке.
+        items – список словарей с ключами 'id' и 'Count' (или 'medication_id' и 'quantity')
+        для каждого медикамента в поставке.
         Автоматически рассчитывает общую стоимость поставки на основе цен медикаментов.
+        Число запросов не зависит от числа позиций: одна выборка медикаментов с блокировкой,
+        вставка поставки, одна пакетная вставка позиций и один UPDATE остатков – в одной транзакции.
         """
-        # Рассчитываем общую стоимость поставки
-        total_price = 0
+        # Количество по каждому медикаменту; повторяющиеся позиции складываются
+        quantities = {}
         for item in items:
-            med_id = item.get("id")
-            qty = item.get("Count", 0)
-            # Получаем медикамент из базы данных
-            medication = self.db.query(Medicine).filter(Medicine.id == med_id).first()
-            if not medication:
-                raise ValueError(f"Медикамент с ID {med_id} не найден")
-            total_price += medication.Price * qty
-
-        # Обновляем цену в shipment_data (перезаписываем, если была передана)
-        shipment_data["Price"] = total_price
-
-        # Создаем объект Shipment
-        shipment = Shipment(**shipment_data)
-        self.db.add(shipment)
-        self.db.flush()
-
-        # Создаем объекты ShipmentItem для каждого элемента поставки
-        shipment_items = []
-        for item in items:
-            med_id = item.get("medication_id")
-            qty = item.get("quantity", 0)
-            shipment_item = ShipmentItem(Shipment=shipment.id, Medicine=med_id, Quantity=qty)
-            shipment_items.append(shipment_item)
-            self.db.add(shipment_item)
+            med_id = item.get("id", item.get("medication_id"))
+            qty = item.get("Count", item.get("quantity", 0))
+            quantities[med_id] = quantities.get(med_id, 0) + qty
 
-        # Обновляем количество медикаментов на складе
-        if shipment_data['Status']:
-            for item in items:
-                med_id = item.get("id")
-                qty = item.get("Count", 0)
-                medication = self.db.query(Medicine).filter(Medicine.id == med_id).first()
-                medication.Count += qty
-
-        # Фиксируем все изменения в базе
-        self.db.commit()
+        try:
+            # Цены всех медикаментов поставки одним запросом; строки блокируются до commit
+            # в порядке id, как при продаже (OrderController._stock) – без взаимных блокировок
+            prices = dict(
+                self.db.query(Medicine.id, Medicine.Price)
+                .filter(Medicine.id.in_(quantities))
+                .order_by(Medicine.id)
+                .with_for_update()
+                .all()
+            )
+            missing = [med_id for med_id in quantities if med_id not in prices]
+            if missing:
+                raise ValueError(f"Медикамент с ID {missing[0]} не найден")
+
+            # Рассчитываем общую стоимость поставки (перезаписываем, если была передана)
+            shipment_data["Price"] = sum(prices[med_id] * qty for med_id, qty in quantities.items())
+
+            # Создаем объект Shipment
+            shipment = Shipment(**shipment_data)
+            self.db.add(shipment)
+            self.db.flush()
+
+            # Позиции поставки – одной пакетной вставкой
+            self.db.bulk_insert_mappings(ShipmentItem, [
+                {"Shipment": shipment.id, "Medicine": med_id, "Quantity": qty}
+                for med_id, qty in quantities.items()
+            ])
+
+            # Обновляем количество медикаментов на складе одним UPDATE ... CASE
+            if shipment_data['Status'] and quantities:
+                self.db.query(Medicine).filter(Medicine.id.in_(quantities)).update(
+                    {Medicine.Count: Medicine.Count + case(quantities, value=Medicine.id, else_=0)},
+                    synchronize_session=False,
+                )
+                self.stock.record(quantities, StockController.RECEIPT, shipment_id=shipment.id)
+
+            # Фиксируем все изменения в базе
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
         self.db.refresh(shipment)
+        changes.emit(Shipment.__tablename__, changes.INSERTED, [shipment.id])
+        if shipment_data['Status']:
+            changes.emit(Medicine.__tablename__, changes.UPDATED, list(quantities))
         return shipment
 
     def get_shipment_by_id(self, shipment_id: int) -> Optional[Shipment]:
@@ -77,27 +99,167 @@ class ShipmentController:
 
         if not shipment:
             return None
-        
-        for field, value in update_data.items():
-            setattr(shipment, field, value)
-        self.db.commit()
+
+        # Проведение черновика (Status False -> True) приходует позиции на склад, отмена – списывает
+        quantities = {}
+        if 'Status' in update_data and bool(update_data['Status']) != bool(shipment.Status):
+            quantities = self._quantities(shipment_id)
+            sign, reason = ((1, StockController.RECEIPT) if update_data['Status']
+                            else (-1, StockController.RECEIPT_CANCEL))
+        try:
+            if quantities:
+                self.stock.apply({med_id: sign * qty for med_id, qty in quantities.items()},
+                                 reason, shipment_id=shipment_id)
+            for field, value in update_data.items():
+                setattr(shipment, field, value)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
         self.db.refresh(shipment)
+        changes.emit(Shipment.__tablename__, changes.UPDATED, [shipment_id])
+        if quantities:
+            changes.emit(Medicine.__tablename__, changes.UPDATED, list(quantities))
         return shipment
 
+    def _quantities(self, shipment_id: int) -> dict:
+        """Позиции поставки {ID медикамента: количество}."""
+        return dict(
+            self.db.query(ShipmentItem.Medicine, ShipmentItem.Quantity)
+            .filter(ShipmentItem.Shipment == shipment_id)
+            .all()
+        )
+
     def delete_shipment(self, shipment_id: int) -> Type[Shipment] | None:
         """Удаляет поставку по ID. Возвращает удалённый объект или None."""
         shipment = self.db.get(Shipment, shipment_id)
         if not shipment:
             return None
         shipment_items = self.db.query(ShipmentItem).filter(ShipmentItem.Shipment == shipment.id).all()
-        for shipment_item in shipment_items:
-            self.db.delete(shipment_item)
-        self.db.delete(shipment)
-        self.db.commit()
+        # Проведенная поставка списывается со склада; если ее медикаменты уже проданы – ValueError
+        quantities = {}
+        if shipment.Status:
+            for shipment_item in shipment_items:
+                quantities[shipment_item.Medicine] = quantities.get(shipment_item.Medicine, 0) + shipment_item.Quantity
+        try:
+            self.stock.apply({med_id: -qty for med_id, qty in quantities.items()},
+                             StockController.RECEIPT_CANCEL, shipment_id=shipment_id)
+            for shipment_item in shipment_items:
+                self.db.delete(shipment_item)
+            self.db.delete(shipment)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        changes.emit(Shipment.__tablename__, changes.DELETED, [shipment_id])
+        if quantities:
+            changes.emit(Medicine.__tablename__, changes.UPDATED, list(quantities))
         return shipment
 
+    def delete_many(self, shipment_ids: list[int]) -> int:
+        """Удаляет поставки пакетом вместе с позициями, как delete_shipment: проведенные поставки
+        списываются со склада (ValueError, если их медикаменты уже проданы). Одна транзакция,
+        каждый шаг – один запрос по списку id. Возвращает число удаленных поставок."""
+        shipment_ids = list({int(row_id) for row_id in shipment_ids})  # из таблиц GUI id могут прийти строками
+        if not shipment_ids:
+            return 0
+        posted = (ShipmentItem.Shipment.in_(shipment_ids), Shipment.id == ShipmentItem.Shipment, Shipment.Status)
+        try:
+            quantities = dict(
+                self.db.query(ShipmentItem.Medicine, func.sum(ShipmentItem.Quantity))
+                .filter(*posted)
+                .group_by(ShipmentItem.Medicine)
+                .all()
+            )
+            self.stock.change({med_id: -qty for med_id, qty in quantities.items()})
+            if quantities:
+                self.stock.record_select(
+                    select(ShipmentItem.Medicine, -ShipmentItem.Quantity, literal(None), ShipmentItem.Shipment)
+                    .where(*posted),
+                    StockController.RECEIPT_CANCEL,
+                )
+            self.db.query(ShipmentItem).filter(ShipmentItem.Shipment.in_(shipment_ids)).delete(synchronize_session=False)
+            deleted = self.db.query(Shipment).filter(Shipment.id.in_(shipment_ids)).delete(synchronize_session=False)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        changes.emit(Shipment.__tablename__, changes.DELETED, shipment_ids)
+        if quantities:
+            changes.emit(Medicine.__tablename__, changes.UPDATED, list(quantities))
+        return deleted
+
     def get_all(self) -> list[Type[Shipment]]:
         """Возвращает список всех поставок (с ограниченным набором полей)."""
         return self.db.query(Shipment).options(
             load_only(Shipment.id, Shipment.Supplier, Shipment.DateReg)
-        ).all()
\ No newline at end of file
+        ).all()
+
+    def _display_columns(self) -> dict:
+        """Колонки строки для отображения: вместо ID поставщика и сотрудника – их имена."""
+        return {
+            'id': Shipment.id,
+            'Supplier': Supplier.CompName,
+            'DateReg': Shipment.DateReg,
+            'Price': Shipment.Price,
+            'Status': Shipment.Status,
+            'Employee': Employee.LName + ' ' + Employee.FName,
+        }
+
+    def _display_query(self):
+        return (
+            self.db.query(*(column.label(name) for name, column in self._display_columns().items()))
+            .outerjoin(Supplier, Shipment.Supplier == Supplier.id)
+            .outerjoin(Employee, Shipment.Employee == Employee.id)
+        )
+
+    def get_page(self, limit: int = 100, after: tuple | None = None,
+                 sort_field: str = 'id', descending: bool = False) -> list[Row]:
+        """Возвращает страницу поставок после курсора after = (значение sort_field, id).
+        Имена поставщика и сотрудника подтягиваются JOIN-ом в том же запросе.
+        Сортировка выполняется в БД (ORDER BY sort_field, id), без OFFSET."""
+        columns = self._display_columns()
+        if sort_field not in columns:
+            raise ValueError("Unknown sort field {}".format(sort_field))
+        return keyset_page(self._display_query(), columns[sort_field], Shipment.id, limit, after, descending)
+
+    def get_rows_by_ids(self, ids: list[int]) -> list[Row]:
+        """Возвращает строки для отображения (как в get_page) только для указанных id."""
+        return self._display_query().filter(Shipment.id.in_(ids)).all()
+
+    def search(self, text: str, limit: int = 50, offset: int = 0) -> list[int]:
+        """Поиск поставок по подстроке в названии поставщика или имени сотрудника.
+        Возвращает страницу id; каждое слово должно встретиться хотя бы в одном из полей."""
+        words = text.split()
+        if not words:
+            return []
+        query = (
+            self.db.query(Shipment.id)
+            .outerjoin(Supplier, Shipment.Supplier == Supplier.id)
+            .outerjoin(Employee, Shipment.Employee == Employee.id)
+            .filter(*(or_(Supplier.CompName.ilike(f"%{word}%"),
+                          Employee.FName.ilike(f"%{word}%"),
+                          Employee.LName.ilike(f"%{word}%")) for word in words))
+            .order_by(Shipment.id)
+        )
+        return [row.id for row in query.limit(limit).offset(offset).all()]
+
+    def get_total_quantity(self, shipment_id: int) -> int:
+        """Общее количество медикаментов в поставке (SUM в БД, без загрузки позиций)."""
+        row = self.db.query(Shipment.total_quantity.label('total_quantity')).filter(Shipment.id == shipment_id).first()
+        if row is None:
+            raise ValueError("Shipment not found")
+        return row.total_quantity
+
+    def get_total_quantities(self, shipment_ids: list[int]) -> dict[int, int]:
+        """Количества медикаментов в поставках одним сгруппированным запросом: {ID поставки: сумма};
+        у поставок без позиций – 0."""
+        totals = dict.fromkeys(shipment_ids, 0)
+        if totals:
+            totals.update(
+                self.db.query(ShipmentItem.Shipment, func.sum(ShipmentItem.Quantity))
+                .filter(ShipmentItem.Shipment.in_(shipment_ids))
+                .group_by(ShipmentItem.Shipment)
+                .all()
+            )
+        return totals
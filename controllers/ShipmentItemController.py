@@ -1,45 +1,141 @@
-from sqlalchemy.orm import Session, load_only
+from sqlalchemy import Row
+from sqlalchemy.orm import Session, contains_eager, load_only
 from typing import Optional, Type
+from models.medicine import Medicine
+from models.shipment import Shipment
 from models.shipment_item import ShipmentItem
+from models.supplier import Supplier
+from controllers.StockController import StockController
+from core.events import changes
 
 class ShipmentItemController:
+    """Позиции поставок. Изменение позиций проведенной поставки (Status) меняет остатки
+    медикаментов и пишется в журнал движения (RECEIPT / RECEIPT_CANCEL) в той же транзакции."""
+
     def __init__(self, db_session: Session):
         self.db = db_session
+        self.stock = StockController(db_session)
+
+    def _post(self, shipment_id: int, deltas: dict):
+        """Приходует (delta > 0) или списывает (delta < 0) изменение позиций проведенной поставки;
+        у черновика остатки не меняются. Возвращает ID медикаментов с измененным остатком.
+        ValueError, если списываемое уже продано. commit не делает."""
+        deltas = {medicine_id: delta for medicine_id, delta in deltas.items() if delta}
+        shipment = self.db.get(Shipment, shipment_id)
+        if not deltas or shipment is None or not shipment.Status:
+            return []
+        self.stock.change(deltas)
+        self.stock.record({m: d for m, d in deltas.items() if d > 0}, StockController.RECEIPT,
+                          shipment_id=shipment_id)
+        self.stock.record({m: d for m, d in deltas.items() if d < 0}, StockController.RECEIPT_CANCEL,
+                          shipment_id=shipment_id)
+        return list(deltas)
+
+    def _emit(self, shipment_id: int, medicine_ids: list[int]):
+        changes.emit(Shipment.__tablename__, changes.UPDATED, [shipment_id])
+        if medicine_ids:
+            changes.emit(Medicine.__tablename__, changes.UPDATED, medicine_ids)
 
     def create_shipmentitem(self, item_data: dict) -> ShipmentItem:
         """Создает новую запись ShipmentItem."""
         shipment_item = ShipmentItem(**item_data)
-        self.db.add(shipment_item)
-        self.db.commit()
+        try:
+            self.db.add(shipment_item)
+            self.db.flush()
+            posted = self._post(shipment_item.Shipment, {shipment_item.Medicine: shipment_item.Quantity})
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
         self.db.refresh(shipment_item)
+        self._emit(shipment_item.Shipment, posted)
         return shipment_item
 
-    def get_shipmentitem_by_id(self, item_id: int) -> Optional[ShipmentItem]:
-        """Возвращает ShipmentItem по ID или None, если не найден."""
-        return self.db.get(ShipmentItem, item_id)
+    def get_shipmentitem_by_id(self, shipment_id: int, medicine_id: int | None = None) -> Optional[ShipmentItem]:
+        """Возвращает позицию по ключу (ID поставки, ID медикамента) или None, если не найдена.
+        Без medicine_id – первую позицию поставки."""
+        if medicine_id is not None:
+            return self.db.get(ShipmentItem, (shipment_id, medicine_id))
+        return (self.db.query(ShipmentItem).filter(ShipmentItem.Shipment == shipment_id)
+                .order_by(ShipmentItem.Medicine).first())
 
-    def update_shipmentitem(self, item_id: int, update_data: dict) -> Type[ShipmentItem] | None:
-        """Обновляет данные ShipmentItem по ID. Возвращает обновленный объект или None."""
-        shipment_item = self.db.get(ShipmentItem, item_id)
+    def update_shipmentitem(self, shipment_id: int, update_data: dict,
+                            medicine_id: int | None = None) -> Type[ShipmentItem] | None:
+        """Обновляет позицию (ключ – как в get_shipmentitem_by_id). Возвращает обновленный объект или None."""
+        shipment_item = self.get_shipmentitem_by_id(shipment_id, medicine_id)
         if not shipment_item:
             return None
-        for field, value in update_data.items():
-            setattr(shipment_item, field, value)
-        self.db.commit()
+        # Позиция проведенной поставки переносится: старое количество списывается, новое приходуется
+        deltas = {shipment_item.Medicine: -shipment_item.Quantity}
+        try:
+            for field, value in update_data.items():
+                setattr(shipment_item, field, value)
+            self.db.flush()
+            deltas[shipment_item.Medicine] = deltas.get(shipment_item.Medicine, 0) + shipment_item.Quantity
+            posted = self._post(shipment_id, deltas)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
         self.db.refresh(shipment_item)
+        self._emit(shipment_id, posted)
         return shipment_item
 
-    def delete_shipmentitem(self, item_id: int) -> Type[ShipmentItem] | None:
-        """Удаляет ShipmentItem по ID. Возвращает удалённый объект или None."""
-        shipment_item = self.db.query(ShipmentItem).filter(ShipmentItem.Shipment == item_id).first()
+    def delete_shipmentitem(self, shipment_id: int, medicine_id: int | None = None) -> Type[ShipmentItem] | None:
+        """Удаляет позицию (ключ – как в get_shipmentitem_by_id). Возвращает удалённый объект или None."""
+        shipment_item = self.get_shipmentitem_by_id(shipment_id, medicine_id)
         if not shipment_item:
             return None
-        self.db.delete(shipment_item)
-        self.db.commit()
+        try:
+            posted = self._post(shipment_id, {shipment_item.Medicine: -shipment_item.Quantity})
+            self.db.delete(shipment_item)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self._emit(shipment_id, posted)
         return shipment_item
 
     def get_all(self) -> list[Type[ShipmentItem]]:
         """Возвращает список всех ShipmentItem (с ограниченным набором полей)."""
         return self.db.query(ShipmentItem).options(
-            load_only(ShipmentItem.id, ShipmentItem.Shipment, ShipmentItem.Medicine, ShipmentItem.Quantity)
-        ).all()
\ No newline at end of file
+            load_only(ShipmentItem.Shipment, ShipmentItem.Medicine, ShipmentItem.Quantity)
+        ).all()
+
+    def get_items_for_shipments(self, shipment_ids: list[int]) -> dict[int, list[ShipmentItem]]:
+        """Позиции нескольких поставок одним запросом (IN по первичному ключу): {ID поставки: позиции}.
+        Медикамент позиции (item.medicine) загружается JOIN-ом в том же запросе, поэтому
+        отображение названий не выполняет запрос на каждую строку. У поставок без позиций – []."""
+        items = {shipment_id: [] for shipment_id in shipment_ids}
+        if items:
+            query = (
+                self.db.query(ShipmentItem)
+                .join(ShipmentItem.medicine)
+                .options(contains_eager(ShipmentItem.medicine))
+                .filter(ShipmentItem.Shipment.in_(items))
+                .order_by(ShipmentItem.Shipment, ShipmentItem.Medicine)
+            )
+            for item in query:
+                items[item.Shipment].append(item)
+        return items
+
+    def get_receipts_for_medicines(self, medicine_ids: list[int],
+                                   posted_only: bool = True) -> dict[int, list[Row]]:
+        """История поступлений нескольких медикаментов одним запросом (IN по индексу
+        ix_shipmentitem_medicine): {ID медикамента: строки (Medicine, Shipment, DateReg, Supplier, Quantity, Status)},
+        Supplier – название поставщика, новые поставки первыми. posted_only – без черновиков."""
+        receipts = {medicine_id: [] for medicine_id in medicine_ids}
+        if receipts:
+            query = (
+                self.db.query(ShipmentItem.Medicine, ShipmentItem.Shipment, Shipment.DateReg,
+                              Supplier.CompName.label('Supplier'), ShipmentItem.Quantity, Shipment.Status)
+                .join(Shipment, ShipmentItem.Shipment == Shipment.id)
+                .outerjoin(Supplier, Shipment.Supplier == Supplier.id)
+                .filter(ShipmentItem.Medicine.in_(receipts))
+                .order_by(ShipmentItem.Medicine, Shipment.DateReg.desc(), Shipment.id.desc())
+            )
+            if posted_only:
+                query = query.filter(Shipment.Status)
+            for row in query:
+                receipts[row.Medicine].append(row)
+        return receipts
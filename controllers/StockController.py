@@ -0,0 +1,96 @@
+from sqlalchemy import case, func, insert, literal, select
+from sqlalchemy.orm import Session
+from models.medicine import Medicine
+from models.stock_movement import StockMovement
+
+
+class StockController:
+    """Журнал движения остатков (таблица stock_movements). Остаток медикамента читается
+    из Medicine.Count, журнал пишется в той же транзакции, что и продажа или поставка."""
+
+    # Причины движения (StockMovement.Reason)
+    OPENING = 'opening'                  # начальный остаток нового медикамента
+    ADJUSTMENT = 'adjustment'            # ручная правка остатка
+    SALE = 'sale'                        # продажа или изменение заказа
+    SALE_CANCEL = 'sale_cancel'          # удаление заказа
+    RECEIPT = 'receipt'                  # проведенная поставка
+    RECEIPT_CANCEL = 'receipt_cancel'    # удаление или отмена проведения поставки
+
+    def __init__(self, db_session: Session):
+        self.db = db_session
+
+    def record(self, deltas: dict, reason: str, order_ids: dict | None = None, shipment_id: int | None = None):
+        """Записывает движения {ID медикамента: изменение} одной пакетной вставкой; остатки
+        (Count) при этом не меняются – их уже изменил вызывающий контроллер.
+        order_ids – {ID медикамента: ID заказа}. commit не делает."""
+        rows = [
+            {'Medicine': medicine_id, 'Delta': delta, 'Reason': reason,
+             'Order': (order_ids or {}).get(medicine_id), 'Shipment': shipment_id}
+            for medicine_id, delta in deltas.items() if delta
+        ]
+        if rows:
+            self.db.execute(insert(StockMovement), rows)
+
+    def apply(self, deltas: dict, reason: str, order_ids: dict | None = None, shipment_id: int | None = None):
+        """Изменяет остатки на deltas одним UPDATE ... CASE и записывает движения в журнал.
+        Если медикамента нет или остаток стал бы отрицательным – ValueError (откат делает
+        вызывающий контроллер). commit не делает."""
+        deltas = {medicine_id: delta for medicine_id, delta in deltas.items() if delta}
+        if deltas:
+            self.change(deltas)
+            self.record(deltas, reason, order_ids, shipment_id)
+
+    def change(self, deltas: dict):
+        """Только остатки: Count += delta одним условным UPDATE ... CASE, без записи в журнал
+        (движения пишет вызывающий, например record_select). ValueError, если медикамента нет
+        или остаток стал бы отрицательным."""
+        deltas = {medicine_id: delta for medicine_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        delta = case(deltas, value=Medicine.id, else_=0)
+        updated = self.db.query(Medicine).filter(
+            Medicine.id.in_(deltas), Medicine.Count + delta >= 0,
+        ).update({Medicine.Count: Medicine.Count + delta}, synchronize_session=False)
+        if updated != len(deltas):
+            raise ValueError("Недостаточно медикамента на складе")
+
+    def record_select(self, select_statement, reason: str):
+        """Записывает движения одним INSERT ... SELECT: select_statement возвращает колонки
+        (Medicine, Delta, Order, Shipment) – например, по строкам удаляемых заказов. commit не делает."""
+        self.db.execute(insert(StockMovement).from_select(
+            ['Medicine', 'Delta', 'Order', 'Shipment', 'Reason'],
+            select_statement.add_columns(literal(reason)),
+        ))
+
+    def get_movements(self, medicine_id: int, limit: int = 100) -> list[StockMovement]:
+        """Последние движения медикамента (новые первыми)."""
+        return (self.db.query(StockMovement).filter(StockMovement.Medicine == medicine_id)
+                .order_by(StockMovement.id.desc()).limit(limit).all())
+
+    def reconcile(self, batch_size: int = 10000) -> dict[int, tuple[int, int]]:
+        """Сверяет остатки с журналом. Медикаменты просматриваются диапазонами id по batch_size:
+        на диапазон – один запрос, суммы движений считаются по индексу ix_stock_movements_medicine,
+        после каждого диапазона транзакция завершается. Возвращает расхождения
+        {ID медикамента: (Count, сумма по журналу)}."""
+        mismatches = {}
+        min_id, max_id = self.db.query(func.min(Medicine.id), func.max(Medicine.id)).one()
+        if min_id is None:
+            return mismatches
+        for start in range(min_id, max_id + 1, batch_size):
+            end = start + batch_size
+            ledger = (
+                select(StockMovement.Medicine, func.sum(StockMovement.Delta).label('Balance'))
+                .where(StockMovement.Medicine >= start, StockMovement.Medicine < end)
+                .group_by(StockMovement.Medicine)
+                .subquery()
+            )
+            balance = func.coalesce(ledger.c.Balance, 0)
+            rows = (
+                self.db.query(Medicine.id, Medicine.Count, balance)
+                .outerjoin(ledger, ledger.c.Medicine == Medicine.id)
+                .filter(Medicine.id >= start, Medicine.id < end, Medicine.Count != balance)
+                .all()
+            )
+            mismatches.update((medicine_id, (count, total)) for medicine_id, count, total in rows)
+            self.db.commit()
+        return mismatches
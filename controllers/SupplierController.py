@@ -1,12 +1,22 @@
 import sqlalchemy
+from sqlalchemy import or_
 from sqlalchemy.orm import Session, load_only
 from typing import Optional, Type
+from models.medicine import Medicine
+from models.shipment import Shipment
+from models.shipment_item import ShipmentItem
 from models.supplier import Supplier
+from core.cache import LRUCache
+from core.events import changes
+from core.pagination import keyset_page
 
 
 class SupplierController:
     def __init__(self, db_session: Session):
         self.db = db_session
+        # Кэш поставщика по id и списка для выпадающих списков, сбрасывается событиями об изменении поставщиков
+        self._cache = LRUCache.from_config()
+        changes.subscribe(Supplier.__tablename__, self._invalidate_cache)
 
     def create_supplier(self, supplier_data: dict) -> Supplier:
         """Создает нового поставщика."""
@@ -20,11 +30,12 @@ class SupplierController:
         self.db.add(supplier)
         self.db.commit()
         self.db.refresh(supplier)
+        changes.emit(Supplier.__tablename__, changes.INSERTED, [supplier.id])
         return supplier
 
     def get_supplier_by_id(self, supplier_id: int) -> Type[Supplier]:
         """Возвращает поставщика по ID или None, если не найден."""
-        supplier = self.db.get(Supplier, supplier_id)
+        supplier = self._cache.get_or_load(('supplier', supplier_id), lambda: self.db.get(Supplier, supplier_id))
         if supplier is None:
             raise ValueError("Supplier with ID {} not found".format(supplier_id))
         else: return supplier
@@ -41,6 +52,10 @@ class SupplierController:
             setattr(supplier, field, value)
         self.db.commit()
         self.db.refresh(supplier)
+        changes.emit(Supplier.__tablename__, changes.UPDATED, [supplier_id])
+        # Название поставщика отображается во вкладках медикаментов и поставок
+        changes.emit(Medicine.__tablename__, changes.RESET)
+        changes.emit(Shipment.__tablename__, changes.RESET)
         return supplier
 
     def delete_supplier(self, supplier_id: int) -> Type[Supplier] | None:
@@ -50,13 +65,79 @@ class SupplierController:
             raise ValueError("Supplier with ID {} not found".format(supplier_id))
         self.db.delete(supplier)
         self.db.commit()
+        changes.emit(Supplier.__tablename__, changes.DELETED, [supplier_id])
+        changes.emit(Medicine.__tablename__, changes.RESET)
+        changes.emit(Shipment.__tablename__, changes.RESET)
         return supplier
 
+    def delete_many(self, supplier_ids: list[int]) -> int:
+        """Удаляет поставщиков пакетом, как каскадные внешние ключи БД: у их медикаментов поставщик
+        сбрасывается (NULL), их поставки удаляются вместе с позициями (остатки не меняются).
+        Одна транзакция, по одному запросу на таблицу. Возвращает число удаленных поставщиков."""
+        supplier_ids = list({int(row_id) for row_id in supplier_ids})  # из таблиц GUI id могут прийти строками
+        if not supplier_ids:
+            return 0
+        shipments = self.db.query(Shipment.id).filter(Shipment.Supplier.in_(supplier_ids))
+        try:
+            self.db.query(Medicine).filter(Medicine.Supplier.in_(supplier_ids)).update(
+                {Medicine.Supplier: None}, synchronize_session=False)
+            self.db.query(ShipmentItem).filter(ShipmentItem.Shipment.in_(shipments.scalar_subquery())).delete(
+                synchronize_session=False)
+            self.db.query(Shipment).filter(Shipment.Supplier.in_(supplier_ids)).delete(synchronize_session=False)
+            deleted = self.db.query(Supplier).filter(Supplier.id.in_(supplier_ids)).delete(synchronize_session=False)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        changes.emit(Supplier.__tablename__, changes.DELETED, supplier_ids)
+        changes.emit(Medicine.__tablename__, changes.RESET)
+        changes.emit(Shipment.__tablename__, changes.RESET)
+        return deleted
+
     def get_all(self) -> list[Type[Supplier]]:
-        """Возвращает список всех поставщиков (с ограниченным набором полей)."""
-        return self.db.query(Supplier).options(
+        """Возвращает список всех поставщиков (с ограниченным набором полей), кэшируется."""
+        return self._cache.get_or_load('all', lambda: self.db.query(Supplier).options(
             load_only(Supplier.id, Supplier.CompName)
-        ).all()
+        ).all())
+
+    def _invalidate_cache(self, kind, ids):
+        if kind == changes.RESET:
+            self._cache.clear()
+        else:
+            self._cache.invalidate('all', *(('supplier', supplier_id) for supplier_id in ids))
+
+    def cache_stats(self) -> dict:
+        """Попадания и промахи кэша справочных данных (для мониторинга)."""
+        return self._cache.stats()
+
+    def get_page(self, limit: int = 100, after: tuple | None = None,
+                 sort_field: str = 'id', descending: bool = False) -> list[Type[Supplier]]:
+        """Возвращает страницу поставщиков после курсора after = (значение sort_field, id).
+        Сортировка выполняется в БД (ORDER BY sort_field, id), без OFFSET."""
+        if sort_field not in Supplier.__table__.columns:
+            raise ValueError("Unknown sort field {}".format(sort_field))
+        query = self.db.query(Supplier)
+        return keyset_page(query, getattr(Supplier, sort_field), Supplier.id, limit, after, descending)
+
+    def get_rows_by_ids(self, ids: list[int]) -> list[Type[Supplier]]:
+        """Возвращает поставщиков (как в get_page) только для указанных id."""
+        return self.db.query(Supplier).filter(Supplier.id.in_(ids)).all()
+
+    def search(self, text: str, limit: int = 50, offset: int = 0) -> list[int]:
+        """Поиск поставщиков по подстроке в названии, адресе, телефоне и ИНН.
+        Возвращает страницу id; каждое слово должно встретиться хотя бы в одном из полей."""
+        words = text.split()
+        if not words:
+            return []
+        query = (
+            self.db.query(Supplier.id)
+            .filter(*(or_(Supplier.CompName.ilike(f"%{word}%"),
+                          Supplier.Address.ilike(f"%{word}%"),
+                          Supplier.Number.ilike(f"%{word}%"),
+                          Supplier.INN.ilike(f"%{word}%")) for word in words))
+            .order_by(Supplier.id)
+        )
+        return [row.id for row in query.limit(limit).offset(offset).all()]
 
     def is_name_unique(self, name: str) -> bool:
         """Проверяет, уникален ли указанный CompName (True, если такого CompName нет в базе)."""
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+
+from core.config import Config
+
+
+class LRUCache:
+    """Кэш в памяти процесса: не больше max_size записей (вытесняется давно не использованная),
+    каждая запись живет ttl секунд. Потокобезопасен, считает попадания и промахи.
+    ttl <= 0 отключает кэш."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # ключ -> (значение, срок действия)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, section: str = "cache") -> "LRUCache":
+        """Кэш с размером и временем жизни из настроек ([cache] max_size, ttl)."""
+        return cls(max_size=Config.get_int(section, "max_size", 1024), ttl=Config.get_int(section, "ttl", 60))
+
+    def get_or_load(self, key, loader):
+        """Значение из кэша или, при промахе, результат loader(), который сохраняется в кэше."""
+        if self.ttl <= 0:
+            return loader()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        # Загрузка выполняется без блокировки: параллельный промах по тому же ключу просто загрузит еще раз
+        value = loader()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        """Удаляет записи с указанными ключами."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Счетчики для мониторинга: попадания, промахи, доля попаданий и число записей."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / total if total else 0.0, 'size': len(self._entries)}
@@ -0,0 +1,38 @@
+import configparser
+import os
+
+
+class Config:
+    """Настройки приложения для конкретной установки.
+    Источники по убыванию приоритета: переменные окружения APTEKA_<СЕКЦИЯ>_<КЛЮЧ>
+    (например, APTEKA_DATABASE_URL), файл apteka.ini (путь задается в APTEKA_CONFIG),
+    значения по умолчанию."""
+    _FILE = os.environ.get("APTEKA_CONFIG", "apteka.ini")
+    _parser = None
+
+    @classmethod
+    def _load(cls) -> configparser.ConfigParser:
+        if cls._parser is None:
+            cls._parser = configparser.ConfigParser()
+            cls._parser.read(cls._FILE, encoding="utf-8")
+        return cls._parser
+
+    @classmethod
+    def get(cls, section: str, key: str, default: str | None = None) -> str | None:
+        """Возвращает строковое значение настройки или default."""
+        env = os.environ.get(f"APTEKA_{section}_{key}".upper())
+        if env is not None:
+            return env
+        return cls._load().get(section, key, fallback=default)
+
+    @classmethod
+    def get_int(cls, section: str, key: str, default: int) -> int:
+        value = cls.get(section, key)
+        return default if value in (None, "") else int(value)
+
+    @classmethod
+    def get_bool(cls, section: str, key: str, default: bool) -> bool:
+        value = cls.get(section, key)
+        if value in (None, ""):
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
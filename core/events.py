@@ -0,0 +1,44 @@
+import threading
+import weakref
+
+
+class ChangeBus:
+    """Шина событий об изменениях таблиц БД.
+    Контроллеры после commit сообщают, какие id вставлены/изменены/удалены,
+    подписчики (модели вкладок) применяют только эти изменения, не перечитывая таблицу."""
+    INSERTED = 'inserted'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    RESET = 'reset'  # изменилось неизвестное множество строк – таблицу нужно перечитать
+
+    def __init__(self):
+        self._subscribers = {}  # имя таблицы -> список (слабых) ссылок на обработчики
+        self._lock = threading.Lock()
+
+    def subscribe(self, table: str, callback):
+        """Подписывает callback(kind, ids) на изменения таблицы.
+        Методы объектов хранятся по слабой ссылке, чтобы подписка не удерживала объект."""
+        ref = weakref.WeakMethod(callback) if hasattr(callback, '__self__') else (lambda: callback)
+        with self._lock:
+            self._subscribers.setdefault(table, []).append(ref)
+
+    def unsubscribe(self, table: str, callback):
+        with self._lock:
+            refs = self._subscribers.get(table, [])
+            self._subscribers[table] = [ref for ref in refs if ref() not in (None, callback)]
+
+    def emit(self, table: str, kind: str, ids=()):
+        """Сообщает подписчикам таблицы об изменении строк с указанными id."""
+        ids = list(ids)
+        with self._lock:
+            refs = list(self._subscribers.get(table, []))
+        for ref in refs:
+            callback = ref()
+            if callback is None:
+                self.unsubscribe(table, None)
+                continue
+            callback(kind, ids)
+
+
+# Общая шина приложения
+changes = ChangeBus()
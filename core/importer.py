@@ -0,0 +1,268 @@
+"""Массовая загрузка медикаментов и поставщиков из CSV (например, прайс-листа оптовика).
+
+    python -m core.importer medicines price.csv --supplier 3
+    python -m core.importer suppliers suppliers.csv
+    python -m core.importer prices new_prices.csv --key MName
+"""
+import argparse
+import csv
+from dataclasses import dataclass, field
+from itertools import islice
+
+from sqlalchemy import insert, literal, select
+from sqlalchemy.orm import Session
+
+from controllers.MedicineController import expiry_date
+from controllers.StockController import StockController
+from core.events import changes
+from models.medicine import Medicine
+from models.stock_movement import StockMovement
+from models.supplier import Supplier
+
+
+@dataclass
+class ImportResult:
+    """Итог загрузки: вставлено строк, пропущено строк и ошибки (номер строки файла, текст)."""
+    inserted: int = 0
+    skipped: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+
+class CsvImport:
+    """Загрузка CSV в таблицу модели. Файл читается генератором, строки проверяются и
+    вставляются порциями по chunk_size: на порцию – один запрос проверки уникальности
+    (IN по ключевому полю), одна пакетная вставка (executemany) и commit, поэтому память
+    не зависит от размера файла. Строки с ошибками и повторы пропускаются и попадают в отчет.
+    Колонки файла называются как поля модели, разделитель ';' (как у отчетов), кодировка UTF-8."""
+
+    model = None
+    key = None  # поле, уникальное в таблице
+    required = ()
+    lengths = {}  # максимальная длина строковых полей
+    integers = ()  # неотрицательные целые поля
+    max_errors = 1000  # сколько ошибок хранить в отчете
+
+    def __init__(self, db_session: Session, chunk_size: int = 5000, delimiter: str = ';'):
+        self.db = db_session
+        self.chunk_size = chunk_size
+        self.delimiter = delimiter
+
+    def count(self, path: str) -> int:
+        """Число строк данных в файле (для индикатора выполнения)."""
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            return max(sum(1 for _ in f) - 1, 0)
+
+    def read(self, path: str):
+        """Генератор (номер строки файла, словарь значений) по строкам CSV."""
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f, delimiter=self.delimiter)
+            missing = [name for name in self.required if name not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError("В файле нет колонок: {}".format(", ".join(missing)))
+            for row in reader:
+                yield reader.line_num, row
+
+    def validate(self, row: dict) -> dict:
+        """Приводит строку к значениям полей модели; ошибка – ValueError."""
+        values = {}
+        for name, column in self.model.__table__.columns.items():
+            if column.primary_key:
+                continue
+            value = (row.get(name) or '').strip()
+            if not value:
+                if name in self.required:
+                    raise ValueError("Не заполнено поле {}".format(name))
+                # В пакетной вставке у всех строк одинаковый набор полей: пустое – значение по умолчанию
+                values[name] = column.default.arg if column.default is not None and column.default.is_scalar else None
+                continue
+            if name in self.integers:
+                try:
+                    value = int(value)
+                except ValueError:
+                    raise ValueError("Поле {} должно быть целым числом".format(name))
+                if value < 0:
+                    raise ValueError("Поле {} не может быть меньше нуля".format(name))
+            elif len(value) > self.lengths.get(name, len(value)):
+                raise ValueError("Поле {} длиннее {} символов".format(name, self.lengths[name]))
+            values[name] = value
+        return values
+
+    def _existing(self, keys: set) -> set:
+        """Какие из ключей уже есть в таблице – один запрос на порцию."""
+        column = getattr(self.model, self.key)
+        return {key for key, in self.db.execute(select(column).where(column.in_(keys)))}
+
+    def _resolve(self, valid: list[tuple[int, dict]], result: ImportResult) -> list[tuple[int, dict]]:
+        """Дополнительная проверка порции запросами к БД (по одному на порцию)."""
+        return valid
+
+    def _insert(self, rows: list[dict]):
+        # render_nulls: строки с пустыми полями не разбиваются на отдельные группы INSERT
+        self.db.execute(insert(self.model).execution_options(render_nulls=True), rows)
+
+    def run(self, path: str, progress=None) -> ImportResult:
+        """Загружает файл. progress(обработано, всего) вызывается после каждой порции."""
+        result = ImportResult()
+        total = self.count(path) if progress is not None else 0
+        processed = 0
+        seen = set()  # ключи, уже загруженные из этого файла
+        lines = self.read(path)
+        while chunk := list(islice(lines, self.chunk_size)):
+            processed += len(chunk)
+            valid = []
+            for line, row in chunk:
+                try:
+                    valid.append((line, self.validate(row)))
+                except ValueError as e:
+                    self._error(result, line, str(e))
+            valid = self._resolve(valid, result)
+            existing = self._existing({values[self.key] for _, values in valid}) if valid else set()
+            rows = []
+            for line, values in valid:
+                key = values[self.key]
+                if key in existing or key in seen:
+                    self._error(result, line, "{} '{}' уже существует".format(self.key, key))
+                    continue
+                seen.add(key)
+                rows.append(values)
+            if rows:
+                try:
+                    self._insert(rows)
+                    self.db.commit()
+                except Exception:
+                    self.db.rollback()
+                    raise
+                result.inserted += len(rows)
+            if progress is not None:
+                progress(processed, max(total, processed))
+        if result.inserted:
+            changes.emit(self.model.__tablename__, changes.RESET)
+        return result
+
+    def _error(self, result: ImportResult, line: int, message: str):
+        result.skipped += 1
+        if len(result.errors) < self.max_errors:
+            result.errors.append((line, message))
+
+
+class SupplierImport(CsvImport):
+    """Поставщики: CompName, Address, Number, INN (все обязательные), LeadTime;
+    название (CompName) уникально, как в SupplierController."""
+
+    model = Supplier
+    key = 'CompName'
+    required = ('CompName', 'Address', 'Number', 'INN')
+    lengths = {'CompName': 100, 'Address': 100, 'Number': 20, 'INN': 20}
+    integers = ('LeadTime',)
+
+
+class MedicineImport(CsvImport):
+    """Медикаменты: MName, Price, Count (обязательные), Description, Category, BT (срок годности,
+    ГГГГ-ММ-ДД или ДД.ММ.ГГГГ), Supplier – название поставщика. Если задан supplier_id, все
+    строки относятся к этому поставщику (прайс-лист одного оптовика), колонка Supplier не нужна.
+    Название (MName) уникально, как в MedicineController; начальные остатки пишутся
+    в журнал движения."""
+
+    model = Medicine
+    key = 'MName'
+    required = ('MName', 'Price', 'Count')
+    lengths = {'MName': 100, 'Description': 255, 'Category': 50}
+    integers = ('Price', 'Count')
+
+    def __init__(self, db_session: Session, supplier_id: int | None = None, chunk_size: int = 5000,
+                 delimiter: str = ';'):
+        super().__init__(db_session, chunk_size, delimiter)
+        self.supplier_id = supplier_id
+        self._suppliers = {}  # название -> ID, загружается по мере встречи в файле
+
+    def validate(self, row: dict) -> dict:
+        supplier = (row.get('Supplier') or '').strip()
+        values = super().validate({**row, 'Supplier': None})
+        values['BT'] = expiry_date(values.get('BT'))
+        if self.supplier_id is not None:
+            values['Supplier'] = self.supplier_id
+        elif supplier:
+            values['Supplier'] = supplier  # название, заменяется на ID в _resolve_suppliers
+        else:
+            raise ValueError("Не заполнено поле Supplier")
+        return values
+
+    def _resolve(self, valid: list[tuple[int, dict]], result: ImportResult) -> list[tuple[int, dict]]:
+        """Названия поставщиков -> ID одним запросом на порцию (только еще не встречавшиеся);
+        строки с неизвестным поставщиком пропускаются."""
+        names = {values['Supplier'] for _, values in valid if isinstance(values['Supplier'], str)}
+        names -= self._suppliers.keys()
+        if names:
+            self._suppliers.update(dict(self.db.execute(
+                select(Supplier.CompName, Supplier.id).where(Supplier.CompName.in_(names))
+            ).all()))
+        resolved = []
+        for line, values in valid:
+            if isinstance(values['Supplier'], str):
+                if values['Supplier'] not in self._suppliers:
+                    self._error(result, line, "Поставщик '{}' не найден".format(values['Supplier']))
+                    continue
+                values['Supplier'] = self._suppliers[values['Supplier']]
+            resolved.append((line, values))
+        return resolved
+
+    def _insert(self, rows: list[dict]):
+        super()._insert(rows)
+        # Начальные остатки в журнал движения – одним INSERT ... SELECT по названиям порции
+        self.db.execute(insert(StockMovement).from_select(
+            ['Medicine', 'Delta', 'Reason'],
+            select(Medicine.id, Medicine.Count, literal(StockController.OPENING))
+            .where(Medicine.MName.in_([row['MName'] for row in rows]), Medicine.Count != 0),
+        ))
+
+
+def read_prices(path: str, key: str = 'MName', delimiter: str = ';') -> dict:
+    """Новые цены из CSV с колонками key (MName или id) и Price для
+    MedicineController.update_prices: {ключ: цена}. Ошибка в строке – ValueError с ее номером."""
+    prices = {}
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f, delimiter=delimiter)
+        if key not in (reader.fieldnames or []) or 'Price' not in reader.fieldnames:
+            raise ValueError("В файле должны быть колонки {} и Price".format(key))
+        for row in reader:
+            try:
+                value = (row[key] or '').strip()
+                prices[int(value) if key == 'id' else value] = int(row['Price'])
+            except (TypeError, ValueError):
+                raise ValueError("Строка {}: неверный {} или цена".format(reader.line_num, key))
+    return prices
+
+
+def main():
+    from controllers.MedicineController import MedicineController
+    from models.base import session
+    parser = argparse.ArgumentParser(description="Загрузка медикаментов или поставщиков из CSV")
+    parser.add_argument('table', choices=['medicines', 'suppliers', 'prices'])
+    parser.add_argument('path')
+    parser.add_argument('--supplier', type=int, help="ID поставщика для всех медикаментов файла")
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--delimiter', default=';')
+    parser.add_argument('--key', choices=MedicineController.PRICE_KEYS, default='MName',
+                        help="prices: по какому полю искать медикамент")
+    options = parser.parse_args()
+
+    if options.table == 'prices':
+        result = MedicineController(session).update_prices(
+            read_prices(options.path, options.key, options.delimiter), key=options.key)
+        print(f"получено {result.received}, найдено {result.matched}, изменено {result.changed}")
+        if result.unknown:
+            print("не найдены: " + ", ".join(map(str, result.unknown)))
+        return
+
+    if options.table == 'medicines':
+        importer = MedicineImport(session, options.supplier, options.chunk_size, options.delimiter)
+    else:
+        importer = SupplierImport(session, options.chunk_size, options.delimiter)
+    result = importer.run(options.path, lambda done, total: print(f"\r{done}/{total}", end='', flush=True))
+    print(f"\nзагружено {result.inserted}, пропущено {result.skipped}")
+    for line, message in result.errors:
+        print(f"строка {line}: {message}")
+
+
+if __name__ == '__main__':
+    main()
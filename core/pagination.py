@@ -0,0 +1,34 @@
+from sqlalchemy import and_, or_
+
+
+def keyset_filter(sort_column, id_column, after: tuple, descending: bool = False):
+    """Условие «строки после курсора» для сортировки по паре (sort_column, id).
+    after – кортеж (значение поля сортировки, id) последней загруженной строки.
+    NULL считается меньше любого значения (так сортируют и MySQL, и SQLite)."""
+    last_value, last_id = after
+    if sort_column is id_column:
+        return id_column < last_id if descending else id_column > last_id
+    if descending:
+        # При обратной сортировке NULL-значения идут в самом конце
+        if last_value is None:
+            return and_(sort_column.is_(None), id_column < last_id)
+        return or_(sort_column < last_value,
+                   and_(sort_column == last_value, id_column < last_id),
+                   sort_column.is_(None))
+    if last_value is None:
+        return or_(sort_column.isnot(None),
+                   and_(sort_column.is_(None), id_column > last_id))
+    return or_(sort_column > last_value,
+               and_(sort_column == last_value, id_column > last_id))
+
+
+def keyset_page(query, sort_column, id_column, limit: int, after: tuple | None = None, descending: bool = False):
+    """Возвращает одну страницу запроса, отсортированного по (sort_column, id) через ORDER BY.
+    В отличие от OFFSET, стоимость выборки не растет с номером страницы."""
+    if after is not None:
+        query = query.filter(keyset_filter(sort_column, id_column, after, descending))
+    if descending:
+        order = [sort_column.desc(), id_column.desc()] if sort_column is not id_column else [id_column.desc()]
+    else:
+        order = [sort_column.asc(), id_column.asc()] if sort_column is not id_column else [id_column.asc()]
+    return query.order_by(*order).limit(limit).all()
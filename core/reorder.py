@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+from itertools import chain
+
+import numpy as np
+from sqlalchemy import and_, false, func, or_, select
+from sqlalchemy.orm import Session
+
+from core.config import Config
+from models.medicine import Medicine
+from models.order import Order
+from models.shipment import Shipment
+from models.shipment_item import ShipmentItem
+from models.supplier import Supplier
+
+
+def _int_array(rows, width: int) -> np.ndarray:
+    """Строки результата запроса (целые числа) -> массив формы (len(rows), width)."""
+    return np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=len(rows) * width).reshape(-1, width)
+
+
+class ReorderEngine:
+    """Автоматический заказ у поставщиков.
+    По остатку (Medicine.Count), скорости продаж за последние window_days дней и сроку поставки
+    поставщика (Supplier.LeadTime) считает, сколько заказать, сразу для всего каталога (массивы NumPy):
+    медикамент заказывается, когда остатка с учетом еще не принятых поставок хватит меньше чем на
+    срок поставки + safety_days, – до запаса на срок поставки + safety_days + review_days.
+    Непринятыми считаются черновики поставок не старше срока поставки их поставщика: более старые
+    черновики считаются брошенными. Результат – черновики поставок (Status=False) по одной на поставщика через ShipmentController."""
+
+    def __init__(self, db_session: Session, shipment_controller, window_days: int | None = None,
+                 review_days: int | None = None, safety_days: int | None = None):
+        self.db = db_session
+        self.shipments = shipment_controller
+        # Явно переданный 0 – значение, а не «не задано»
+        self.window_days = window_days if window_days is not None else Config.get_int("reorder", "window_days", 30)
+        self.review_days = review_days if review_days is not None else Config.get_int("reorder", "review_days", 14)
+        self.safety_days = safety_days if safety_days is not None else Config.get_int("reorder", "safety_days", 7)
+        if self.window_days <= 0:
+            raise ValueError("window_days must be positive")
+
+    def _load(self, today: date):
+        """Каталог одним запросом на каждую величину: (id, поставщик, остаток), продано за окно,
+        в непринятых поставках, сроки поставки. Возвращает массивы, выровненные по id медикамента."""
+        ids, suppliers, counts = _int_array(self.db.execute(
+            select(Medicine.id, Medicine.Supplier, Medicine.Count)
+            .where(Medicine.Supplier.isnot(None))
+            .order_by(Medicine.id)
+        ).all(), 3).T
+
+        def per_medicine(rows):
+            # {ID медикамента: значение} -> массив в порядке ids (0 для отсутствующих)
+            values = np.zeros(len(ids), dtype=np.int64)
+            if rows:
+                keys, amounts = _int_array(rows, 2).T
+                positions = np.searchsorted(ids, keys)
+                found = (positions < len(ids)) & (ids[np.minimum(positions, len(ids) - 1)] == keys)
+                values[positions[found]] = amounts[found]
+            return values
+
+        sold = per_medicine(self.db.execute(
+            select(Order.Medicine, func.sum(Order.Amount))
+            .where(Order.DateReg >= today - timedelta(days=self.window_days), Order.DateReg < today)
+            .group_by(Order.Medicine)
+        ).all())
+        lead = dict(self.db.execute(select(Supplier.id, Supplier.LeadTime)).all())
+        # Черновик учитывается, пока не старше срока поставки своего поставщика;
+        # условие – по одному на каждый встречающийся срок (их немного)
+        recent_draft = or_(false(), *(
+            and_(Supplier.LeadTime == lead_time, Shipment.DateReg >= today - timedelta(days=lead_time))
+            for lead_time in set(lead.values())
+        ))
+        on_order = per_medicine(self.db.execute(
+            select(ShipmentItem.Medicine, func.sum(ShipmentItem.Quantity))
+            .join(Shipment, ShipmentItem.Shipment == Shipment.id)
+            .join(Supplier, Shipment.Supplier == Supplier.id)
+            .where(Shipment.Status.is_(False), recent_draft)
+            .group_by(ShipmentItem.Medicine)
+        ).all())
+        supplier_ids, supplier_index = np.unique(suppliers, return_inverse=True)
+        lead_times = np.array([lead.get(int(supplier), 0) for supplier in supplier_ids], dtype=np.int64)[supplier_index]
+        return ids, suppliers, counts, sold, on_order, lead_times
+
+    def quantities(self, counts, sold, on_order, lead_times) -> np.ndarray:
+        """Количество к заказу по каждому медикаменту (0 – заказывать не нужно)."""
+        velocity = sold / self.window_days
+        cover = counts + on_order
+        reorder_point = velocity * (lead_times + self.safety_days)
+        target = velocity * (lead_times + self.safety_days + self.review_days)
+        need = np.ceil(target - cover).astype(np.int64)
+        return np.where((velocity > 0) & (cover <= reorder_point) & (need > 0), need, 0)
+
+    def plan(self, today: date | None = None) -> dict[int, list[tuple[int, int]]]:
+        """Что заказать: {ID поставщика: [(ID медикамента, количество), ...]}."""
+        ids, suppliers, counts, sold, on_order, lead_times = self._load(today or date.today())
+        quantities = self.quantities(counts, sold, on_order, lead_times)
+        selected = np.nonzero(quantities)[0]
+        # Группировка по поставщику: сортировка и разбиение по границам групп
+        selected = selected[np.argsort(suppliers[selected], kind='stable')]
+        groups = np.split(selected, np.nonzero(np.diff(suppliers[selected]))[0] + 1) if len(selected) else []
+        return {int(suppliers[group[0]]): list(zip(ids[group].tolist(), quantities[group].tolist()))
+                for group in groups}
+
+    def run(self, employee_id: int, today: date | None = None) -> list[int]:
+        """Создает черновики поставок по плану, по одной на поставщика. Возвращает их ID."""
+        today = today or date.today()
+        shipment_ids = []
+        for supplier_id, items in self.plan(today).items():
+            shipment = self.shipments.create_shipment(
+                {'Supplier': supplier_id, 'Employee': employee_id, 'DateReg': today, 'Status': False},
+                [{'id': medicine_id, 'Count': quantity} for medicine_id, quantity in items],
+            )
+            shipment_ids.append(shipment.id)
+        return shipment_ids
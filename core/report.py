@@ -0,0 +1,94 @@
+import csv
+from datetime import date
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.employee import Employee
+from models.medicine import Medicine
+from models.order import Order
+
+
+class OrderReport:
+    """Отчет по заказам: заказ, сотрудник, медикамент, цена, количество и стоимость (цена * количество).
+    Цена – сохраненная в заказе цена продажи (у старых заказов без нее – текущая цена медикамента),
+    как в сводке продаж (SalesController).
+    Строки читаются из БД потоком порциями по chunk_size (серверный курсор, yield_per) и сразу
+    записываются в файл, поэтому выгрузка за любой период занимает постоянный объем памяти."""
+
+    HEADERS = ['Номер', 'Дата', 'Сотрудник', 'Лекарство', 'Цена', 'Количество', 'Стоимость', 'Статус']
+    STATUS = {True: 'Выполнено', False: 'В ожидании'}
+
+    def __init__(self, db_session: Session, date_from: date | None = None, date_to: date | None = None,
+                 chunk_size: int = 1000):
+        self.db = db_session
+        self.date_from = date_from
+        self.date_to = date_to
+        self.chunk_size = chunk_size
+
+    def _conditions(self) -> list:
+        conditions = []
+        if self.date_from is not None:
+            conditions.append(Order.DateReg >= self.date_from)
+        if self.date_to is not None:
+            conditions.append(Order.DateReg <= self.date_to)
+        return conditions
+
+    def count(self) -> int:
+        """Число заказов в отчете (для индикатора выполнения)."""
+        return self.db.execute(select(func.count(Order.id)).where(*self._conditions())).scalar_one()
+
+    def rows(self):
+        """Генератор строк отчета (кортежи в порядке HEADERS) по возрастанию id заказа."""
+        price = func.coalesce(Order.Price, Medicine.Price)
+        statement = (
+            select(Order.id, Order.DateReg, Employee.LName + ' ' + Employee.FName, Medicine.MName,
+                   price, Order.Amount, price * Order.Amount, Order.Status)
+            .outerjoin(Employee, Order.Employee == Employee.id)
+            .outerjoin(Medicine, Order.Medicine == Medicine.id)
+            .where(*self._conditions())
+            .order_by(Order.id)
+            .execution_options(yield_per=self.chunk_size)
+        )
+        for row in self.db.execute(statement):
+            yield (*row[:7], self.STATUS.get(row[7], ''))
+
+    def _write(self, write_row, progress=None) -> int:
+        total = self.count() if progress is not None else 0
+        written = 0
+        for row in self.rows():
+            write_row(row)
+            written += 1
+            if progress is not None and written % self.chunk_size == 0:
+                progress(written, total)
+        if progress is not None:
+            progress(written, max(total, written))
+        return written
+
+    def write_csv(self, path: str, progress=None) -> int:
+        """Записывает отчет в CSV (разделитель ';', UTF-8 с BOM – открывается в Excel).
+        progress(записано, всего) вызывается после каждой порции. Возвращает число строк."""
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(self.HEADERS)
+            return self._write(writer.writerow, progress)
+
+    def write_xlsx(self, path: str, progress=None) -> int:
+        """Записывает отчет в XLSX (openpyxl в режиме write_only: строки сразу уходят во временный
+        файл, а не копятся в памяти). Возвращает число строк."""
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ValueError("Для выгрузки в XLSX установите пакет openpyxl")
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Заказы")
+        sheet.append(self.HEADERS)
+        written = self._write(sheet.append, progress)
+        workbook.save(path)
+        return written
+
+    def export(self, path: str, progress=None) -> int:
+        """Записывает отчет в CSV или XLSX в зависимости от расширения файла."""
+        if path.lower().endswith('.xlsx'):
+            return self.write_xlsx(path, progress)
+        return self.write_csv(path, progress)
@@ -1,4 +1,8 @@
+import hashlib
+import hmac
 import os
+import threading
+import time
 from pathlib import Path
 from cryptography.fernet import Fernet
 from cryptography.hazmat.backends import default_backend
@@ -6,6 +10,111 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 
+from core.config import Config
+
+
+class PasswordHasher:
+    """Хеширование паролей scrypt с солью и настраиваемой стоимостью.
+    Формат хранимого значения: scrypt$<n>$<r>$<p>$<соль base64>$<хеш base64>."""
+    PREFIX = "scrypt"
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1, salt_size: int = 16, key_size: int = 32):
+        self.n, self.r, self.p = n, r, p
+        self.salt_size = salt_size
+        self.key_size = key_size
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int, key_size: int) -> bytes:
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=128 * n * r * p + 1024 * 1024, dklen=key_size)
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(self.salt_size)
+        key = self._derive(password, salt, self.n, self.r, self.p, self.key_size)
+        return "$".join((self.PREFIX, str(self.n), str(self.r), str(self.p),
+                         base64.b64encode(salt).decode(), base64.b64encode(key).decode()))
+
+    @classmethod
+    def is_hash(cls, stored: str) -> bool:
+        return stored.startswith(cls.PREFIX + "$")
+
+    @staticmethod
+    def _parse(stored: str):
+        _, n, r, p, salt, key = stored.split("$")
+        return int(n), int(r), int(p), base64.b64decode(salt), base64.b64decode(key)
+
+    def verify(self, password: str, stored: str) -> bool:
+        """Проверяет пароль по хешу; сравнение выполняется за постоянное время.
+        Поврежденный хеш (в том числе с недопустимыми параметрами scrypt) – False."""
+        try:
+            n, r, p, salt, key = self._parse(stored)
+            derived = self._derive(password, salt, n, r, p, len(key))
+        except ValueError:
+            return False
+        return hmac.compare_digest(derived, key)
+
+    def needs_rehash(self, stored: str) -> bool:
+        """True для значений не в формате scrypt (Fernet) и для хешей с другой стоимостью."""
+        if not self.is_hash(stored):
+            return True
+        try:
+            n, r, p, salt, key = self._parse(stored)
+        except ValueError:
+            return True
+        return (n, r, p, len(salt), len(key)) != (self.n, self.r, self.p, self.salt_size, self.key_size)
+
+
+class CredentialCache:
+    """Кеш успешных проверок пароля в памяти процесса, с временем жизни ttl секунд.
+    Хранит не пароль, а HMAC от пароля на случайном ключе процесса, привязанный к хешу из БД:
+    после смены пароля (другой хеш) запись перестает совпадать. ttl <= 0 отключает кеш."""
+
+    def __init__(self, ttl: float = 300, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._key = os.urandom(32)
+        self._entries = {}  # логин -> (отпечаток, срок действия)
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, password: str, stored: str) -> bytes:
+        return hmac.new(self._key, stored.encode() + b"\0" + password.encode(), hashlib.sha256).digest()
+
+    def check(self, login: str, password: str, stored: str) -> bool:
+        """True, если этот пароль для этого хеша уже проверялся и запись не устарела."""
+        if self.ttl <= 0:
+            return False
+        fingerprint = self._fingerprint(password, stored)
+        with self._lock:
+            entry = self._entries.get(login)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[login]
+                entry = None
+            found = entry is not None and hmac.compare_digest(entry[0], fingerprint)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found
+
+    def remember(self, login: str, password: str, stored: str):
+        if self.ttl <= 0:
+            return
+        fingerprint = self._fingerprint(password, stored)
+        with self._lock:
+            if len(self._entries) >= self.max_size and login not in self._entries:
+                # Вытесняем запись, срок которой истекает раньше всех
+                del self._entries[min(self._entries, key=lambda k: self._entries[k][1])]
+            self._entries[login] = (fingerprint, time.monotonic() + self.ttl)
+
+    def forget(self, login: str | None = None):
+        """Удаляет запись логина (None – очищает кеш)."""
+        with self._lock:
+            if login is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(login, None)
+
 
 class Security:
     # Конфигурация
@@ -13,6 +122,11 @@ class Security:
     _SALT_FILE = "encryption.salt"
     _ITERATIONS = 100_000
     _cipher = None
+    # Хеширование паролей сотрудников; Fernet остается только для чтения старых значений Pass
+    hasher = PasswordHasher(n=Config.get_int("security", "scrypt_n", 2 ** 14),
+                            r=Config.get_int("security", "scrypt_r", 8),
+                            p=Config.get_int("security", "scrypt_p", 1))
+    credentials = CredentialCache(ttl=Config.get_int("security", "credential_cache_ttl", 300))
 
     @classmethod
     def initialize(cls):
@@ -82,13 +196,21 @@ class Security:
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        """Алиас для шифрования пароля"""
-        return Security.encrypt_password(password)
+        """Возвращает соленый хеш пароля (scrypt)"""
+        return Security.hasher.hash(password)
+
+    @staticmethod
+    def verify_password(password: str, stored: str) -> bool:
+        """Проверяет пароль по хешу или, для старых записей, по зашифрованной Fernet версии"""
+        if PasswordHasher.is_hash(stored):
+            return Security.hasher.verify(password, stored)
+        decrypted = Security.decrypt_password(stored)
+        return bool(decrypted) and hmac.compare_digest(decrypted.encode(), password.encode())
 
     @staticmethod
-    def verify_password(password: str, encrypted: str) -> bool:
-        """Проверяет совпадение пароля с зашифрованной версией"""
-        return password == Security.decrypt_password(encrypted)
+    def needs_rehash(stored: str) -> bool:
+        """Нужно ли после успешного входа перезаписать Pass новым хешем"""
+        return Security.hasher.needs_rehash(stored)
 
     @classmethod
     def rotate_key(cls, new_password: str = None):
@@ -0,0 +1,45 @@
+import functools
+from contextlib import contextmanager
+
+from sqlalchemy.orm import scoped_session
+
+
+@contextmanager
+def unit_of_work(registry: scoped_session):
+    """Единица работы над сессией текущего потока из registry (scoped_session).
+    При ошибке выполняется rollback; по завершении внешней единицы работы сессия
+    закрывается и удаляется из реестра, поэтому identity map не растет, а соединение
+    возвращается в пул. Вложенные единицы работы используют сессию внешней."""
+    outermost = not registry.registry.has()
+    db = registry()
+    try:
+        yield db
+        if outermost:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if outermost:
+            registry.remove()
+
+
+class UnitOfWorkController:
+    """Обертка над контроллером, созданным со scoped_session:
+    каждый вызов публичного метода – отдельная единица работы в сессии своего потока,
+    поэтому один экземпляр можно вызывать и из GUI, и из пула потоков."""
+
+    def __init__(self, ctrl):
+        self.ctrl = ctrl
+        self.registry = ctrl.db
+
+    def __getattr__(self, name):
+        attr = getattr(self.ctrl, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            with unit_of_work(self.registry):
+                return attr(*args, **kwargs)
+        return call
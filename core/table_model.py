@@ -0,0 +1,247 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QThreadPool, pyqtSignal
+
+from core.events import changes
+from core.workers import SearchWorker
+
+
+class PagedTableModel(QAbstractTableModel):
+    """Ленивая модель таблицы: строки подгружаются страницами через ctrl.get_page()
+    по мере прокрутки (canFetchMore/fetchMore), сортировка выполняется в БД.
+    Если указана таблица БД, модель подписывается на события контроллеров
+    и применяет только измененные строки (ctrl.get_rows_by_ids())."""
+
+    # События могут прийти из другого потока – обрабатываем их в потоке модели
+    _changed = pyqtSignal(str, list)
+
+    def __init__(self, ctrl, fields, headers, formatter, page_size=200, table=None,
+                 async_search=False, parent=None):
+        super().__init__(parent)
+        self.ctrl = ctrl
+        self.fields = fields
+        self.headers = headers
+        self.formatter = formatter  # formatter(row, field) -> str
+        self.page_size = page_size
+        self.sort_field = 'id'
+        self.descending = False
+        self.search_text = None  # пока задан – показываются результаты ctrl.search() по релевантности
+        self.filters = None  # спецификация фильтра, которую контроллер превращает в WHERE
+        # Сколько id результатов поиска уже запрошено (смещение следующей страницы). Не равно
+        # числу строк: get_rows_by_ids отбрасывает строки, не прошедшие фильтр или уже удаленные
+        self._search_offset = 0
+        # Фоновый поиск (ctrl должен быть потокобезопасным, см. core.session.UnitOfWorkController):
+        # каждый новый запрос получает свое поколение, ответы старых отбрасываются
+        self.async_search = async_search
+        self._generation = 0
+        self._pending = {}
+        self._rows = []
+        self._exhausted = False
+        if table is not None:
+            self._changed.connect(self.apply_change)
+            changes.subscribe(table, self._on_change)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.fields)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        field = self.fields[index.column()]
+        if role == Qt.DisplayRole:
+            return self.formatter(row, field)
+        if role == Qt.UserRole:
+            return getattr(row, field, None)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        if self.search_text is not None:
+            ids = self.ctrl.search(self.search_text, self.page_size, self._search_offset)
+            self._search_offset += len(ids)
+            found = {row.id: row for row in self._get_rows_by_ids(ids)} if ids else {}
+            rows = [found[row_id] for row_id in ids if row_id in found]
+            if len(ids) < self.page_size:
+                self._exhausted = True
+        else:
+            after = None
+            if self._rows:
+                last = self._rows[-1]
+                after = (getattr(last, self.sort_field), last.id)
+            rows = self.ctrl.get_page(self.page_size, after, self.sort_field, self.descending,
+                                      **self._filter_options())
+            if len(rows) < self.page_size:
+                self._exhausted = True
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        field = self.fields[column]
+        descending = order == Qt.DescendingOrder
+        if (field, descending) == (self.sort_field, self.descending) and self._rows:
+            return
+        self.sort_field = field
+        self.descending = descending
+        self.reload()
+
+    def _filter_options(self):
+        return {'filters': self.filters} if self.filters is not None else {}
+
+    def _get_rows_by_ids(self, ids):
+        return self.ctrl.get_rows_by_ids(ids, **self._filter_options())
+
+    def set_filters(self, filters):
+        """Применяет фильтр в БД (None – без фильтра) и перечитывает таблицу."""
+        self.filters = filters
+        self.reload()
+
+    def set_search(self, text):
+        """Показывает результаты поиска в БД (страницами) или, при пустом тексте, всю таблицу."""
+        self.search_text = text or None
+        self.reload()
+
+    def search_async(self, text):
+        """Запускает поиск в пуле потоков: найденные строки добавляются в модель порциями,
+        GUI при этом не блокируется. Незавершенный предыдущий поиск отменяется."""
+        text = text.strip()
+        if not text or not self.async_search:
+            self.set_search(text)
+            return
+        self._generation += 1
+        self.beginResetModel()
+        self.search_text = text
+        self._rows = []
+        self._search_offset = 0
+        self._exhausted = True  # до окончания фонового поиска fetchMore не вызывается
+        self.endResetModel()
+        worker = SearchWorker(self._generation, self.ctrl, text, self.page_size,
+                              row_options=self._filter_options(),
+                              is_current=lambda generation: generation == self._generation)
+        worker.signals.chunk.connect(self._on_search_chunk)
+        worker.signals.finished.connect(self._on_search_finished)
+        worker.signals.error.connect(self._on_search_error)
+        self._pending[self._generation] = worker.signals
+        QThreadPool.globalInstance().start(worker)
+
+    def _on_search_chunk(self, generation, rows):
+        if generation != self._generation or not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def _on_search_finished(self, generation, more):
+        self._pending.pop(generation, None)
+        if generation == self._generation:
+            # Следующие страницы результатов догружаются обычным fetchMore – после первой
+            # страницы id, которую запросил SearchWorker (limit = page_size от начала)
+            self._search_offset = self.page_size
+            self._exhausted = not more
+
+    def _on_search_error(self, generation, message):
+        if generation == self._generation:
+            print(f"Ошибка поиска: {message}")
+
+    def reload(self):
+        """Сбрасывает загруженные строки и запрашивает первую страницу заново."""
+        self._generation += 1
+        self.beginResetModel()
+        self._rows = []
+        self._search_offset = 0
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def _on_change(self, kind, ids):
+        self._changed.emit(kind, ids)
+
+    def _sort_key(self, row):
+        value = getattr(row, self.sort_field)
+        # NULL идет раньше любых значений, как в ORDER BY
+        return (0, 0, row.id) if value is None else (1, value, row.id)
+
+    def _position_for(self, row):
+        """Позиция строки среди загруженных с учетом текущей сортировки
+        или None, если строка лежит за пределами загруженного окна (ее догрузит fetchMore)."""
+        key = self._sort_key(row)
+        for i, loaded in enumerate(self._rows):
+            loaded_key = self._sort_key(loaded)
+            if (key > loaded_key) if self.descending else (key < loaded_key):
+                return i
+        return len(self._rows) if self._exhausted else None
+
+    def _remove_row(self, position):
+        self.beginRemoveRows(QModelIndex(), position, position)
+        del self._rows[position]
+        self.endRemoveRows()
+
+    def _insert_row(self, row):
+        position = self._position_for(row)
+        # В результатах поиска новые строки не появляются – порядок задает релевантность
+        if position is None or self.search_text is not None:
+            return
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._rows.insert(position, row)
+        self.endInsertRows()
+
+    def apply_change(self, kind, ids):
+        """Применяет событие об изменении строк: вставляет, обновляет или удаляет только их."""
+        if kind == changes.RESET:
+            self.reload()
+            return
+        # row.id – целое; id в событии могут прийти строками (например, из текста ячеек)
+        ids = {int(row_id) for row_id in ids}
+        if not ids:
+            return
+        fresh = {} if kind == changes.DELETED else {row.id: row for row in self._get_rows_by_ids(list(ids))}
+        for position in reversed(range(len(self._rows))):
+            row_id = self._rows[position].id
+            if row_id not in ids:
+                continue
+            ids.discard(row_id)
+            row = fresh.get(row_id)
+            if row is None:
+                self._remove_row(position)
+                continue
+            # Обновление на месте, если позиция в сортировке не изменилась
+            old = self._rows.pop(position)
+            new_position = self._position_for(row)
+            self._rows.insert(position, old)
+            if new_position == position or self._sort_key(old) == self._sort_key(row) \
+                    or self.search_text is not None:
+                self._rows[position] = row
+                self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.fields) - 1))
+            else:
+                self._remove_row(position)
+                self._insert_row(row)
+        # Строки, которых еще не было среди загруженных
+        for row_id in ids:
+            if row_id in fresh:
+                self._insert_row(fresh[row_id])
+
+    def row_values(self, row):
+        """Отображаемые значения всех колонок строки."""
+        return [self.data(self.index(row, col)) for col in range(len(self.fields))]
+
+
+class SqlSortProxyModel(QSortFilterProxyModel):
+    """Прокси, который не сортирует сам, а передает сортировку исходной модели (в SQL)."""
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
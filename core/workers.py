@@ -0,0 +1,163 @@
+import functools
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from core.session import unit_of_work
+
+
+class SearchWorkerSignals(QObject):
+    chunk = pyqtSignal(int, list)     # поколение запроса, порция найденных строк
+    finished = pyqtSignal(int, bool)  # поколение запроса, есть ли еще результаты
+    error = pyqtSignal(int, str)
+
+
+class SearchWorker(QRunnable):
+    """Выполняет ctrl.search() в пуле потоков и отдает найденные строки порциями через сигналы.
+    ctrl должен работать через scoped_session (например, UnitOfWorkController) – тогда
+    запросы идут в сессии потока пула. Между порциями проверяет is_current(generation)
+    и прекращает работу, если пользователь уже ввел новый запрос."""
+
+    def __init__(self, generation, ctrl, text, limit, chunk_size=50, row_options=None,
+                 is_current=lambda generation: True):
+        super().__init__()
+        self.generation = generation
+        self.ctrl = ctrl
+        self.text = text
+        self.limit = limit
+        self.chunk_size = chunk_size
+        self.row_options = row_options or {}
+        self.is_current = is_current
+        self.signals = SearchWorkerSignals()
+
+    def run(self):
+        more = False
+        try:
+            if not self.is_current(self.generation):
+                return
+            ids = self.ctrl.search(self.text, self.limit, 0)
+            for start in range(0, len(ids), self.chunk_size):
+                if not self.is_current(self.generation):
+                    return
+                part = ids[start:start + self.chunk_size]
+                found = {row.id: row for row in self.ctrl.get_rows_by_ids(part, **self.row_options)}
+                self.signals.chunk.emit(self.generation, [found[row_id] for row_id in part if row_id in found])
+            more = len(ids) == self.limit
+        except Exception as e:
+            self.signals.error.emit(self.generation, str(e))
+        finally:
+            # finished приходит всегда, в том числе для отмененного запроса
+            self.signals.finished.emit(self.generation, more)
+
+
+class ControllerCallSignals(QObject):
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)  # исключение, возникшее в методе контроллера
+
+
+class ControllerCall(QRunnable):
+    """Вызывает метод контроллера в потоке пула. Сессию потока и границы
+    единицы работы обеспечивает сам контроллер (UnitOfWorkController)."""
+
+    def __init__(self, ctrl, method, args, kwargs):
+        super().__init__()
+        self.ctrl = ctrl
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = ControllerCallSignals()
+
+    def run(self):
+        try:
+            result = getattr(self.ctrl, self.method)(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.error.emit(e)
+        else:
+            self.signals.result.emit(result)
+
+
+class AsyncController:
+    """Асинхронный фасад над контроллером: любой его метод выполняется в пуле потоков,
+    результат приходит в поток GUI через сигнал.
+
+        medicines = AsyncController(UnitOfWorkController(MedicineController(session)))
+        medicines.get_medicine_by_id(5, on_result=self.show_price, on_error=self.show_error)
+    """
+
+    def __init__(self, ctrl, pool=None):
+        self.ctrl = ctrl
+        self.pool = pool or QThreadPool.globalInstance()
+        self._pending = set()  # сигналы незавершенных вызовов, чтобы их не собрал сборщик мусора
+
+    def call(self, method, *args, on_result=None, on_error=None, **kwargs):
+        """Ставит вызов ctrl.method(*args, **kwargs) в очередь пула потоков."""
+        if not callable(getattr(self.ctrl, method, None)):
+            raise AttributeError(f"{type(self.ctrl).__name__} не имеет метода {method}")
+        task = ControllerCall(self.ctrl, method, args, kwargs)
+        signals = task.signals
+        self._pending.add(signals)
+        if on_result is not None:
+            signals.result.connect(on_result)
+        if on_error is not None:
+            signals.error.connect(on_error)
+        else:
+            signals.error.connect(lambda e: print(f"Ошибка {method}: {e}"))
+        signals.result.connect(lambda _: self._pending.discard(signals))
+        signals.error.connect(lambda _: self._pending.discard(signals))
+        self.pool.start(task)
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+        return functools.partial(self.call, method)
+
+
+class ReportWorkerSignals(QObject):
+    progress = pyqtSignal(int, int)  # записано строк, всего строк
+    finished = pyqtSignal(str, int)  # путь к файлу, число строк
+    error = pyqtSignal(str)
+
+
+class ReportWorker(QRunnable):
+    """Выгружает отчет (core.report.OrderReport) в файл в потоке пула, сообщая о ходе выполнения.
+    Отчет должен работать через scoped_session – чтение идет в единице работы потока пула."""
+
+    def __init__(self, report, path):
+        super().__init__()
+        self.report = report
+        self.path = path
+        self.signals = ReportWorkerSignals()
+
+    def run(self):
+        try:
+            with unit_of_work(self.report.db):
+                written = self.report.export(self.path, self.signals.progress.emit)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(self.path, written)
+
+
+class ImportWorkerSignals(QObject):
+    progress = pyqtSignal(int, int)  # обработано строк, всего строк
+    finished = pyqtSignal(object)    # core.importer.ImportResult
+    error = pyqtSignal(str)
+
+
+class ImportWorker(QRunnable):
+    """Загружает CSV (core.importer.CsvImport) в потоке пула, сообщая о ходе выполнения.
+    Загрузчик должен работать через scoped_session, как и отчеты (см. ReportWorker)."""
+
+    def __init__(self, importer, path):
+        super().__init__()
+        self.importer = importer
+        self.path = path
+        self.signals = ImportWorkerSignals()
+
+    def run(self):
+        try:
+            with unit_of_work(self.importer.db):
+                result = self.importer.run(self.path, self.signals.progress.emit)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
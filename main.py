@@ -5,18 +5,23 @@ from PyQt5.QtWidgets import (
     QTabWidget, QTableView, QMessageBox, QCheckBox,
     QFormLayout, QDateEdit, QSizePolicy, QHeaderView,
     QAbstractItemView, QComboBox, QLabel, QTableWidget,
-    QSpinBox, QTableWidgetItem, QDialogButtonBox
+    QSpinBox, QTableWidgetItem, QDialogButtonBox, QFileDialog,
+    QProgressDialog
 )
-from PyQt5.QtCore import Qt, QSortFilterProxyModel, QRegExp, QDate
-from PyQt5.QtGui import QRegExpValidator, QStandardItemModel, QStandardItem, QIntValidator, QColor, QBrush
+from PyQt5.QtCore import Qt, QRegExp, QDate, QTimer, QThreadPool
+from PyQt5.QtGui import QRegExpValidator, QIntValidator, QColor, QBrush
 from controllers.EmployeeController import EmployeeController
-from controllers.MedicineController import MedicineController
+from controllers.MedicineController import MedicineController, MedicineFilter
 from controllers.OrderController import OrderController
 from controllers.SupplierController import SupplierController
 from controllers.ShipmentController import ShipmentController
 from controllers.ShipmentItemController import ShipmentItemController
-from models.base import session
-from core.security import Security
+from models.base import session, replica_engine
+from core.table_model import PagedTableModel, SqlSortProxyModel
+from core.report import OrderReport
+from core.importer import MedicineImport, SupplierImport, read_prices
+from core.workers import AsyncController, ImportWorker, ReportWorker
+from core.session import UnitOfWorkController
 
 #region LoginDialog
 # noinspection PyUnresolvedReferences
@@ -33,8 +38,8 @@ class LoginDialog(QDialog):
         self.show_pass_cb = QCheckBox("Показать пароль")
         self.show_pass_cb.stateChanged.connect(self.toggle_password)
 
-        login_btn = QPushButton("Войти")
-        login_btn.clicked.connect(self.handle_login)
+        self.login_btn = QPushButton("Войти")
+        self.login_btn.clicked.connect(self.handle_login)
         register_btn = QPushButton("Регистрация")
         register_btn.clicked.connect(self.open_register)
 
@@ -44,7 +49,7 @@ class LoginDialog(QDialog):
         form.addRow(self.show_pass_cb)
 
         btn_layout = QHBoxLayout()
-        btn_layout.addWidget(login_btn)
+        btn_layout.addWidget(self.login_btn)
         btn_layout.addWidget(register_btn)
 
         layout = QVBoxLayout()
@@ -59,13 +64,23 @@ class LoginDialog(QDialog):
     def handle_login(self):
         login = self.login_input.text()
         password = self.password_input.text()
-        user = self.employee_ctrl.authenticate(login, password)
+        # Проверка выполняется в фоне, окно не замирает на время запроса к БД
+        self.login_btn.setEnabled(False)
+        self.employee_ctrl.authenticate(login, password, on_result=self.on_authenticated,
+                                        on_error=self.on_error)
+
+    def on_authenticated(self, user):
+        self.login_btn.setEnabled(True)
         if user:
-            self.accept()
             self.user = user
+            self.accept()
         else:
             QMessageBox.warning(self, "Ошибка", "Неверный логин или пароль")
 
+    def on_error(self, e):
+        self.login_btn.setEnabled(True)
+        QMessageBox.critical(self, "Ошибка", str(e))
+
     def open_register(self):
         dlg = RegisterDialog(self.employee_ctrl)
         dlg.exec_()
@@ -107,8 +122,8 @@ class RegisterDialog(QDialog):
         )
         #self.admin_cb = QCheckBox("Администратор")
 
-        register_btn = QPushButton("Зарегистрироваться")
-        register_btn.clicked.connect(self.handle_register)
+        self.register_btn = QPushButton("Зарегистрироваться")
+        self.register_btn.clicked.connect(self.handle_register)
 
         form = QFormLayout()
         form.addRow("Имя:", self.fname_input)
@@ -123,7 +138,7 @@ class RegisterDialog(QDialog):
 
         layout = QVBoxLayout()
         layout.addLayout(form)
-        layout.addWidget(register_btn)
+        layout.addWidget(self.register_btn)
         self.setLayout(layout)
 
     def handle_register(self):
@@ -137,12 +152,16 @@ class RegisterDialog(QDialog):
             'Pass': self.password_input.text(),
             'Admin': False
         }
-        try:
-            self.employee_ctrl.create_employee(data)
-            QMessageBox.information(self, "Успех", "Пользователь зарегистрирован")
-            self.accept()
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+        self.register_btn.setEnabled(False)
+        self.employee_ctrl.create_employee(data, on_result=self.on_registered, on_error=self.on_error)
+
+    def on_registered(self, employee):
+        QMessageBox.information(self, "Успех", "Пользователь зарегистрирован")
+        self.accept()
+
+    def on_error(self, e):
+        self.register_btn.setEnabled(True)
+        QMessageBox.critical(self, "Ошибка", str(e))
 #endregion
 
 #region EditEmployee
@@ -154,34 +173,33 @@ class EmployeeEditRecordDialog(QDialog):
         self.setWindowTitle(title)
         self.setMinimumSize(400, 350)
         self.ctrl = controller
-        self.employee = self.ctrl.get_employee_by_id(data[0])
         self.data = data or []  # Защита от None
-        self.record_id = data[0] if data and len(data) > 0 else None  # Сохраняем ID записи
+        self.record_id = int(data[0]) if data and len(data) > 0 else None  # Сохраняем ID записи
 
         layout = QVBoxLayout()
         form = QFormLayout()
 
-        # Создаем поля формы
-        self.fname_input = QLineEdit(self.employee.FName)
-        self.lname_input = QLineEdit(self.employee.LName)
-        self.position_input = QLineEdit(self.employee.Position)
+        # Создаем поля формы (заполняются, когда сотрудник загрузится из БД)
+        self.fname_input = QLineEdit()
+        self.lname_input = QLineEdit()
+        self.position_input = QLineEdit()
 
-        self.phone_input = QLineEdit(self.employee.Number)
+        self.phone_input = QLineEdit()
         self.phone_input.setInputMask("00000000000")
 
         self.dtb_input = QDateEdit()
         self.dtb_input.setCalendarPopup(True)
         self.dtb_input.setDisplayFormat("dd.MM.yyyy")
-        self.dtb_input.setDate(QDate.fromString(str(self.employee.DTB)))
 
-        self.login_input = QLineEdit(self.employee.Login)
-        self.password_input = QLineEdit(Security.decrypt_password(self.employee.Pass))
+        self.login_input = QLineEdit()
+        # Хранится только хеш пароля, поэтому поле пустое: пустой пароль не меняется
+        self.password_input = QLineEdit()
+        self.password_input.setPlaceholderText("Новый пароль (не обязательно)")
         self.password_input.setEchoMode(QLineEdit.Password)
         self.show_pass_cb = QCheckBox("Показать пароль")
         self.show_pass_cb.stateChanged.connect(self.toggle_password)
 
         self.admin_cb = QCheckBox("Администратор")
-        self.admin_cb.setChecked(bool(self.employee.Admin))
 
         # Добавляем поля в форму
         form.addRow("Имя:", self.fname_input)
@@ -194,33 +212,54 @@ class EmployeeEditRecordDialog(QDialog):
         form.addRow(self.show_pass_cb)
         form.addRow(self.admin_cb)
 
-        save_btn = QPushButton("Сохранить")
-        save_btn.clicked.connect(self.save_data)
+        self.save_btn = QPushButton("Сохранить")
+        self.save_btn.setEnabled(False)
+        self.save_btn.clicked.connect(self.save_data)
 
         layout.addLayout(form)
-        layout.addWidget(save_btn)
+        layout.addWidget(self.save_btn)
         self.setLayout(layout)
 
-    def save_data(self):
-        """Собирает данные из формы и закрывает диалог"""
-        try:
-            self.result_data = {
-                'id': self.record_id,  # Добавляем ID записи
-                'FName': self.fname_input.text(),
-                'LName': self.lname_input.text(),
-                'Position': self.position_input.text(),
-                'Number': self.phone_input.text(),
-                'DTB': self.dtb_input.date().toString("yyyy-MM-dd"),
-                'Login': self.login_input.text(),
-                'Pass': self.password_input.text() if self.password_input.text() else None,
-                'Admin': self.admin_cb.isChecked()
-            }
-            self.ctrl.update_employee(self.record_id, self.result_data)
-        except Exception as e:
-            print(e)
-            QMessageBox.critical(self, title="Ошибка", text=f"При изменении произошла ошибка:\n{e}")
+        self.ctrl.get_employee_by_id(self.record_id, on_result=self.fill_form, on_error=self.on_error)
+
+    def fill_form(self, employee):
+        if employee is None:
+            return
+        self.employee = employee
+        self.fname_input.setText(employee.FName)
+        self.lname_input.setText(employee.LName)
+        self.position_input.setText(employee.Position)
+        self.phone_input.setText(employee.Number)
+        self.dtb_input.setDate(QDate.fromString(str(employee.DTB), "yyyy-MM-dd"))
+        self.login_input.setText(employee.Login)
+        self.admin_cb.setChecked(bool(employee.Admin))
+        self.save_btn.setEnabled(True)
+
+    def on_error(self, e):
+        print(e)
+        self.save_btn.setEnabled(True)
+        QMessageBox.critical(self, "Ошибка", f"При изменении произошла ошибка:\n{e}")
+
+    def on_saved(self, result):
         self.accept()
 
+    def save_data(self):
+        """Собирает данные из формы и сохраняет их в фоне"""
+        self.result_data = {
+            'id': self.record_id,  # Добавляем ID записи
+            'FName': self.fname_input.text(),
+            'LName': self.lname_input.text(),
+            'Position': self.position_input.text(),
+            'Number': self.phone_input.text(),
+            'DTB': self.dtb_input.date().toString("yyyy-MM-dd"),
+            'Login': self.login_input.text(),
+            'Pass': self.password_input.text() if self.password_input.text() else None,
+            'Admin': self.admin_cb.isChecked()
+        }
+        self.save_btn.setEnabled(False)
+        self.ctrl.update_employee(self.record_id, self.result_data,
+                                  on_result=self.on_saved, on_error=self.on_error)
+
     def toggle_password(self, state):
         mode = QLineEdit.Normal if state == Qt.Checked else QLineEdit.Password
         self.password_input.setEchoMode(mode)
@@ -270,31 +309,34 @@ class EmployeeAddRecordDialog(QDialog):
         form.addRow("Пароль:", self.password_input)
         form.addRow(self.admin_cb)
 
-        save_btn = QPushButton("Добавить")
-        save_btn.clicked.connect(self.add_employee)
+        self.save_btn = QPushButton("Добавить")
+        self.save_btn.clicked.connect(self.add_employee)
 
         layout.addLayout(form)
-        layout.addWidget(save_btn)
+        layout.addWidget(self.save_btn)
         self.setLayout(layout)
 
     def add_employee(self):
-        """Собирает данные из формы и закрывает диалог"""
-        try:
-            result_data = {
-                'FName': self.fname_input.text(),
-                'LName': self.lname_input.text(),
-                'Position': self.position_input.text(),
-                'Number': self.phone_input.text(),
-                'DTB': self.dtb_input.date().toString("yyyy-MM-dd"),
-                'Login': self.login_input.text(),
-                'Pass': self.password_input.text() if self.password_input.text() else None,
-                'Admin': self.admin_cb.isChecked()
-            }
-            self.ctrl.create_employee(result_data)
-        except Exception as e:
-            QMessageBox.critical(self, title="Ошибка", text=f"При добавлении произошла ошибка:\n{e}")
-            pass
+        """Собирает данные из формы и сохраняет их в фоне"""
+        result_data = {
+            'FName': self.fname_input.text(),
+            'LName': self.lname_input.text(),
+            'Position': self.position_input.text(),
+            'Number': self.phone_input.text(),
+            'DTB': self.dtb_input.date().toString("yyyy-MM-dd"),
+            'Login': self.login_input.text(),
+            'Pass': self.password_input.text() if self.password_input.text() else None,
+            'Admin': self.admin_cb.isChecked()
+        }
+        self.save_btn.setEnabled(False)
+        self.ctrl.create_employee(result_data, on_result=self.on_saved, on_error=self.on_error)
+
+    def on_saved(self, employee):
         self.accept()
+
+    def on_error(self, e):
+        self.save_btn.setEnabled(True)
+        QMessageBox.critical(self, "Ошибка", f"При добавлении произошла ошибка:\n{e}")
 #endregion
 
 #region EditSupplier
@@ -306,19 +348,18 @@ class SupplierEditRecordDialog(QDialog):
         self.setWindowTitle(title)
         self.setMinimumSize(400, 350)
         self.ctrl = controller
-        self.supplier = self.ctrl.get_supplier_by_id(data[0])
         self.data = data or []  # Защита от None
-        self.record_id = data[0] if data and len(data) > 0 else None  # Сохраняем ID записи
+        self.record_id = int(data[0]) if data and len(data) > 0 else None  # Сохраняем ID записи
 
         layout = QVBoxLayout()
         form = QFormLayout()
 
-        # Создаем поля формы
-        self.compname_input = QLineEdit(self.supplier.CompName)
-        self.adress_input = QLineEdit(self.supplier.Address)
-        self.number_input = QLineEdit(self.supplier.Number)
+        # Создаем поля формы (заполняются, когда поставщик загрузится из БД)
+        self.compname_input = QLineEdit()
+        self.adress_input = QLineEdit()
+        self.number_input = QLineEdit()
         self.number_input.setInputMask("00000000000")
-        self.inn_input = QLineEdit(self.supplier.INN)
+        self.inn_input = QLineEdit()
 
         # Добавляем поля в форму
         form.addRow("Название:", self.compname_input)
@@ -326,28 +367,46 @@ class SupplierEditRecordDialog(QDialog):
         form.addRow("Телефон:", self.number_input)
         form.addRow("Инн:", self.inn_input)
 
-        save_btn = QPushButton("Сохранить")
-        save_btn.clicked.connect(self.save_data)
+        self.save_btn = QPushButton("Сохранить")
+        self.save_btn.setEnabled(False)
+        self.save_btn.clicked.connect(self.save_data)
 
         layout.addLayout(form)
-        layout.addWidget(save_btn)
+        layout.addWidget(self.save_btn)
         self.setLayout(layout)
 
+        self.ctrl.get_supplier_by_id(self.record_id, on_result=self.fill_form, on_error=self.on_error)
+
+    def fill_form(self, supplier):
+        if supplier is None:
+            return
+        self.supplier = supplier
+        self.compname_input.setText(supplier.CompName)
+        self.adress_input.setText(supplier.Address)
+        self.number_input.setText(supplier.Number)
+        self.inn_input.setText(supplier.INN)
+        self.save_btn.setEnabled(True)
+
     def save_data(self):
-        """Собирает данные из формы и закрывает диалог"""
-        try:
-            self.result_data = {
-                'id': self.record_id,  # Добавляем ID записи
-                'CompName': self.compname_input.text(),
-                'Address': self.adress_input.text(),
-                'Number': self.number_input.text(),
-                'INN': self.inn_input.text(),
-            }
-            self.ctrl.update_supplier(self.record_id, self.result_data)
-        except Exception as e:
-            print(e)
-            QMessageBox.critical(self, title="Ошибка", text=f"При изменении произошла ошибка:\n{e}")
+        """Собирает данные из формы и сохраняет их в фоне"""
+        self.result_data = {
+            'id': self.record_id,  # Добавляем ID записи
+            'CompName': self.compname_input.text(),
+            'Address': self.adress_input.text(),
+            'Number': self.number_input.text(),
+            'INN': self.inn_input.text(),
+        }
+        self.save_btn.setEnabled(False)
+        self.ctrl.update_supplier(self.record_id, self.result_data,
+                                  on_result=self.on_saved, on_error=self.on_error)
+
+    def on_saved(self, supplier):
         self.accept()
+
+    def on_error(self, e):
+        print(e)
+        self.save_btn.setEnabled(True)
+        QMessageBox.critical(self, "Ошибка", f"При изменении произошла ошибка:\n{e}")
 #endregion
 
 #region AddSupplier
@@ -376,27 +435,31 @@ class SupplierAddRecordDialog(QDialog):
         form.addRow("Телефон:", self.number_input)
         form.addRow("Инн:", self.inn_input)
 
-        save_btn = QPushButton("Сохранить")
-        save_btn.clicked.connect(self.save_data)
+        self.save_btn = QPushButton("Сохранить")
+        self.save_btn.clicked.connect(self.save_data)
 
         layout.addLayout(form)
-        layout.addWidget(save_btn)
+        layout.addWidget(self.save_btn)
         self.setLayout(layout)
 
     def save_data(self):
-        """Собирает данные из формы и закрывает диалог"""
-        try:
-            self.result_data = {
-                'CompName': self.compname_input.text(),
-                'Address': self.adress_input.text(),
-                'Number': self.number_input.text(),
-                'INN': self.inn_input.text(),
-            }
-            self.ctrl.create_supplier(self.result_data)
-        except Exception as e:
-            print(e)
-            QMessageBox.critical(self, title="Ошибка", text=f"При изменении произошла ошибка:\n{e}")
+        """Собирает данные из формы и сохраняет их в фоне"""
+        self.result_data = {
+            'CompName': self.compname_input.text(),
+            'Address': self.adress_input.text(),
+            'Number': self.number_input.text(),
+            'INN': self.inn_input.text(),
+        }
+        self.save_btn.setEnabled(False)
+        self.ctrl.create_supplier(self.result_data, on_result=self.on_saved, on_error=self.on_error)
+
+    def on_saved(self, supplier):
         self.accept()
+
+    def on_error(self, e):
+        print(e)
+        self.save_btn.setEnabled(True)
+        QMessageBox.critical(self, "Ошибка", f"При добавлении произошла ошибка:\n{e}")
 #endregion
 
 #region AddShipment
@@ -410,6 +473,7 @@ class ShipmentAddRecordDialog(QDialog):
         self.shipment_controller = controllers['shipment']
 
         self.selected_medicines = []  # Список выбранных медикаментов
+        self.available_medicines = []  # Медикаменты текущего поставщика (строки таблицы)
 
         self.setWindowTitle(title)
         self.setMinimumSize(1000, 600)  # Увеличиваем размер окна
@@ -420,17 +484,11 @@ class ShipmentAddRecordDialog(QDialog):
 
         # 1. Выпадающий список поставщиков
         self.supplier_combo = QComboBox()
-        suppliers = self.suppliers_controller.get_all()
-        for supplier in suppliers:
-            self.supplier_combo.addItem(supplier.CompName, supplier.id)
         form_layout.addRow("Поставщик:", self.supplier_combo)
         self.supplier_combo.currentIndexChanged.connect(self.update_medicines_table)
 
         # 2. Выпадающий список сотрудников
         self.employee_combo = QComboBox()
-        employees = self.employee_controller.get_all()
-        for employee in employees:
-            self.employee_combo.addItem(f"{employee.LName} {employee.FName}", employee.id)
         form_layout.addRow("Сотрудник:", self.employee_combo)
 
         # 3. Поля даты и статуса
@@ -488,19 +546,36 @@ class ShipmentAddRecordDialog(QDialog):
         layout.addWidget(self.save_btn)
         self.setLayout(layout)
 
-        # Инициализация таблицы медикаментов
-        self.update_medicines_table()
+        # Списки загружаются в фоне; таблица медикаментов заполнится после выбора поставщика
+        self.suppliers_controller.get_all(on_result=self.fill_suppliers, on_error=self.on_error)
+        self.employee_controller.get_all(on_result=self.fill_employees, on_error=self.on_error)
+
+    def fill_suppliers(self, suppliers):
+        for supplier in suppliers:
+            self.supplier_combo.addItem(supplier.CompName, supplier.id)
+
+    def fill_employees(self, employees):
+        for employee in employees:
+            self.employee_combo.addItem(f"{employee.LName} {employee.FName}", employee.id)
+
+    def on_error(self, e):
+        self.save_btn.setEnabled(True)
+        QMessageBox.warning(self, "Ошибка", str(e))
 
     def update_medicines_table(self):
-        """Обновляет таблицу доступных медикаментов при изменении поставщика"""
+        """Запрашивает медикаменты поставщика при его изменении"""
         supplier_id = self.supplier_combo.currentData()
         if not supplier_id:
             return
+        self.medicine_controller.get_medicines_by_supplier(supplier_id, on_result=self.fill_medicines_table,
+                                                           on_error=self.on_error)
 
-        # Получаем медикаменты и гарантируем, что это список
-        Medicine = self.medicine_controller.get_medicines_by_supplier(supplier_id)
-        medicines = Medicine
-        row_cout = len(medicines)
+    def fill_medicines_table(self, medicines):
+        """Заполняет таблицу доступных медикаментов"""
+        # Ответ мог прийти для поставщика, который уже не выбран
+        if medicines and medicines[0].Supplier != self.supplier_combo.currentData():
+            return
+        self.available_medicines = medicines
 
         if not medicines:
             # Если медикаментов нет, показываем сообщение
@@ -555,17 +630,17 @@ class ShipmentAddRecordDialog(QDialog):
 
         count = self.quantity_spin.value()
 
-        # Получаем все медикаменты поставщика один раз
-        medicine = self.medicine_controller.get_medicines_by_supplier(supplier_id)
-        medicines = [medicine] if medicine else []
+        # Медикаменты поставщика уже загружены вместе с таблицей
+        medicines = self.available_medicines
 
         for row in range(self.medicines_table.rowCount()):
             widget = self.medicines_table.cellWidget(row, 0)
+            if widget is None:
+                continue
             checkbox = widget.layout().itemAt(0).widget()
 
             if checkbox.isChecked() and row < len(medicines):
-                med = medicines[row]
-                med_id = med[row].id
+                med_id = medicines[row].id
                 name = self.medicines_table.item(row, 1).text()
                 price = float(self.medicines_table.item(row, 3).text())
                 total = price * count
@@ -638,13 +713,13 @@ class ShipmentAddRecordDialog(QDialog):
             for med in self.selected_medicines
         ]
 
-        try:
-            # Вызываем метод контроллера с разделенными данными
-            self.shipment_controller.create_shipment(shipment_data, items)
-            self.accept()
-        except Exception as e:
-            pass
-            #self.controller.show_error_message(f"Ошибка при сохранении: {str(e)}")
+        # Вызываем метод контроллера с разделенными данными
+        self.save_btn.setEnabled(False)
+        self.shipment_controller.create_shipment(shipment_data, items, on_result=self.on_saved,
+                                                 on_error=self.on_error)
+
+    def on_saved(self, shipment):
+        self.accept()
 #endregion
 
 #region AddOrder
@@ -670,18 +745,13 @@ class OrderAddRecordDialog(QDialog):
         form_layout.addRow("Дата поставки:", self.date_edit)
 
         # 2. Выпадающий список лекарств
+        self.medicine = None  # выбранное лекарство (загружается в фоне)
         self.medicine_combo = QComboBox()
-        medicines = self.medicine_controller.get_all()
-        for medicine in medicines:
-            self.medicine_combo.addItem(medicine.MName, medicine.id)
         form_layout.addRow("Лекарство:", self.medicine_combo)
         self.medicine_combo.currentIndexChanged.connect(self.update_price)
 
         # 3. Выпадающий список сотрудников
         self.employee_combo = QComboBox()
-        employees = self.employee_controller.get_all()
-        for employee in employees:
-            self.employee_combo.addItem(f"{employee.LName} {employee.FName}", employee.id)
         form_layout.addRow("Сотрудник:", self.employee_combo)
 
         # 4. Выбор количества
@@ -701,66 +771,135 @@ class OrderAddRecordDialog(QDialog):
         self.price_label = QLabel()
         form_layout.addRow("Итоговая цена:", self.price_label)
 
-        # 7. Кнопка сохранения
+        # 7. Корзина: несколько лекарств оформляются одной продажей
+        self.basket = []  # позиции: {"Medicine", "name", "Amount", "Price", "total"}
+        self.add_to_basket_btn = QPushButton("Добавить в корзину")
+        self.add_to_basket_btn.clicked.connect(self.add_to_basket)
+        self.basket_table = QTableWidget()
+        self.basket_table.setColumnCount(4)
+        self.basket_table.setHorizontalHeaderLabels(["Лекарство", "Количество", "Цена", "Сумма"])
+        self.basket_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.basket_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.basket_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.remove_from_basket_btn = QPushButton("Удалить из корзины")
+        self.remove_from_basket_btn.clicked.connect(self.remove_from_basket)
+        self.basket_total_label = QLabel("0")
+
+        # 8. Кнопка сохранения
         self.save_btn = QPushButton("Сохранить сделку")
         self.save_btn.clicked.connect(self.save_order)
 
         layout.addLayout(form_layout)
+        layout.addWidget(self.add_to_basket_btn)
+        layout.addWidget(QLabel("Корзина:"))
+        layout.addWidget(self.basket_table)
+        layout.addWidget(self.remove_from_basket_btn)
+        basket_total = QFormLayout()
+        basket_total.addRow("Итого по корзине:", self.basket_total_label)
+        layout.addLayout(basket_total)
         layout.addWidget(self.save_btn)
         self.setLayout(layout)
 
+        self.medicine_controller.get_all(on_result=self.fill_medicines, on_error=self.on_error)
+        self.employee_controller.get_all(on_result=self.fill_employees, on_error=self.on_error)
+
+    def fill_medicines(self, medicines):
+        for medicine in medicines:
+            self.medicine_combo.addItem(medicine.MName, medicine.id)
+
+    def fill_employees(self, employees):
+        for employee in employees:
+            self.employee_combo.addItem(f"{employee.LName} {employee.FName}", employee.id)
+
+    def on_error(self, e):
+        self.save_btn.setEnabled(True)
+        QMessageBox.warning(self, "Ошибка", str(e))
+
     def update_price(self):
         medicine_id = self.medicine_combo.currentData()
         if not medicine_id:
             return
-        medicine = self.medicine_controller.get_medicine_by_id(medicine_id)
+        self.medicine = None
+        self.medicine_controller.get_medicine_by_id(medicine_id, on_result=self.on_medicine_loaded,
+                                                    on_error=self.on_error)
 
+    def on_medicine_loaded(self, medicine):
+        # Пока шел запрос, могли выбрать другое лекарство
+        if medicine is None or medicine.id != self.medicine_combo.currentData():
+            return
+        self.medicine = medicine
         self.quantity_spin.setMaximum(medicine.Count)
         self.edit_price()
 
     def edit_price(self):
-        medicine_id = self.medicine_combo.currentData()
-        if not medicine_id:
+        if self.medicine is None:
             return
-
-        medicine = self.medicine_controller.get_medicine_by_id(medicine_id)
         count = self.quantity_spin.value()
 
-        self.price_label.setText(str(medicine.Price * count))
+        self.price_label.setText(str(self.medicine.Price * count))
 
-    def save_order(self):
-      """Собирает данные из полей формы и сохраняет заказ через контроллер"""
-      try:
-        # 1. Собираем данные из полей формы
-        order_data = {
-          "DateReg": self.date_edit.date().toPyDate(),  # Получаем дату как datetime.date
-          "Amount": self.quantity_spin.value(),  # Количество лекарства
-          "Status": self.status_check.isChecked(),  # Статус (True/False)
-          "Employee": self.employee_combo.currentData(),  # ID сотрудника
-          "Medicine": self.medicine_combo.currentData()  # ID лекарства
-        }
-
-        # 2. Получаем цену лекарства для расчета суммы
-        medicine_id = order_data['Medicine']
-        medicine = self.medicine_controller.get_medicine_by_id(medicine_id)
-        if not medicine:
+    def current_line(self):
+        """Позиция из выбранного лекарства и количества"""
+        # Лекарство загружено при выборе в списке
+        medicine = self.medicine
+        if not medicine or medicine.id != self.medicine_combo.currentData():
           raise ValueError("Лекарство не найдено")
 
-        # 4. Проверяем, что количество не превышает доступное
-        if order_data["Amount"] > medicine.Count:
+        amount = self.quantity_spin.value()
+        in_basket = sum(line["Amount"] for line in self.basket if line["Medicine"] == medicine.id)
+        # Проверяем, что количество (вместе с корзиной) не превышает доступное
+        if amount + in_basket > medicine.Count:
           raise ValueError(f"Недостаточно лекарства на складе. Доступно: {medicine.Count}")
+        return {"Medicine": medicine.id, "name": medicine.MName, "Amount": amount,
+                "Price": medicine.Price, "total": medicine.Price * amount}
 
-        # 5. Создаем заказ через контроллер
-        # (предполагается, что у вас есть метод create_order в order_controller)
-        order = self.order_controller.create_order(order_data)
+    def add_to_basket(self):
+      try:
+        self.basket.append(self.current_line())
+      except ValueError as e:
+        QMessageBox.warning(self, "Ошибка", str(e))
+        return
+      self.update_basket_table()
+
+    def remove_from_basket(self):
+      rows = set(index.row() for index in self.basket_table.selectedIndexes())
+      for row in sorted(rows, reverse=True):
+        self.basket.pop(row)
+      self.update_basket_table()
+
+    def update_basket_table(self):
+      self.basket_table.setRowCount(len(self.basket))
+      for row, line in enumerate(self.basket):
+        self.basket_table.setItem(row, 0, QTableWidgetItem(line["name"]))
+        self.basket_table.setItem(row, 1, QTableWidgetItem(str(line["Amount"])))
+        self.basket_table.setItem(row, 2, QTableWidgetItem(str(line["Price"])))
+        self.basket_table.setItem(row, 3, QTableWidgetItem(str(line["total"])))
+      self.basket_total_label.setText(str(sum(line["total"] for line in self.basket)))
 
-        # 6. Показываем сообщение об успехе и закрываем диалог
-        QMessageBox.information(self, "Успех", "Заказ успешно создан!")
-        self.accept()
+    def save_order(self):
+      """Оформляет корзину (или выбранное лекарство, если корзина пуста) одной продажей"""
+      try:
+        lines = self.basket or [self.current_line()]
+        if not self.employee_combo.currentData():
+          raise ValueError("Все обязательные поля должны быть заполнены")
+
+        # Все позиции – одной транзакцией в контроллере
+        self.save_btn.setEnabled(False)
+        self.order_controller.checkout(
+          [{"Medicine": line["Medicine"], "Amount": line["Amount"]} for line in lines],
+          employee_id=self.employee_combo.currentData(),
+          date_reg=self.date_edit.date().toPyDate(),
+          status=self.status_check.isChecked(),
+          on_result=self.on_saved, on_error=self.on_error)
 
       except ValueError as e:
         # Показываем ошибки валидации
         QMessageBox.warning(self, "Ошибка", str(e))
+
+    def on_saved(self, order_ids):
+      # Показываем сообщение об успехе и закрываем диалог
+      QMessageBox.information(self, "Успех", "Заказ успешно создан!")
+      self.accept()
 #endregion
 
 #region AddMedicine
@@ -802,15 +941,14 @@ class MedicineAddRecordDialog(QDialog):
         self.category_input = QLineEdit()
         form_layout.addRow("Категория:",self.category_input)
 
-        # Текстовое поле для срока годности
-        self.bt_input = QLineEdit()
+        # Срок годности (по умолчанию – через год)
+        self.bt_input = QDateEdit(QDate.currentDate().addYears(1))
+        self.bt_input.setCalendarPopup(True)
+        self.bt_input.setDisplayFormat("dd.MM.yyyy")
         form_layout.addRow("Срок годности:", self.bt_input)
 
         # Выпадающий список для поставщика
         self.supplier_combo = QComboBox()
-        suppliers = self.supplier_controller.get_all()
-        for supplier in suppliers:
-            self.supplier_combo.addItem(supplier.CompName, supplier.id)
         form_layout.addRow("Поставщик:", self.supplier_combo)
 
         # Кнопка сохранения
@@ -820,7 +958,22 @@ class MedicineAddRecordDialog(QDialog):
         layout.addLayout(form_layout)
         layout.addWidget(self.save_btn)
         self.setLayout(layout)
-    
+
+        self.supplier_controller.get_all(on_result=self.fill_suppliers, on_error=self.on_error)
+
+    def fill_suppliers(self, suppliers):
+        for supplier in suppliers:
+            self.supplier_combo.addItem(supplier.CompName, supplier.id)
+
+    def on_error(self, e):
+        print(e)
+        self.save_btn.setEnabled(True)
+        QMessageBox.warning(self, "Ошибка", str(e))
+
+    def on_saved(self, medicine):
+        QMessageBox.information(self, "Успех", "Медикамент успешно создан!")
+        self.accept()
+
     def save_medicine(self):
         medicine_data = {
             'MName': self.mname_input.text(),
@@ -828,16 +981,12 @@ class MedicineAddRecordDialog(QDialog):
             'Count' : int(self.count_spin.value()),
             'Description' : self.descriptoin_input.text(),
             'Category' : self.category_input.text(),
-            'BT' : self.bt_input.text(),
+            'BT' : self.bt_input.date().toPyDate(),
             'Supplier' : self.supplier_combo.currentData()
         }
-        try:
-            self.medicine_controller.create_medicine(medicine_data)
-            QMessageBox.information(self, "Успех", "Медикамент успешно создан!")
-            self.accept()
-        except Exception as e:
-            print(e)
-            QMessageBox.warning(self, "Ошибка", str(e))
+        self.save_btn.setEnabled(False)
+        self.medicine_controller.create_medicine(medicine_data, on_result=self.on_saved,
+                                                 on_error=self.on_error)
 
 #endregion
 
@@ -847,13 +996,19 @@ class MedicineAddRecordDialog(QDialog):
 
 # noinspection PyUnresolvedReferences
 class MainWindow(QMainWindow):
-    def __init__(self, controllers, user):
+    def __init__(self, controllers, user, async_controllers):
         super().__init__()
+        # Синхронные контроллеры – для ленивых моделей вкладок,
+        # асинхронные (в пуле потоков) – для диалогов и удаления
         self.controllers = controllers
+        self.async_controllers = async_controllers
         self.user = user
         self.setWindowTitle("Система управления аптекой")
         self.resize(1100, 650)
 
+        # Модели таблиц по названию вкладки
+        self.table_models = {}
+
         tabs = QTabWidget()
 
         tabs.addTab(self.create_table_tab(
@@ -895,66 +1050,11 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(tabs)
 
     def refresh_current_tab(self):
-        """Обновляет текущую активную вкладку"""
+        """Перечитывает текущую вкладку из БД (виджет вкладки не пересоздается)"""
         tab_widget = self.centralWidget()
-        current_idx = tab_widget.currentIndex()
-        title = tab_widget.tabText(current_idx)
-
-        # Определяем параметры для каждой вкладки
-        if title == "Сотрудники":
-            tab_widget.removeTab(current_idx)
-            tab_widget.insertTab(current_idx,
-                                 self.create_table_tab(
-                                     self.controllers['employee'],
-                                     ['id', 'FName', 'LName', 'Position', 'Number', 'Login', 'DTB', 'Admin'],
-                                     "Сотрудники",
-                                     self.user.Admin,
-                                     is_employee=True
-                                 ), "Сотрудники")
-
-        elif title == "Лекарства":
-            tab_widget.removeTab(current_idx)
-            tab_widget.insertTab(current_idx,
-                                 self.create_table_tab(
-                                     self.controllers['medicine'],
-                                     ['id', 'MName', 'Price', 'Count', 'Description', 'Category', 'BT', 'Supplier'],
-                                     "Лекарства",
-                                     self.user.Admin
-                                 ), "Лекарства")
+        title = tab_widget.tabText(tab_widget.currentIndex())
+        self.table_models[title].reload()
 
-        elif title == "Заказы":
-            tab_widget.removeTab(current_idx)
-            tab_widget.insertTab(current_idx,
-                                 self.create_table_tab(
-                                    self.controllers['order'],
-                                    ['id', 'DateReg', 'Amount', 'Status', 'Employee', 'Medicine'],
-                                    "Заказы",
-                                    user.Admin
-                                ), "Заказы")
-
-        elif title == "Поставщики":
-            tab_widget.removeTab(current_idx)
-            tab_widget.insertTab(current_idx,
-                                 self.create_table_tab(
-                                     self.controllers['supplier'],
-                                     ['id', 'CompName', 'Address', 'Number', 'INN'],
-                                     "Поставщики",
-                                     user.Admin
-                                 ), "Поставщики")
-
-        elif title == "Поставки":
-            tab_widget.removeTab(current_idx)
-            tab_widget.insertTab(current_idx,
-                                 self.create_table_tab(
-                                     self.controllers['shipment'],
-                                     ['id', 'Supplier', 'DateReg', 'Price', 'Status', 'Employee'],
-                                     "Поставки",
-                                     user.Admin
-                                 ), "Поставки")
-
-
-        tab_widget.setCurrentIndex(current_idx)
-    
     def create_table_tab(self, ctrl, fields, title, is_admin, is_employee=False):
         widget = QWidget()
         vbox = QVBoxLayout()
@@ -966,8 +1066,6 @@ class MainWindow(QMainWindow):
         search_button = QPushButton("Найти")
         vbox.addWidget(search_button)
 
-        model = QStandardItemModel()
-
         headers = []
         rus_map = {
             'id': 'Номер ПП', 'FName': 'Имя', 'LName': 'Фамилия', 'Position': 'Должность',
@@ -979,25 +1077,6 @@ class MainWindow(QMainWindow):
             'CompName': 'Компания', 'Address': 'Адрес', 'INN': 'ИНН',
             'Shipment': 'Поставка', 'Quantity': 'Количество', 'Amount':'Количество'
         }
-        # Маппинг для связанных полей (какое поле отображать вместо ID)
-        relation_map = {
-            'Employee': {
-                'field': 'employee',  # Имя атрибута в модели
-                'display': lambda x: f"{x.LName} {x.FName}" if x else ""
-            },
-            'Supplier': {
-                'field': 'supplier',
-                'display': lambda x: x.CompName if x else ""
-            },
-            'Medicine': {
-                'field': 'medicine',
-                'display': lambda x: x.MName if x else ""
-            },
-            'Category': {
-                'field': 'Category',
-                'display': lambda x: x if x else ""
-            }
-        }
         # Специальное отображение для булевых полей
         bool_display_map = {
             'Status': {True: 'Выполнено', False: 'В ожидании'},
@@ -1008,47 +1087,40 @@ class MainWindow(QMainWindow):
 
         for f in fields:
             headers.append(rus_map.get(f, f))
-        model.setHorizontalHeaderLabels(headers)
-
-        rows = ctrl.get_all()
-        for row in rows:
-            items = []
-            for f in fields:
-                if not hasattr(row, f):
-                    print(f"Предупреждение: атрибут {f} не найден в объекте {type(row).__name__}")
-                    items.append(QStandardItem(""))
-                    continue
-
-                val = getattr(row, f)
-
-                if f in relation_map:
-                    try:
-                        # Получаем связанный объект по правильному имени атрибута
-                        related_obj = getattr(row, relation_map[f]['field'])
-                        display_val = relation_map[f]['display'](related_obj)
-                        items.append(QStandardItem(display_val))
-                        continue
-                    except AttributeError as e:
-                        print(f"Ошибка доступа к связанному объекту {f}: {str(e)}")
-                        items.append(QStandardItem(""))
-                        continue
-                    except Exception as e:
-                        print(f"Ошибка при обработке связанного поля {f}: {str(e)}")
-                        items.append(QStandardItem(""))
-                        continue
-
-                # Обработка булевых значений
-                if isinstance(val, bool):
-                    display_val = bool_display_map.get(f, {}).get(val, bool_display_map.get(val, str(val)))
-                    items.append(QStandardItem(display_val))
-                    continue
-
-                # Обычное поле
-                items.append(QStandardItem(str(val)))
-
-            model.appendRow(items)
-
-        proxy = QSortFilterProxyModel()
+
+        def format_value(row, f):
+            if not hasattr(row, f):
+                print(f"Предупреждение: атрибут {f} не найден в объекте {type(row).__name__}")
+                return ""
+
+            val = getattr(row, f)
+
+            # Связанные поля (поставщик, сотрудник, медикамент) контроллер уже вернул по имени;
+            # пустое значение – например, медикамент без поставщика
+            if val is None:
+                return ""
+
+            # Обработка булевых значений
+            if isinstance(val, bool):
+                return bool_display_map.get(f, {}).get(val, bool_display_map.get(val, str(val)))
+
+            # Обычное поле
+            return str(val)
+
+        # Таблица БД, об изменениях которой вкладка получает события от контроллеров
+        table_map = {
+            "Сотрудники": 'employees', "Лекарства": 'medicines', "Заказы": 'orders',
+            "Поставщики": 'suppliers', "Поставки": 'shipments'
+        }
+
+        # Строки подгружаются страницами по мере прокрутки, сортировка выполняется в БД,
+        # после добавления/изменения/удаления модель обновляет только затронутые строки
+        model = PagedTableModel(ctrl, fields, headers, format_value, table=table_map.get(title),
+                                async_search=True)
+        model.fetchMore()
+        self.table_models[title] = model
+
+        proxy = SqlSortProxyModel()
         proxy.setSourceModel(model)
         proxy.setFilterKeyColumn(-1)
 
@@ -1076,73 +1148,109 @@ class MainWindow(QMainWindow):
                 dialog.setWindowTitle("Фильтры лекарств")
                 layout = QVBoxLayout()
                 
-                # Фильтр по категории
+                current = model.filters or MedicineFilter()
+                medicine_ctrl = self.controllers['medicine']
+
+                # Фильтр по категории (список – из SELECT DISTINCT, а не из загруженных строк)
                 category_label = QLabel("Категория:")
                 category_combo = QComboBox()
                 category_combo.addItem("Все категории", None)
-                
-                # Получаем уникальные категории из данных
-                categories = set()
-                for row in range(model.rowCount()):
-                    cat_item = model.item(row, fields.index('Category'))
-                    if cat_item:
-                        categories.add(cat_item.text())
-                
-                for cat in sorted(categories):
+                for cat in medicine_ctrl.get_categories():
                     category_combo.addItem(cat, cat)
-                
+                category_combo.setCurrentIndex(max(category_combo.findData(current.category), 0))
+
                 # Фильтр по поставщику
                 supplier_label = QLabel("Поставщик:")
                 supplier_combo = QComboBox()
                 supplier_combo.addItem("Все поставщики", None)
-                
-                # Получаем уникальных поставщиков из данных
-                suppliers = set()
-                for row in range(model.rowCount()):
-                    sup_item = model.item(row, fields.index('Supplier'))
-                    if sup_item:
-                        suppliers.add(sup_item.text())
-                
-                for sup in sorted(suppliers):
-                    supplier_combo.addItem(sup, sup)
-                
+                for sup in medicine_ctrl.get_medicine_suppliers():
+                    supplier_combo.addItem(sup.CompName, sup.id)
+                supplier_combo.setCurrentIndex(max(supplier_combo.findData(current.supplier), 0))
+
+                # Диапазоны цены и остатка: минимальное значение спинбокса означает «не задано»
+                def range_spin(value):
+                    spin = QSpinBox()
+                    spin.setRange(-1, 2147483647)
+                    spin.setSpecialValueText("—")
+                    spin.setValue(-1 if value is None else value)
+                    return spin
+
+                def spin_value(spin):
+                    return None if spin.value() < 0 else spin.value()
+
+                price_min, price_max = range_spin(current.price_min), range_spin(current.price_max)
+                count_min, count_max = range_spin(current.count_min), range_spin(current.count_max)
+                price_layout = QHBoxLayout()
+                price_layout.addWidget(QLabel("от"))
+                price_layout.addWidget(price_min)
+                price_layout.addWidget(QLabel("до"))
+                price_layout.addWidget(price_max)
+                count_layout = QHBoxLayout()
+                count_layout.addWidget(QLabel("от"))
+                count_layout.addWidget(count_min)
+                count_layout.addWidget(QLabel("до"))
+                count_layout.addWidget(count_max)
+
+                # Окно срока годности
+                def date_edit(value):
+                    check = QCheckBox()
+                    edit = QDateEdit(QDate.fromString(value, "yyyy-MM-dd") if value else QDate.currentDate())
+                    edit.setCalendarPopup(True)
+                    edit.setDisplayFormat("dd.MM.yyyy")
+                    check.setChecked(value is not None)
+                    edit.setEnabled(value is not None)
+                    check.toggled.connect(edit.setEnabled)
+                    return check, edit
+
+                def date_value(check, edit):
+                    return edit.date().toString("yyyy-MM-dd") if check.isChecked() else None
+
+                expires_from_cb, expires_from = date_edit(current.expires_from)
+                expires_to_cb, expires_to = date_edit(current.expires_to)
+                expires_layout = QHBoxLayout()
+                expires_layout.addWidget(expires_from_cb)
+                expires_layout.addWidget(QLabel("с"))
+                expires_layout.addWidget(expires_from)
+                expires_layout.addWidget(expires_to_cb)
+                expires_layout.addWidget(QLabel("по"))
+                expires_layout.addWidget(expires_to)
+
                 # Кнопки
                 btn_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
                 btn_box.accepted.connect(dialog.accept)
                 btn_box.rejected.connect(dialog.reject)
-                
+
                 # Добавляем элементы в layout
                 layout.addWidget(category_label)
                 layout.addWidget(category_combo)
                 layout.addWidget(supplier_label)
                 layout.addWidget(supplier_combo)
+                layout.addWidget(QLabel("Цена:"))
+                layout.addLayout(price_layout)
+                layout.addWidget(QLabel("Остаток:"))
+                layout.addLayout(count_layout)
+                layout.addWidget(QLabel("Срок годности:"))
+                layout.addLayout(expires_layout)
                 layout.addWidget(btn_box)
-                
+
                 dialog.setLayout(layout)
-                
+
                 if dialog.exec_() == QDialog.Accepted:
-                    # Применяем фильтры
-                    category_filter = category_combo.currentData()
-                    supplier_filter = supplier_combo.currentData()
-                    
-                    # Сбрасываем предыдущие фильтры
-                    proxy.setFilterRegExp("")
-                    
-                    # Фильтрация по категории
-                    if category_filter:
-                        category_col = fields.index('Category')
-                        proxy.setFilterKeyColumn(category_col)
-                        proxy.setFilterFixedString(category_filter)
-                    
-                    # Фильтрация по поставщику
-                    if supplier_filter:
-                        supplier_col = fields.index('Supplier')
-                        proxy.setFilterKeyColumn(supplier_col)
-                        proxy.setFilterFixedString(supplier_filter)
+                    # Все условия применяются вместе, одним запросом к БД
+                    model.set_filters(MedicineFilter(
+                        category=category_combo.currentData(),
+                        supplier=supplier_combo.currentData(),
+                        price_min=spin_value(price_min),
+                        price_max=spin_value(price_max),
+                        count_min=spin_value(count_min),
+                        count_max=spin_value(count_max),
+                        expires_from=date_value(expires_from_cb, expires_from),
+                        expires_to=date_value(expires_to_cb, expires_to),
+                    ))
                 else:
                     # Сбрасываем фильтры
-                    proxy.setFilterRegExp("")
-            
+                    model.set_filters(None)
+
             filter_button.clicked.connect(show_filter_dialog)
 
 
@@ -1154,26 +1262,18 @@ class MainWindow(QMainWindow):
 
         vbox.addWidget(table)
         
-        # Поиск по кнопке — выделение подходящих строк
+        # Поиск выполняется в БД в фоновом потоке, в таблице остаются только найденные строки
         def perform_search():
-            search_text = search_input.text().lower()
-            if search_text == "":
-                self.refresh_current_tab()
-                return
-            
+            search_timer.stop()
             table.clearSelection()
+            model.search_async(search_input.text())
 
-            if not search_text:
-                return
-
-            for row in range(model.rowCount()):
-                match_found = False
-                for col in range(model.columnCount()):
-                    item = model.item(row, col)
-                    if item and search_text in item.text().lower():
-                        match_found = True
-                if match_found:
-                    table.selectRow(row)
+        # Поиск при вводе: запрос уходит, когда пользователь сделал паузу в наборе
+        search_timer = QTimer(widget)
+        search_timer.setSingleShot(True)
+        search_timer.setInterval(300)
+        search_timer.timeout.connect(perform_search)
+        search_input.textChanged.connect(search_timer.start)
 
         btn_layout = QHBoxLayout()
         add_btn = QPushButton("Добавить")
@@ -1196,6 +1296,18 @@ class MainWindow(QMainWindow):
             edit_btn.setEnabled(False)
         if title == "Лекарства":
             edit_btn.setEnabled(False)
+        if title == "Заказы":
+            report_btn = QPushButton("Отчет")
+            btn_layout.addWidget(report_btn)
+            report_btn.clicked.connect(self.export_orders_report)
+        if title in ("Лекарства", "Поставщики"):
+            import_btn = QPushButton("Импорт")
+            btn_layout.addWidget(import_btn)
+            import_btn.clicked.connect(lambda: self.import_csv(title))
+        if title == "Лекарства":
+            prices_btn = QPushButton("Цены")
+            btn_layout.addWidget(prices_btn)
+            prices_btn.clicked.connect(self.update_prices)
 
         search_button.clicked.connect(perform_search)
 
@@ -1204,41 +1316,41 @@ class MainWindow(QMainWindow):
             if selected_indexes:
                 # Получаем первую выделенную строку (если разрешено множественное выделение)
                 selected_row = selected_indexes[0].row()
-                # Получаем данные через proxy model
-                return [
+                # Получаем данные через proxy model; ID (первая колонка) – значением, а не текстом ячейки
+                return [proxy.data(proxy.index(selected_row, 0), Qt.UserRole)] + [
                     proxy.data(proxy.index(selected_row, col))
-                    for col in range(proxy.columnCount())
+                    for col in range(1, proxy.columnCount())
                 ]
             return None
 
+        def get_selected_ids():
+            # ID всех выделенных строк (значение первой колонки, а не ее текст) – для пакетного удаления
+            return [proxy.data(proxy.index(index.row(), 0), Qt.UserRole)
+                    for index in table.selectionModel().selectedRows()]
+
         edit_btn.clicked.connect(lambda: self.handle_edit(title, get_selected_row()))
         add_btn.clicked.connect(lambda: self.handle_add(title))
-        del_btn.clicked.connect(lambda: self.handle_delete(title, get_selected_row()))
+        del_btn.clicked.connect(lambda: self.handle_delete(title, get_selected_ids()))
 
         widget.setLayout(vbox)
         return widget
 
     def handle_add(self, title):
         if title == "Сотрудники":
-            dlg = EmployeeAddRecordDialog(title="Добавить сотрудника", controller=self.controllers['employee'])
-            if dlg.exec_() == QDialog.Accepted:
-                self.refresh_current_tab()
+            dlg = EmployeeAddRecordDialog(title="Добавить сотрудника", controller=self.async_controllers['employee'])
+            dlg.exec_()
         elif title == "Лекарства":
-            dlg = MedicineAddRecordDialog(title="Лекарства", controllers=self.controllers)
-            if dlg.exec_() == QDialog.Accepted:
-                self.refresh_current_tab()
+            dlg = MedicineAddRecordDialog(title="Лекарства", controllers=self.async_controllers)
+            dlg.exec_()
         elif title == "Заказы":
-            dlg = OrderAddRecordDialog(title="Добавить сделку", controllers=self.controllers)
-            if dlg.exec_() == QDialog.Accepted:
-                self.refresh_current_tab()
+            dlg = OrderAddRecordDialog(title="Добавить сделку", controllers=self.async_controllers)
+            dlg.exec_()
         elif title == "Поставщики":
-            dlg = SupplierAddRecordDialog(title="Добавить поставщика", controller=self.controllers['supplier'])
-            if dlg.exec_() == QDialog.Accepted:
-                self.refresh_current_tab()
+            dlg = SupplierAddRecordDialog(title="Добавить поставщика", controller=self.async_controllers['supplier'])
+            dlg.exec_()
         elif title == "Поставки":
-            dlg = ShipmentAddRecordDialog(title="Добавить поставку", controllers=self.controllers)
-            if dlg.exec_() == QDialog.Accepted:
-                self.refresh_current_tab()
+            dlg = ShipmentAddRecordDialog(title="Добавить поставку", controllers=self.async_controllers)
+            dlg.exec_()
 
     def handle_edit(self, title, data):
         if not data:
@@ -1247,9 +1359,8 @@ class MainWindow(QMainWindow):
 
         if title == "Сотрудники":
             dlg = EmployeeEditRecordDialog(data=data, title="Редактировать сотрудника",
-                                           controller=self.controllers['employee'])
-            if dlg.exec_() == QDialog.Accepted:
-                self.refresh_current_tab()
+                                           controller=self.async_controllers['employee'])
+            dlg.exec_()
         elif title == "Лекарства":
             pass
             #dlg = EditRecordDialog(test_data, "Редактировать лекарство", controller=self.controllers['employee'])
@@ -1258,45 +1369,129 @@ class MainWindow(QMainWindow):
             #dlg = EditRecordDialog(test_data, f"Редактировать запись в {title}", controller=self.controllers['employee'])
         elif title == "Поставщики":
             dlg = SupplierEditRecordDialog(title="Редактировать поставщика", data=data,
-                                           controller = self.controllers['supplier'])
-            if dlg.exec_() == QDialog.Accepted:
-                self.refresh_current_tab()
+                                           controller = self.async_controllers['supplier'])
+            dlg.exec_()
         elif title == "Поставки":
             pass
 
-    def handle_delete(self, title, data):
-        if not data:
-            QMessageBox.warning(self, "Ошибка", "Не выбрана запись для редактирования")
+    def handle_delete(self, title, ids):
+        if not ids:
+            QMessageBox.warning(self, "Ошибка", "Не выбрана запись для удаления")
             return
 
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Question)
         msg.setWindowTitle("Подтверждение удаления")
-        msg.setText(f"Вы уверены, что хотите удалить запись из {title}?\n"
+        msg.setText(f"Вы уверены, что хотите удалить {len(ids)} зап. из {title}?\n"
                     f"Это повлечет за собой удаление всех связанных с записей!")
         msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
         # Показываем диалог и ждем ответа
         answer = msg.exec_()
 
         if answer == QMessageBox.Yes:
-            try:
-                if title == "Сотрудники":
-                    self.controllers['employee'].delete_employee(data[0])
-                elif title == "Лекарства":
-                    self.controllers['medicine'].delete_medicine(data[0])
-                elif title == "Поставщики":
-                    self.controllers['supplier'].delete_supplier(data[0])
-                elif title == "Заказы":
-                    self.controllers['order'].delete_order(data[0])
-                elif title == "Поставки":
-                    self.controllers['shipment'].delete_shipment(data[0])
+            controller_names = {
+                "Сотрудники": 'employee',
+                "Лекарства": 'medicine',
+                "Поставщики": 'supplier',
+                "Заказы": 'order',
+                "Поставки": 'shipment',
+            }
+            # Все выделенные записи – одним пакетным удалением; таблица обновится по событию контроллера
+            self.async_controllers[controller_names[title]].call(
+                'delete_many', ids, on_result=self.on_deleted, on_error=self.on_delete_error)
+
+    def export_orders_report(self):
+        """Сохраняет отчет по заказам в выбранный пользователем файл (CSV или XLSX).
+        Выгрузка идет в фоновом потоке, ход выполнения показывается в окне прогресса."""
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить отчет по заказам", "orders.csv",
+                                              "CSV (*.csv);;Excel (*.xlsx)")
+        if not path:
+            return
+        progress = QProgressDialog("Выгрузка отчета...", None, 0, 0, self)
+        progress.setWindowTitle("Отчет по заказам")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.show()
+
+        def on_progress(written, total):
+            progress.setMaximum(total)
+            progress.setValue(written)
+
+        def on_finished(path, written):
+            progress.close()
+            QMessageBox.information(self, "Успех", f"Отчет сохранен: {path}\nЗаказов: {written}")
+
+        def on_error(message):
+            progress.close()
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить отчет: {message}")
+
+        worker = ReportWorker(OrderReport(session), path)
+        worker.signals.progress.connect(on_progress)
+        worker.signals.finished.connect(on_finished)
+        worker.signals.error.connect(on_error)
+        self._report_signals = worker.signals  # сигналы живут, пока идет выгрузка
+        QThreadPool.globalInstance().start(worker)
+
+    def import_csv(self, title):
+        """Загружает медикаменты или поставщиков из выбранного CSV-файла в фоновом потоке
+        (см. core.importer), по завершении показывает число загруженных и пропущенных строк."""
+        path, _ = QFileDialog.getOpenFileName(self, f"Импорт: {title}", "", "CSV (*.csv)")
+        if not path:
+            return
+        importer = MedicineImport(session) if title == "Лекарства" else SupplierImport(session)
+        progress = QProgressDialog("Загрузка...", None, 0, 0, self)
+        progress.setWindowTitle(f"Импорт: {title}")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.show()
+
+        def on_progress(done, total):
+            progress.setMaximum(total)
+            progress.setValue(done)
+
+        def on_finished(result):
+            progress.close()
+            errors = "\n".join(f"Строка {line}: {message}" for line, message in result.errors[:20])
+            QMessageBox.information(self, "Импорт",
+                                    f"Загружено: {result.inserted}\nПропущено: {result.skipped}"
+                                    + (f"\n\n{errors}" if errors else ""))
+
+        def on_error(message):
+            progress.close()
+            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить файл: {message}")
+
+        worker = ImportWorker(importer, path)
+        worker.signals.progress.connect(on_progress)
+        worker.signals.finished.connect(on_finished)
+        worker.signals.error.connect(on_error)
+        self._import_signals = worker.signals  # сигналы живут, пока идет загрузка
+        QThreadPool.globalInstance().start(worker)
+
+    def update_prices(self):
+        """Применяет новые цены из CSV (колонки MName и Price) одним пакетным обновлением."""
+        path, _ = QFileDialog.getOpenFileName(self, "Новые цены", "", "CSV (*.csv)")
+        if not path:
+            return
+        try:
+            prices = read_prices(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось прочитать файл: {e}")
+            return
+
+        def on_result(result):
+            unknown = ", ".join(map(str, result.unknown[:20]))
+            QMessageBox.information(self, "Цены",
+                                    f"Получено: {result.received}\nНайдено: {result.matched}\n"
+                                    f"Изменено: {result.changed}" + (f"\n\nНе найдены: {unknown}" if unknown else ""))
+
+        self.async_controllers['medicine'].call(
+            'update_prices', prices, key='MName', on_result=on_result,
+            on_error=lambda e: QMessageBox.critical(self, "Ошибка", f"Не удалось обновить цены: {e}"))
 
-                # Обновляем таблицу
-                self.refresh_current_tab()
-                QMessageBox.information(self, "Успех", "Запись успешно удалена")
-            except Exception as e:
-                print(e)
-                QMessageBox.critical(self, "Ошибка", f"Не удалось удалить запись: {str(e)}")
+    def on_deleted(self, deleted):
+        QMessageBox.information(self, "Успех", f"Удалено записей: {deleted}")
+
+    def on_delete_error(self, e):
+        print(e)
+        QMessageBox.critical(self, "Ошибка", f"Не удалось удалить запись: {str(e)}")
 
 
 
@@ -1310,24 +1505,29 @@ def load_stylesheet(file_path):
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     app.setStyleSheet(load_stylesheet("styles.qss"))
-    employee_ctrl = EmployeeController(session)
-    medicine_ctrl = MedicineController(session)
-    order_ctrl = OrderController(session)
-    supplier_ctrl = SupplierController(session)
-    shipment_ctrl = ShipmentController(session)
-    shipment_item_ctrl = ShipmentItemController(session)
-
-    login = LoginDialog(employee_ctrl)
+    # Контроллеры работают через scoped_session: каждый вызов – отдельная единица работы
+    # в сессии того потока, из которого он сделан
+    employee_ctrl = UnitOfWorkController(EmployeeController(session))
+    medicine_ctrl = UnitOfWorkController(MedicineController(session, read_bind=replica_engine))
+    order_ctrl = UnitOfWorkController(OrderController(session))
+    supplier_ctrl = UnitOfWorkController(SupplierController(session))
+    shipment_ctrl = UnitOfWorkController(ShipmentController(session))
+    shipment_item_ctrl = UnitOfWorkController(ShipmentItemController(session))
+
+    controllers = {
+        'employee': employee_ctrl,
+        'medicine': medicine_ctrl,
+        'order': order_ctrl,
+        'supplier': supplier_ctrl,
+        'shipment': shipment_ctrl,
+        'shipmentitem': shipment_item_ctrl
+    }
+    # Те же контроллеры в пуле потоков (для диалогов)
+    async_controllers = {name: AsyncController(ctrl) for name, ctrl in controllers.items()}
+
+    login = LoginDialog(async_controllers['employee'])
     if login.exec_() == QDialog.Accepted:
         user = login.user
-        controllers = {
-            'employee': employee_ctrl,
-            'medicine': medicine_ctrl,
-            'order': order_ctrl,
-            'supplier': supplier_ctrl,
-            'shipment': shipment_ctrl,
-            'shipmentitem': shipment_item_ctrl
-        }
-        main_win = MainWindow(controllers, user)
+        main_win = MainWindow(controllers, user, async_controllers)
         main_win.show()
         sys.exit(app.exec_())
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, Index
+from .base import Base
+
+class DailySales(Base):
+    """Продажи за день в разрезе медикамента и сотрудника (агрегат по orders).
+    Поддерживается OrderController при оформлении, изменении и удалении заказов,
+    целиком пересчитывается SalesController.backfill()."""
+    __tablename__ = 'daily_sales'
+    Date = Column(Date, primary_key=True)
+    Medicine = Column(Integer, ForeignKey('medicines.id'), primary_key=True)
+    Employee = Column(Integer, ForeignKey('employees.id'), primary_key=True)
+    Units = Column(Integer, nullable=False, default=0)
+    Revenue = Column(Integer, nullable=False, default=0)  # Price * Amount по цене на момент продажи
+
+    __table_args__ = (
+        # Отчеты по медикаменту и по сотруднику за период
+        Index('ix_daily_sales_medicine', 'Medicine', 'Date'),
+        Index('ix_daily_sales_employee', 'Employee', 'Date'),
+    )
+
+    def __iter__(self):
+        for column in self.__table__.columns:
+            yield getattr(self, column.name)
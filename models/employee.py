@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean
+from sqlalchemy import Column, Integer, String, Date, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import date
 from .base import Base
@@ -15,6 +15,11 @@ class Employee(Base):
     DTB = Column(Date, nullable=False)
     Admin = Column(Boolean, nullable=False)
 
+    __table_args__ = (
+        # Поиск сотрудника по логину при входе
+        Index('ix_employees_login', 'Login'),
+    )
+
     # Связи: один сотрудник -> много заказов и много поставок
     shipments = relationship('Shipment', back_populates='employee', cascade="all, delete-orphan")
     orders = relationship('Order', back_populates='employee', cascade="all, delete-orphan")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index, DDL, event
 from sqlalchemy.orm import relationship
 from models.base import Base
 
@@ -10,9 +10,24 @@ class Medicine(Base):
     Count = Column(Integer, nullable=False)
     Description = Column(String(255))
     Category = Column(String(50))
-    BT = Column(String(50))
+    BT = Column(Date)  # срок годности
     Supplier = Column(Integer, ForeignKey('suppliers.id'))
 
+    __table_args__ = (
+        # Полнотекстовый индекс для поиска (MySQL); в SQLite вместо него – таблица FTS5 ниже
+        Index('ix_medicines_fulltext', 'MName', 'Description', 'Category',
+              mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+        # Проверка уникальности названия (is_name_unique, пакетная загрузка из CSV)
+        Index('ix_medicines_name', 'MName'),
+        # Индексы для фильтров и сортировки вкладки медикаментов
+        Index('ix_medicines_category', 'Category'),
+        Index('ix_medicines_price', 'Price'),
+        Index('ix_medicines_count', 'Count'),
+        # Медикаменты с истекающим сроком годности: диапазон по BT, остальные колонки отчета
+        # берутся из самого индекса, без чтения строк таблицы
+        Index('ix_medicines_bt', 'BT', 'Count', 'Price', 'Supplier', 'Category'),
+    )
+
     # Связи: многие медикаменты -> один поставщик; один медикамент -> много заказов; один медикамент -> много позиций в поставках
     supplier = relationship('Supplier', back_populates='medicines')
     orders = relationship('Order', back_populates='medicine')
@@ -22,3 +37,24 @@ class Medicine(Base):
         for column in self.__table__.columns:
             yield getattr(self, column.name)
 
+
+# SQLite (тесты): индекс FTS5 поверх medicines, синхронизируется триггерами
+_FTS_COLUMNS = "MName, Description, Category"
+for _statement in (
+    "CREATE VIRTUAL TABLE medicines_fts USING fts5("
+    f"{_FTS_COLUMNS}, content='medicines', content_rowid='id')",
+    "CREATE TRIGGER medicines_fts_ai AFTER INSERT ON medicines BEGIN "
+    f"INSERT INTO medicines_fts(rowid, {_FTS_COLUMNS}) "
+    "VALUES (new.id, new.MName, new.Description, new.Category); END",
+    "CREATE TRIGGER medicines_fts_ad AFTER DELETE ON medicines BEGIN "
+    f"INSERT INTO medicines_fts(medicines_fts, rowid, {_FTS_COLUMNS}) "
+    "VALUES ('delete', old.id, old.MName, old.Description, old.Category); END",
+    "CREATE TRIGGER medicines_fts_au AFTER UPDATE ON medicines BEGIN "
+    f"INSERT INTO medicines_fts(medicines_fts, rowid, {_FTS_COLUMNS}) "
+    "VALUES ('delete', old.id, old.MName, old.Description, old.Category); "
+    f"INSERT INTO medicines_fts(rowid, {_FTS_COLUMNS}) "
+    "VALUES (new.id, new.MName, new.Description, new.Category); END",
+):
+    event.listen(Medicine.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(Medicine.__table__, 'before_drop',
+             DDL("DROP TABLE IF EXISTS medicines_fts").execute_if(dialect='sqlite'))
@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, Date, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, Date, ForeignKey, Boolean, func, select
+from sqlalchemy.ext.hybrid import hybrid_property
 from .base import Base
+from .medicine import Medicine
 from sqlalchemy.orm import relationship
 
 class Order(Base):
@@ -10,14 +12,30 @@ class Order(Base):
     Status = Column(Boolean, nullable=False)
     Employee = Column(Integer, ForeignKey('employees.id'), nullable=False)
     Medicine = Column(Integer, ForeignKey('medicines.id'), nullable=False)
+    # Цена единицы на момент продажи (по ней сводка продаж отменяет заказ); NULL – у заказов,
+    # созданных в обход OrderController, для них берется текущая цена медикамента
+    Price = Column(Integer, nullable=True)
 
     # Связи: один заказ -> один сотрудник (автор) и один медикамент
     employee = relationship('Employee', back_populates='orders')
     medicine = relationship('Medicine', back_populates='orders')
 
+    @hybrid_property
+    def total_cost(self):
+        """Общая стоимость заказа: цена продажи * Amount; у заказа без сохраненной цены –
+        текущая цена связанного медикамента (как в сводке продаж).
+        В запросах (Order.total_cost) – COALESCE с подзапросом к medicines, считается в БД."""
+        price = self.Price if self.Price is not None else (self.medicine.Price if self.medicine else None)
+        return price * self.Amount if price is not None else None
+
+    @total_cost.expression
+    def total_cost(cls):
+        medicine_price = select(Medicine.Price).where(Medicine.id == cls.Medicine).scalar_subquery()
+        return func.coalesce(cls.Price, medicine_price) * cls.Amount
+
     def get_total_cost(self):
-        """Рассчитать общую стоимость заказа (Price * Amount связанного медикамента)."""
-        return self.medicine.Price * self.Amount if self.medicine else None
+        """Рассчитать общую стоимость заказа (цена продажи * Amount, см. total_cost)."""
+        return self.total_cost
 
     def __iter__(self):
         for column in self.__table__.columns:
@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, Date, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, Date, ForeignKey, Boolean, func, select
+from sqlalchemy.ext.hybrid import hybrid_property
 from .base import Base
+from .shipment_item import ShipmentItem
 from sqlalchemy.orm import relationship
 
 class Shipment(Base):
@@ -16,9 +18,23 @@ class Shipment(Base):
     employee = relationship('Employee', back_populates='shipments')
     items = relationship('ShipmentItem', back_populates='shipment', cascade="all, delete-orphan")
 
+    @hybrid_property
+    def total_quantity(self):
+        """Общее количество всех медикаментов в поставке.
+        В запросах (Shipment.total_quantity) – подзапрос с SUM по shipmentitem, считается в БД."""
+        return sum(item.Quantity for item in self.items)
+
+    @total_quantity.expression
+    def total_quantity(cls):
+        return (
+            select(func.coalesce(func.sum(ShipmentItem.Quantity), 0))
+            .where(ShipmentItem.Shipment == cls.id)
+            .scalar_subquery()
+        )
+
     def get_total_quantity(self):
         """Вычислить общее количество всех медикаментов в данной поставке."""
-        return sum(item.Quantity for item in self.items)
+        return self.total_quantity
 
     def __iter__(self):
         for column in self.__table__.columns:
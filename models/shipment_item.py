@@ -1,16 +1,22 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from .base import Base
 from sqlalchemy.orm import relationship
 
 class ShipmentItem(Base):
     __tablename__ = 'shipmentitem'
+    # Позиция однозначно определяется поставкой и медикаментом: в поставке много позиций
     Shipment = Column(Integer, ForeignKey('shipments.id'), primary_key=True)
-    Medicine = Column(Integer, ForeignKey('medicines.id'))
+    Medicine = Column(Integer, ForeignKey('medicines.id'), primary_key=True)
     Quantity = Column(Integer, nullable=False)
 
+    __table_args__ = (
+        # Поставки медикамента (история прихода); поиск по поставке идет по первичному ключу
+        Index('ix_shipmentitem_medicine', 'Medicine'),
+    )
+
     # Связи: одна позиция принадлежит одной поставке и одному медикаменту
     shipment = relationship('Shipment', back_populates='items')
-    medicine = relationship('Medicine')
+    medicine = relationship('Medicine', back_populates='shipmentitems')
 
     def __iter__(self):
         for column in self.__table__.columns:
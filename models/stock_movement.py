@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, func
+from .base import Base
+
+class StockMovement(Base):
+    """Журнал движения остатков: каждое изменение Medicine.Count (приход, продажа, отмена,
+    корректировка) – отдельная строка, строки только добавляются. Medicine.Count – текущий
+    остаток, равный сумме Delta по медикаменту (проверяется StockController.reconcile())."""
+    __tablename__ = 'stock_movements'
+    id = Column(Integer, primary_key=True)
+    Medicine = Column(Integer, ForeignKey('medicines.id', ondelete='CASCADE'), nullable=False)
+    Delta = Column(Integer, nullable=False)  # изменение остатка: + приход, - расход
+    Reason = Column(String(20), nullable=False)
+    # Документ-основание; без внешних ключей – записи журнала остаются после удаления документа
+    Order = Column(Integer)
+    Shipment = Column(Integer)
+    Created = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # Сумма движений по медикаменту считается по индексу, без чтения строк журнала
+        Index('ix_stock_movements_medicine', 'Medicine', 'Delta'),
+    )
+
+    def __iter__(self):
+        for column in self.__table__.columns:
+            yield getattr(self, column.name)
@@ -9,6 +9,7 @@ class Supplier(Base):
     Address = Column(String(100), nullable=False)
     Number = Column(String(20), nullable=False)
     INN = Column(String(20), nullable=False)
+    LeadTime = Column(Integer, nullable=False, default=7, server_default='7')  # срок поставки, дней
 
     # Связи: один поставщик -> много поставок и много медикаментов
     shipments = relationship('Shipment', back_populates='supplier')
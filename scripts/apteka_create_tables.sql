@@ -1,4 +1,5 @@
 -- 1. Таблица suppliers (модель Supplier)
+DROP TABLE IF EXISTS `daily_sales`;
 DROP TABLE IF EXISTS `shipmentitem`;
 DROP TABLE IF EXISTS `shipments`;
 DROP TABLE IF EXISTS `orders`;
@@ -12,6 +13,7 @@ CREATE TABLE `suppliers` (
   `Address` VARCHAR(100) NOT NULL,
   `Number` VARCHAR(20) NOT NULL,
   `INN` VARCHAR(20) NOT NULL,
+  `LeadTime` INT NOT NULL DEFAULT 7,
   PRIMARY KEY (`id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -26,7 +28,8 @@ CREATE TABLE `employees` (
   `Pass` VARCHAR(255) NOT NULL,
   `DTB` DATE NOT NULL,
   `Admin` TINYINT(1) NOT NULL,
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  INDEX `ix_employees_login` (`Login`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- 3. Таблица medicines (модель Medicine) :contentReference[oaicite:4]{index=4}&#8203;:contentReference[oaicite:5]{index=5}
@@ -37,10 +40,16 @@ CREATE TABLE `medicines` (
   `Count` INT NOT NULL,
   `Description` VARCHAR(255),
   `Category` VARCHAR(50),
-  `BT` VARCHAR(50),
+  `BT` DATE,
   `Supplier` INT,
   PRIMARY KEY (`id`),
   INDEX (`Supplier`),
+  INDEX `ix_medicines_name` (`MName`),
+  INDEX `ix_medicines_category` (`Category`),
+  INDEX `ix_medicines_price` (`Price`),
+  INDEX `ix_medicines_count` (`Count`),
+  INDEX `ix_medicines_bt` (`BT`, `Count`, `Price`, `Supplier`, `Category`),
+  FULLTEXT INDEX `ix_medicines_fulltext` (`MName`, `Description`, `Category`),
   CONSTRAINT `fk_medicines_supplier`
     FOREIGN KEY (`Supplier`) REFERENCES `suppliers`(`id`)
     ON DELETE SET NULL ON UPDATE CASCADE
@@ -54,6 +63,7 @@ CREATE TABLE `orders` (
   `Status` TINYINT(1) NOT NULL,
   `Employee` INT NOT NULL,
   `Medicine` INT NOT NULL,
+  `Price` INT NULL,
   PRIMARY KEY (`id`),
   INDEX (`Employee`),
   INDEX (`Medicine`),
@@ -86,11 +96,11 @@ CREATE TABLE `shipments` (
 
 -- 6. Таблица shipmentitem (модель ShipmentItem) :contentReference[oaicite:10]{index=10}&#8203;:contentReference[oaicite:11]{index=11}
 CREATE TABLE `shipmentitem` (
-  `Shipment` INT,
-  `Medicine` INT,
+  `Shipment` INT NOT NULL,
+  `Medicine` INT NOT NULL,
   `Quantity` INT NOT NULL,
-  INDEX (`Shipment`),
-  INDEX (`Medicine`),
+  PRIMARY KEY (`Shipment`, `Medicine`),
+  INDEX `ix_shipmentitem_medicine` (`Medicine`),
   CONSTRAINT `fk_shipmentitem_shipment`
     FOREIGN KEY (`Shipment`) REFERENCES `shipments`(`id`)
     ON DELETE CASCADE ON UPDATE CASCADE,
@@ -98,3 +108,37 @@ CREATE TABLE `shipmentitem` (
     FOREIGN KEY (`Medicine`) REFERENCES `medicines`(`id`)
     ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 7. Таблица daily_sales (модель DailySales) – сводка продаж по дням, ведется OrderController
+CREATE TABLE `daily_sales` (
+  `Date` DATE NOT NULL,
+  `Medicine` INT NOT NULL,
+  `Employee` INT NOT NULL,
+  `Units` INT NOT NULL DEFAULT 0,
+  `Revenue` INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Date`, `Medicine`, `Employee`),
+  INDEX `ix_daily_sales_medicine` (`Medicine`, `Date`),
+  INDEX `ix_daily_sales_employee` (`Employee`, `Date`),
+  CONSTRAINT `fk_daily_sales_medicine`
+    FOREIGN KEY (`Medicine`) REFERENCES `medicines`(`id`)
+    ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT `fk_daily_sales_employee`
+    FOREIGN KEY (`Employee`) REFERENCES `employees`(`id`)
+    ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 8. Таблица stock_movements (модель StockMovement) – журнал движения остатков medicines.Count
+CREATE TABLE `stock_movements` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `Medicine` INT NOT NULL,
+  `Delta` INT NOT NULL,
+  `Reason` VARCHAR(20) NOT NULL,
+  `Order` INT NULL,
+  `Shipment` INT NULL,
+  `Created` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  INDEX `ix_stock_movements_medicine` (`Medicine`, `Delta`),
+  CONSTRAINT `fk_stock_movements_medicine`
+    FOREIGN KEY (`Medicine`) REFERENCES `medicines`(`id`)
+    ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
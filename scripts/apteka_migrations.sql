@@ -0,0 +1,98 @@
+-- Изменения схемы для уже развернутой БД (новая БД создается apteka_create_tables.sql).
+-- Выполняются по порядку, каждый блок один раз.
+
+-- Индекс для поиска сотрудника по логину при входе.
+-- Пароли в Fernet переводятся на хеши scrypt автоматически при входе сотрудника
+-- или сразу все через EmployeeController.rehash_legacy_passwords().
+ALTER TABLE `employees` ADD INDEX `ix_employees_login` (`Login`);
+
+-- Сводка продаж по дням (модель DailySales). После создания заполнить по существующим заказам:
+-- python -c "from models.base import session; from controllers.SalesController import SalesController; SalesController(session).backfill()"
+CREATE TABLE `daily_sales` (
+  `Date` DATE NOT NULL,
+  `Medicine` INT NOT NULL,
+  `Employee` INT NOT NULL,
+  `Units` INT NOT NULL DEFAULT 0,
+  `Revenue` INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Date`, `Medicine`, `Employee`),
+  INDEX `ix_daily_sales_medicine` (`Medicine`, `Date`),
+  INDEX `ix_daily_sales_employee` (`Employee`, `Date`),
+  CONSTRAINT `fk_daily_sales_medicine`
+    FOREIGN KEY (`Medicine`) REFERENCES `medicines`(`id`)
+    ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT `fk_daily_sales_employee`
+    FOREIGN KEY (`Employee`) REFERENCES `employees`(`id`)
+    ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Срок годности (BT) – дата вместо строки, с индексом для выборки истекающих медикаментов.
+-- Строки в форматах ГГГГ-ММ-ДД и ДД.ММ.ГГГГ переносятся, остальные значения становятся NULL.
+ALTER TABLE `medicines` ADD COLUMN `BT_date` DATE NULL;
+UPDATE `medicines` SET `BT_date` = CASE
+  WHEN `BT` REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}$' THEN STR_TO_DATE(`BT`, '%Y-%m-%d')
+  WHEN `BT` REGEXP '^[0-9]{2}[.][0-9]{2}[.][0-9]{4}$' THEN STR_TO_DATE(`BT`, '%d.%m.%Y')
+END;
+ALTER TABLE `medicines` DROP COLUMN `BT`;
+ALTER TABLE `medicines` RENAME COLUMN `BT_date` TO `BT`;
+ALTER TABLE `medicines` ADD INDEX `ix_medicines_bt` (`BT`, `Count`, `Price`, `Supplier`, `Category`);
+
+-- Срок поставки поставщика (дней) для автозаказа.
+ALTER TABLE `suppliers` ADD COLUMN `LeadTime` INT NOT NULL DEFAULT 7;
+
+-- Журнал движения остатков; текущие остатки переносятся в него начальными записями.
+CREATE TABLE `stock_movements` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `Medicine` INT NOT NULL,
+  `Delta` INT NOT NULL,
+  `Reason` VARCHAR(20) NOT NULL,
+  `Order` INT NULL,
+  `Shipment` INT NULL,
+  `Created` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  INDEX `ix_stock_movements_medicine` (`Medicine`, `Delta`),
+  CONSTRAINT `fk_stock_movements_medicine`
+    FOREIGN KEY (`Medicine`) REFERENCES `medicines`(`id`)
+    ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+INSERT INTO `stock_movements` (`Medicine`, `Delta`, `Reason`)
+  SELECT `id`, `Count`, 'opening' FROM `medicines` WHERE `Count` <> 0;
+
+-- Индекс по названию медикамента: проверка уникальности при создании и загрузке из CSV.
+ALTER TABLE `medicines` ADD INDEX `ix_medicines_name` (`MName`);
+
+-- Позиции поставки: составной первичный ключ (поставка, медикамент) вместо таблицы без ключа.
+-- Повторяющиеся позиции одной поставки объединяются, строки без поставки или медикамента удаляются.
+ALTER TABLE `shipmentitem` DROP FOREIGN KEY `fk_shipmentitem_shipment`;
+ALTER TABLE `shipmentitem` DROP FOREIGN KEY `fk_shipmentitem_medicine`;
+RENAME TABLE `shipmentitem` TO `shipmentitem_old`;
+CREATE TABLE `shipmentitem` (
+  `Shipment` INT NOT NULL,
+  `Medicine` INT NOT NULL,
+  `Quantity` INT NOT NULL,
+  PRIMARY KEY (`Shipment`, `Medicine`),
+  INDEX `ix_shipmentitem_medicine` (`Medicine`),
+  CONSTRAINT `fk_shipmentitem_shipment`
+    FOREIGN KEY (`Shipment`) REFERENCES `shipments`(`id`)
+    ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT `fk_shipmentitem_medicine`
+    FOREIGN KEY (`Medicine`) REFERENCES `medicines`(`id`)
+    ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+INSERT INTO `shipmentitem` (`Shipment`, `Medicine`, `Quantity`)
+  SELECT `Shipment`, `Medicine`, SUM(`Quantity`) FROM `shipmentitem_old`
+  WHERE `Shipment` IS NOT NULL AND `Medicine` IS NOT NULL
+  GROUP BY `Shipment`, `Medicine`;
+DROP TABLE `shipmentitem_old`;
+
+-- Цена продажи в заказе: по ней сводка продаж отменяет заказ после смены цены медикамента.
+-- Для старых заказов – текущая цена медикамента.
+ALTER TABLE `orders` ADD COLUMN `Price` INT NULL;
+UPDATE `orders` o JOIN `medicines` m ON m.`id` = o.`Medicine` SET o.`Price` = m.`Price`;
+
+-- Полнотекстовый индекс для поиска медикаментов (MATCH ... AGAINST в MedicineController.search).
+ALTER TABLE `medicines` ADD FULLTEXT INDEX `ix_medicines_fulltext` (`MName`, `Description`, `Category`);
+
+-- Индексы для фильтра медикаментов (категория, диапазоны цены и остатка).
+ALTER TABLE `medicines` ADD INDEX `ix_medicines_category` (`Category`);
+ALTER TABLE `medicines` ADD INDEX `ix_medicines_price` (`Price`);
+ALTER TABLE `medicines` ADD INDEX `ix_medicines_count` (`Count`);
@@ -2,11 +2,13 @@ import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from models.base import Base
+from models.daily_sales import DailySales
 from models.employee import Employee
 from models.shipment import Shipment
 from models.medicine import Medicine
 from models.order import Order
 from models.shipment_item import ShipmentItem
+from models.stock_movement import StockMovement
 from models.supplier import Supplier
 
 @pytest.fixture(scope="function")
@@ -24,3 +26,20 @@ def session():
         db_session.close()
         Base.metadata.drop_all(engine)  # Удаляем схемы после теста для чистоты
         engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def query_counter(session):
+    """Считает SQL-запросы, отправленные в БД через сессию теста."""
+    from sqlalchemy import event
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -208,8 +208,132 @@ def test_delete_employee_success(session):
     # Проверяем, что сотрудника больше нет в базе
     assert session.query(Employee).get(emp_id) is None
 
+def test_delete_employee_with_sales(session):
+    from datetime import date
+    from controllers.OrderController import OrderController
+    from models.daily_sales import DailySales
+    from models.medicine import Medicine
+    from models.order import Order
+    controller = EmployeeController(session)
+    emp_id = controller.create_employee(employee_data()).id
+    other_id = controller.create_employee(employee_data("olga")).id
+    session.add(Medicine(id=1, MName="M", Price=10, Count=10))
+    session.commit()
+    orders = OrderController(session)
+    for employee_id in (emp_id, other_id):
+        orders.checkout([{'Medicine': 1, 'Amount': 1}], employee_id=employee_id, date_reg=date(2024, 1, 1))
+
+    # Как и delete_many: заказы и строки сводки продаж удаляются вместе с сотрудником
+    assert controller.delete_employee(emp_id).id == emp_id
+    assert session.get(Employee, emp_id) is None
+    assert session.query(DailySales.Employee).all() == [(other_id,)]
+    assert session.query(Order.Employee).all() == [(other_id,)]
+
+
 def test_delete_employee_not_found(session):
     controller = EmployeeController(session)
     # Удаление несуществующего сотрудника должно вызвать исключение
     with pytest.raises(Exception):
         controller.delete_employee(9999)
+
+
+def employee_data(login="ivan", password="secret"):
+    return {'FName': "Ivan", 'LName': "Petrov", 'Number': "+79990000000", 'Position': "Pharmacist",
+            'Login': login, 'Pass': password, 'DTB': datetime(1990, 1, 1).date(), 'Admin': False}
+
+
+def test_authenticate_with_hashed_password(session):
+    controller = EmployeeController(session)
+    employee = controller.create_employee(employee_data())
+    # В БД хранится соленый хеш, а не пароль и не обратимый токен
+    assert employee.Pass.startswith("scrypt$")
+    assert controller.create_employee(employee_data("olga")).Pass != employee.Pass
+    assert controller.authenticate("ivan", "secret").id == employee.id
+    assert controller.authenticate("ivan", "wrong") is None
+    assert controller.authenticate("nobody", "secret") is None
+
+
+def test_authenticate_uses_credential_cache(session, monkeypatch):
+    from core.security import Security
+    controller = EmployeeController(session)
+    controller.create_employee(employee_data())
+    Security.credentials.forget()
+    assert controller.authenticate("ivan", "secret") is not None
+
+    def fail(*args):
+        raise AssertionError("hash must not be recomputed for a cached login")
+    monkeypatch.setattr(Security, "verify_password", fail)
+    assert controller.authenticate("ivan", "secret") is not None
+    # Неверный пароль в кеше не найден и проверяется по хешу
+    monkeypatch.undo()
+    assert controller.authenticate("ivan", "wrong") is None
+
+
+
+def test_verify_rejects_corrupt_hash():
+    from core.security import PasswordHasher
+    hasher = PasswordHasher(n=2 ** 4)
+    stored = hasher.hash("secret")
+    assert hasher.verify("secret", stored)
+    # Недопустимый n для scrypt (не степень двойки), обрезанное значение, испорченная соль
+    assert not hasher.verify("secret", stored.replace("$16$", "$3$", 1))
+    assert not hasher.verify("secret", stored.rsplit("$", 1)[0])
+    assert not hasher.verify("secret", "scrypt$16$8$1$!!$AAAA")
+
+def test_legacy_fernet_password_migrated_on_login(session):
+    from core.security import Security
+    session.add(Employee(**dict(employee_data(), Pass=Security.encrypt_password("secret"))))
+    session.commit()
+    controller = EmployeeController(session)
+    assert controller.authenticate("ivan", "wrong") is None
+    assert controller.authenticate("ivan", "secret") is not None
+    stored = session.query(Employee).filter_by(Login="ivan").one().Pass
+    assert stored.startswith("scrypt$")
+    Security.credentials.forget()
+    assert controller.authenticate("ivan", "secret") is not None
+
+
+def test_rehash_legacy_passwords(session):
+    from core.security import Security
+    session.add_all([Employee(**dict(employee_data(f"user{i}"), Pass=Security.encrypt_password(f"p{i}")))
+                     for i in range(3)])
+    session.commit()
+    controller = EmployeeController(session)
+    controller.create_employee(employee_data())
+    assert controller.rehash_legacy_passwords(batch_size=2) == 3
+    assert all(e.Pass.startswith("scrypt$") for e in session.query(Employee))
+    assert controller.authenticate("user1", "p1") is not None
+
+
+def test_update_employee_keeps_password_when_empty(session):
+    controller = EmployeeController(session)
+    employee = controller.create_employee(employee_data())
+    stored = employee.Pass
+    controller.update_employee(employee.id, dict(employee_data(), Pass=None, Position="Head"))
+    assert session.get(Employee, employee.id).Pass == stored
+    assert controller.authenticate("ivan", "secret") is not None
+
+
+def test_delete_many_employees(session, query_counter):
+    from datetime import date
+    from models.daily_sales import DailySales
+    from models.order import Order
+    from models.shipment import Shipment
+    from models.shipment_item import ShipmentItem
+    session.add_all(Employee(id=i, FName="F", LName=f"L{i}", Number="1", Position="P", Login=f"u{i}",
+                             Pass="-", DTB=date(1990, 1, 1), Admin=False) for i in (1, 2, 3))
+    session.add_all(Order(DateReg=date(2024, 1, 1), Amount=1, Status=True, Employee=i, Medicine=1) for i in (1, 2, 3))
+    session.add_all(DailySales(Date=date(2024, 1, 1), Medicine=1, Employee=i, Units=1, Revenue=1) for i in (1, 2, 3))
+    session.add_all(Shipment(id=i, Supplier=1, Employee=i, DateReg=date(2024, 1, 1), Price=1, Status=False)
+                    for i in (1, 2, 3))
+    session.add_all(ShipmentItem(Shipment=i, Medicine=1, Quantity=1) for i in (1, 2, 3))
+    session.commit()
+
+    query_counter.clear()
+    assert EmployeeController(session).delete_many([2, 3, 3]) == 2
+    # Позиции поставок, поставки, заказы, сводка продаж, сотрудники
+    assert len(query_counter) == 5
+    for model in (Employee, Order, DailySales, Shipment):
+        column = model.id if model is Employee else model.Employee
+        assert session.query(column).all() == [(1,)]
+    assert [i.Shipment for i in session.query(ShipmentItem)] == [1]
@@ -0,0 +1,94 @@
+from datetime import date
+
+import pytest
+
+from controllers.StockController import StockController
+from core.importer import MedicineImport, SupplierImport
+from models.medicine import Medicine
+from models.stock_movement import StockMovement
+from models.supplier import Supplier
+
+
+def write_csv(tmp_path, lines):
+    path = tmp_path / "import.csv"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8-sig")
+    return str(path)
+
+
+@pytest.fixture
+def suppliers(session):
+    session.add_all([Supplier(id=1, CompName="Pharma", Address="a", Number="1", INN="1"),
+                     Supplier(id=2, CompName="Wholesale", Address="b", Number="2", INN="2")])
+    session.add(Medicine(MName="Aspirin", Price=10, Count=1, Supplier=1))
+    session.commit()
+
+
+def test_medicine_import_chunked(session, suppliers, tmp_path, query_counter):
+    path = write_csv(tmp_path, [
+        "MName;Price;Count;Description;Category;BT;Supplier",
+        "Analgin;25;10;d;Pain;2030-01-01;Pharma",
+        "Aspirin;12;5;d;Pain;;Pharma",           # уже есть в БД
+        "Nurofen;abc;5;d;Pain;;Pharma",          # цена не число
+        "Noshpa;40;0;;;01.02.2031;Wholesale",
+        "Analgin;25;10;d;Pain;;Pharma",          # повтор в файле (другая порция)
+        "Citramon;-1;5;d;Pain;;Pharma",          # отрицательная цена
+        "Ibuprofen;30;7;d;Pain;2030-13-01;Pharma",  # неверная дата
+        "Valerian;15;3;d;Calm;;Unknown",         # неизвестный поставщик
+        "Paracetamol;5;100;;;;Wholesale",
+    ])
+    query_counter.clear()
+    progress = []
+    result = MedicineImport(session, chunk_size=4).run(path, lambda done, total: progress.append((done, total)))
+
+    assert result.inserted == 3
+    assert result.skipped == 6
+    assert sorted(line for line, _ in result.errors) == [3, 4, 6, 7, 8, 9]
+    assert progress == [(4, 9), (8, 9), (9, 9)]
+    # Порция с новыми строками – одна пакетная вставка медикаментов и одна – журнала движения
+    assert sum(statement.lstrip().upper().startswith("INSERT") for statement in query_counter) == 4
+
+    medicines = {m.MName: (m.Price, m.Count, m.BT, m.Supplier) for m in session.query(Medicine)}
+    assert medicines["Analgin"] == (25, 10, date(2030, 1, 1), 1)
+    assert medicines["Noshpa"] == (40, 0, date(2031, 2, 1), 2)
+    assert medicines["Paracetamol"] == (5, 100, None, 2)
+    # Начальные остатки в журнале (без нулевых)
+    opening = {(row.Medicine, row.Delta) for row in session.query(StockMovement)}
+    assert opening == {(session.query(Medicine.id).filter_by(MName=name).scalar(), count)
+                       for name, count in [("Analgin", 10), ("Paracetamol", 100)]}
+    assert StockController(session).reconcile() == {
+        session.query(Medicine.id).filter_by(MName="Aspirin").scalar(): (1, 0)}
+
+
+def test_medicine_import_single_supplier(session, suppliers, tmp_path):
+    path = write_csv(tmp_path, ["MName;Price;Count", "Analgin;25;10", "Noshpa;40;1"])
+    result = MedicineImport(session, supplier_id=2).run(path)
+    assert result.inserted == 2
+    assert {m.Supplier for m in session.query(Medicine).filter(Medicine.MName != "Aspirin")} == {2}
+
+
+def test_supplier_import(session, suppliers, tmp_path):
+    path = write_csv(tmp_path, [
+        "CompName;Address;Number;INN;LeadTime",
+        "Farmlend;c;3;3;14",
+        "Pharma;d;4;4;",     # уже есть
+        "Vita;e;5;5;",       # срок поставки по умолчанию
+        "Empty;;6;6;",       # не заполнен адрес
+    ])
+    result = SupplierImport(session).run(path)
+    assert (result.inserted, result.skipped) == (2, 2)
+    assert {s.CompName: s.LeadTime for s in session.query(Supplier)} == {
+        "Pharma": 7, "Wholesale": 7, "Farmlend": 14, "Vita": 7}
+
+
+def test_missing_columns(session, tmp_path):
+    path = write_csv(tmp_path, ["MName;Price", "Analgin;25"])
+    with pytest.raises(ValueError):
+        MedicineImport(session).run(path)
+
+
+def test_read_prices(tmp_path):
+    from core.importer import read_prices
+    assert read_prices(write_csv(tmp_path, ["MName;Price", "Aspirin;12", "Analgin;30"])) == {"Aspirin": 12, "Analgin": 30}
+    assert read_prices(write_csv(tmp_path, ["id;Price;Note", "1;12;x", "2;30;"]), key='id') == {1: 12, 2: 30}
+    with pytest.raises(ValueError, match="Строка 3"):
+        read_prices(write_csv(tmp_path, ["MName;Price", "Aspirin;12", "Analgin;n/a"]))
@@ -1,3 +1,4 @@
+from datetime import date
 import pytest
 import sqlalchemy
 from controllers.MedicineController import MedicineController
@@ -11,7 +12,7 @@ def test_create_medicine_success(session):
         'Description' : 'Aspirin',
         'Category' : "test",
         'Supplier' : 1,
-        'BT' : "12",
+        'BT' : "2030-12-31",
     }
     controller = MedicineController(session)
     med = controller.create_medicine(test_data)
@@ -28,7 +29,7 @@ def test_get_medicine_by_id(session):
         'Description': 'Aspirin',
         'Category': "test",
         'Supplier': 1,
-        'BT': "12",
+        'BT': "2030-12-31",
     }
     controller = MedicineController(session)
     med = controller.create_medicine(test_data)
@@ -49,7 +50,7 @@ def test_create_medicine_missing_name(session):
         'Description': 'Aspirin',
         'Category': "test",
         'Supplier': 1,
-        'BT': "12",
+        'BT': "2030-12-31",
     }
     controller = MedicineController(session)
     with pytest.raises(ValueError):
@@ -63,7 +64,7 @@ def test_create_medicine_negative_price(session):
         'Description': 'Aspirin',
         'Category': "test",
         'Supplier': 1,
-        'BT': "12",
+        'BT': "2030-12-31",
     }
     controller = MedicineController(session)
     # Отрицательная цена недопустима
@@ -78,7 +79,7 @@ def test_create_medicine_duplicate_name(session):
         'Description': 'Aspirin',
         'Category': "test",
         'Supplier': 1,
-        'BT': "12",
+        'BT': "2030-12-31",
     }
     test_data2 = {
         'MName': "UniqueMed",
@@ -87,7 +88,7 @@ def test_create_medicine_duplicate_name(session):
         'Description': 'Aspirin',
         'Category': "test",
         'Supplier': 1,
-        'BT': "12",
+        'BT': "2030-12-31",
     }
     controller = MedicineController(session)
     controller.create_medicine(test_data)
@@ -103,7 +104,7 @@ def test_update_medicine_success(session):
         'Description': 'Aspirin',
         'Category': "test",
         'Supplier': 1,
-        'BT': "12",
+        'BT': "2030-12-31",
     }
     updated_data = {
         'MName': "Tempra",
@@ -112,7 +113,7 @@ def test_update_medicine_success(session):
         'Description': 'Aspirin',
         'Category': "test",
         'Supplier': 1,
-        'BT': "12",
+        'BT': "2030-12-31",
     }
     controller = MedicineController(session)
     med = controller.create_medicine(test_data)
@@ -129,7 +130,7 @@ def test_update_medicine_not_found(session):
         'Description': 'Aspirin',
         'Category': "test",
         'Supplier': 1,
-        'BT': "12",
+        'BT': "2030-12-31",
     }
     controller = MedicineController(session)
     with pytest.raises(Exception):
@@ -143,7 +144,7 @@ def test_update_medicine_invalid_price(session):
         'Description': 'Aspirin',
         'Category': "test",
         'Supplier': 1,
-        'BT': "12",
+        'BT': "2030-12-31",
     }
     test_data2 = {
         'MName': "VitaminC",
@@ -152,7 +153,7 @@ def test_update_medicine_invalid_price(session):
         'Description': 'Aspirin',
         'Category': "test",
         'Supplier': 1,
-        'BT': "12",
+        'BT': "2030-12-31",
     }
     controller = MedicineController(session)
     med = controller.create_medicine(test_data)
@@ -168,7 +169,7 @@ def test_delete_medicine_success(session):
         'Description': 'Aspirin',
         'Category': "test",
         'Supplier': 1,
-        'BT': "12",
+        'BT': "2030-12-31",
     }
     controller = MedicineController(session)
     med = controller.create_medicine(test_data)
@@ -179,3 +180,271 @@ def test_delete_medicine_not_found(session):
     controller = MedicineController(session)
     with pytest.raises(Exception):
         controller.delete_medicine(999)
+
+def test_get_page_keyset_sorted(session):
+    for i, price in enumerate([30, 10, 20, 10, 30]):
+        session.add(Medicine(MName=f"Med{i}", Price=price, Count=1, Description='d',
+                             Category=None if i % 2 else "cat", BT=date(2030, 12, 31), Supplier=1))
+    session.commit()
+    controller = MedicineController(session)
+
+    # Постранично по цене (с одинаковыми значениями) — без пропусков и повторов
+    seen = []
+    after = None
+    while True:
+        page = controller.get_page(limit=2, after=after, sort_field='Price', descending=True)
+        if not page:
+            break
+        seen.extend(page)
+        after = (page[-1].Price, page[-1].id)
+    assert [m.Price for m in seen] == [30, 30, 20, 10, 10]
+    assert len({m.id for m in seen}) == 5
+
+    # Сортировка по полю с NULL-значениями
+    seen = []
+    after = None
+    while True:
+        page = controller.get_page(limit=2, after=after, sort_field='Category')
+        if not page:
+            break
+        seen.extend(page)
+        after = (page[-1].Category, page[-1].id)
+    assert [m.Category for m in seen] == [None, None, "cat", "cat", "cat"]
+
+    with pytest.raises(ValueError):
+        controller.get_page(sort_field='supplier')
+
+@pytest.mark.parametrize("rows", [3, 30])
+def test_get_page_single_query(session, query_counter, rows):
+    from models.supplier import Supplier
+    session.add(Supplier(id=1, CompName="Supplier", Address="a", Number="1", INN="1"))
+    for i in range(rows):
+        session.add(Medicine(MName=f"Med{i}", Price=i, Count=1, Description='d',
+                             Category="cat", BT=date(2030, 12, 31), Supplier=1))
+    session.commit()
+    session.expunge_all()
+    controller = MedicineController(session)
+
+    query_counter.clear()
+    page = controller.get_page(limit=100)
+    # Все, что показывает вкладка, уже в строках – обращение к ним не порождает запросов
+    values = [[getattr(row, f) for f in row._fields] for row in page]
+    assert len(values) == rows
+    assert all(row.Supplier == "Supplier" for row in page)
+    assert len(query_counter) == 1
+
+def test_search_prefix_and_rank(session):
+    session.add_all([
+        Medicine(MName="Парацетамол", Price=50, Count=1, Description="Жаропонижающее средство",
+                 Category="Анальгетики", BT=date(2030, 12, 31), Supplier=1),
+        Medicine(MName="Ибупрофен", Price=80, Count=1, Description="Противовоспалительное, жаропонижающее",
+                 Category="Анальгетики", BT=date(2030, 12, 31), Supplier=1),
+        Medicine(MName="Амоксициллин", Price=120, Count=1, Description="Антибиотик",
+                 Category="Антибиотики", BT=date(2030, 12, 31), Supplier=1),
+    ])
+    session.commit()
+    controller = MedicineController(session)
+
+    # Поиск по префиксу без учета регистра, по всем трем полям
+    parac = session.query(Medicine).filter_by(MName="Парацетамол").one()
+    assert controller.search("парац") == [parac.id]
+    assert len(controller.search("ЖАРОПОН")) == 2
+    assert len(controller.search("анальг жаропон")) == 2
+    assert len(controller.search("антиб")) == 1
+    assert controller.search("  ") == []
+    # Страница результатов
+    assert len(controller.search("жаропон", limit=1)) == 1
+    assert len(controller.search("жаропон", limit=1, offset=1)) == 1
+
+    # Индекс следует за изменениями и удалениями
+    controller.update_medicine(parac.id, {'Price': 1, 'Count': 1, 'MName': "Цитрамон"})
+    assert controller.search("парац") == []
+    assert controller.search("цитра") == [parac.id]
+    controller.delete_medicine(parac.id)
+    assert controller.search("цитра") == []
+
+def test_get_page_with_filters(session, query_counter):
+    from controllers.MedicineController import MedicineFilter
+    from models.supplier import Supplier
+    session.add_all([
+        Supplier(id=1, CompName="Alpha", Address="a", Number="1", INN="1"),
+        Supplier(id=2, CompName="Beta", Address="a", Number="1", INN="1"),
+    ])
+    for i in range(10):
+        session.add(Medicine(MName=f"Med{i}", Price=i * 10, Count=i, Description='d',
+                             Category="even" if i % 2 == 0 else "odd",
+                             BT=date(2025, i % 9 + 1, 1), Supplier=1 if i < 5 else 2))
+    session.commit()
+    controller = MedicineController(session)
+
+    # Категория и поставщик применяются вместе, а не заменяют друг друга
+    spec = MedicineFilter(category="even", supplier=2)
+    assert [m.MName for m in controller.get_page(filters=spec)] == ["Med6", "Med8"]
+
+    query_counter.clear()
+    spec = MedicineFilter(price_min=20, price_max=70, count_max=5, expires_from="2025-04-01")
+    assert [m.MName for m in controller.get_page(filters=spec)] == ["Med3", "Med4", "Med5"]
+    assert len(query_counter) == 1
+
+    # Списки для фильтра берутся из БД и кэшируются
+    query_counter.clear()
+    assert controller.get_categories() == ["even", "odd"]
+    assert [s.CompName for s in controller.get_medicine_suppliers()] == ["Alpha", "Beta"]
+    assert controller.get_categories() == ["even", "odd"]
+    assert len(query_counter) == 2
+    controller.create_medicine({'MName': "New", 'Price': 1, 'Count': 1, 'Description': 'd',
+                                'Category': "new", 'BT': "2025-01-01", 'Supplier': 1})
+    assert controller.get_categories() == ["even", "new", "odd"]
+
+def test_get_medicine_by_id_cached_until_changed(session, query_counter):
+    from controllers.OrderController import OrderController
+    session.add(Medicine(id=1, MName="Aspirin", Price=10, Count=5, Description='d',
+                         Category="c", BT=date(2025, 1, 1), Supplier=None))
+    session.commit()
+    controller = MedicineController(session)
+    assert controller.get_medicine_by_id(1).Price == 10
+
+    # Повторные запросы (например, при каждом изменении количества в диалоге) не идут в БД
+    query_counter.clear()
+    for _ in range(10):
+        assert controller.get_medicine_by_id(1).Price == 10
+    assert not any(statement.startswith("SELECT") for statement in query_counter)
+    assert controller.cache_stats()['hits'] == 10 and controller.cache_stats()['misses'] == 1
+
+    # Продажа меняет остаток – запись кэша сбрасывается событием
+    OrderController(session).checkout([{'Medicine': 1, 'Amount': 2}], employee_id=1)
+    assert controller.get_medicine_by_id(1).Count == 3
+    controller.update_medicine(1, {'Price': 20, 'Count': 3})
+    assert controller.get_medicine_by_id(1).Price == 20
+
+def test_read_paths_do_not_commit_or_reload(session, query_counter):
+    from sqlalchemy import event, inspect
+    session.add_all(Medicine(MName=f"Med{i}", Price=10, Count=5, Description='d',
+                             Category="c", BT=date(2025, 1, 1), Supplier=1) for i in range(3))
+    session.commit()
+    commits = []
+    event.listen(session, "after_commit", lambda db: commits.append(1))
+    controller = MedicineController(session)
+
+    query_counter.clear()
+    medicines = controller.get_medicines_by_supplier(1)
+    for _ in range(5):
+        assert not controller.is_name_unique("Med0")
+        assert controller.get_medicines_by_supplier(1) == medicines
+        # Объекты не сброшены: обращение к атрибутам не перечитывает их из БД
+        assert [m.MName for m in medicines] == ["Med0", "Med1", "Med2"]
+    assert commits == []
+    assert all(not inspect(m).expired_attributes for m in medicines)
+    assert len(query_counter) == 11
+
+
+def test_read_replica_bind(session):
+    session.add(Medicine(id=1, MName="Aspirin", Price=10, Count=5, Description='d',
+                         Category="c", BT=date(2025, 1, 1), Supplier=1))
+    session.commit()
+    session.expunge_all()
+    controller = MedicineController(session, read_bind=session.get_bind())
+    medicines = controller.get_medicines_by_supplier(1)
+    assert [m.MName for m in medicines] == ["Aspirin"]
+    assert controller.get_medicine_by_id(1).Price == 10
+    # Справочные запросы выполнены в отдельной сессии реплики, основная сессия не затронута
+    assert medicines[0] not in session and len(session.identity_map) == 0
+
+
+def test_get_expiring_window(session, query_counter):
+    from models.supplier import Supplier
+    session.add_all([Supplier(id=1, CompName="Alpha", Address="a", Number="1", INN="1"),
+                     Supplier(id=2, CompName="Beta", Address="b", Number="2", INN="2")])
+    today = date(2025, 6, 1)
+    session.add_all([
+        Medicine(id=1, MName="Soon", Price=10, Count=3, Category="A", BT=date(2025, 6, 5), Supplier=1),
+        Medicine(id=2, MName="Today", Price=5, Count=2, Category="B", BT=today, Supplier=2),
+        Medicine(id=3, MName="Later", Price=7, Count=1, Category="A", BT=date(2025, 6, 30), Supplier=1),
+        Medicine(id=4, MName="Expired", Price=1, Count=9, Category="A", BT=date(2025, 5, 31), Supplier=1),
+        Medicine(id=5, MName="Far", Price=1, Count=9, Category="A", BT=date(2025, 9, 1), Supplier=1),
+        Medicine(id=6, MName="Sold out", Price=1, Count=0, Category="A", BT=date(2025, 6, 2), Supplier=1),
+    ])
+    session.commit()
+    controller = MedicineController(session)
+
+    query_counter.clear()
+    rows = controller.get_expiring(days=30, today=today)
+    assert len(query_counter) == 1
+    assert [(row.MName, row.Supplier, row.StockValue) for row in rows] == [
+        ("Today", "Beta", 10), ("Soon", "Alpha", 30), ("Later", "Alpha", 7)]
+
+    by_supplier = controller.get_expiring(days=30, group_by='Supplier', today=today)
+    assert [tuple(row) for row in by_supplier] == [
+        (1, "Alpha", 2, 4, 37, date(2025, 6, 5)), (2, "Beta", 1, 2, 10, today)]
+    by_category = controller.get_expiring(days=7, group_by='Category', today=today)
+    assert [(row.Category, row.Items, row.StockValue) for row in by_category] == [("A", 1, 30), ("B", 1, 10)]
+    with pytest.raises(ValueError):
+        controller.get_expiring(group_by='Price')
+
+
+@pytest.mark.parametrize("key", ['id', 'MName'])
+def test_update_prices_bulk(session, query_counter, key):
+    from core.events import changes
+    session.add_all(Medicine(id=i, MName=f"M{i}", Price=10, Count=1) for i in range(1, 2001))
+    session.commit()
+    controller = MedicineController(session)
+    controller.get_medicine_by_id(5)
+    received = []
+
+    def on_medicines(kind, ids):
+        received.append((kind, sorted(ids)))
+
+    changes.subscribe('medicines', on_medicines)
+    query_counter.clear()
+    try:
+        # Каждая вторая цена меняется, остальные совпадают с текущей; два ключа неизвестны
+        prices = [(i if key == 'id' else f"M{i}", 10 + i % 2) for i in range(1, 2001)]
+        result = controller.update_prices(prices + [(9999 if key == 'id' else "Unknown", 1)] * 2, key=key)
+    finally:
+        changes.unsubscribe('medicines', on_medicines)
+
+    assert (result.received, result.matched, result.changed) == (2001, 2000, 1000)
+    assert result.unknown == [9999 if key == 'id' else "Unknown"]
+    # DROP IF EXISTS, CREATE временной таблицы, пакетная вставка, неизвестные ключи, изменяемые ID,
+    # UPDATE ... FROM, DROP
+    assert len([s for s in query_counter if not s.startswith("PRAGMA")]) == 7
+    assert received == [(changes.UPDATED, list(range(1, 2001, 2)))]
+    assert session.query(Medicine).filter(Medicine.Price == 11).count() == 1000
+    assert controller.get_medicine_by_id(5).Price == 11  # кэш сброшен событием
+
+
+def test_update_prices_invalid(session):
+    session.add(Medicine(id=1, MName="M1", Price=10, Count=1))
+    session.commit()
+    controller = MedicineController(session)
+    with pytest.raises(ValueError):
+        controller.update_prices({1: -5})
+    with pytest.raises(ValueError):
+        controller.update_prices({1: 5}, key='Category')
+    assert controller.update_prices({}).received == 0
+    assert session.get(Medicine, 1).Price == 10
+
+
+def test_delete_many_cascades(session, query_counter):
+    from controllers.OrderController import OrderController
+    from controllers.ShipmentController import ShipmentController
+    from models.daily_sales import DailySales
+    from models.order import Order
+    from models.shipment_item import ShipmentItem
+    from models.stock_movement import StockMovement
+    controller = MedicineController(session)
+    for i in range(1, 5):
+        controller.create_medicine({'MName': f"M{i}", 'Price': 10, 'Count': 10, 'Description': "d",
+                                    'Category': "c", 'BT': date(2024, 1, i), 'Supplier': 1})
+    OrderController(session).checkout([{'Medicine': i, 'Amount': 1} for i in range(1, 5)], employee_id=1)
+    ShipmentController(session).create_shipment(
+        {"Supplier": 1, "Employee": 1, "DateReg": date(2024, 1, 1), "Status": True},
+        [{"id": i, "Count": 2} for i in range(1, 5)])
+
+    query_counter.clear()
+    assert controller.delete_many([1, 2, 3]) == 3
+    # Заказы, позиции поставок, сводка продаж, журнал движения, медикаменты
+    assert len(query_counter) == 5
+    assert [m.id for m in session.query(Medicine)] == [4]
+    for model in (Order, ShipmentItem, DailySales, StockMovement):
+        assert {row.Medicine for row in session.query(model)} == {4}
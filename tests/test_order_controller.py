@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 import pytest
 from controllers.OrderController import OrderController
 from models.order import Order
@@ -103,3 +103,178 @@ def test_delete_order_not_found(session):
     order_ctrl = OrderController(session)
     with pytest.raises(Exception):
         order_ctrl.delete_order(8888)
+
+@pytest.mark.parametrize("rows", [3, 30])
+def test_get_page_single_query(session, query_counter, rows):
+    from models.employee import Employee
+    from models.medicine import Medicine
+    session.add(Employee(id=1, FName="Ivan", LName="Ivanov", Number="1", Position="p",
+                         Login="ivan", Pass="x", DTB=datetime(1990, 1, 1).date(), Admin=False))
+    session.add(Medicine(id=1, MName="Aspirin", Price=10, Count=100, Description="d",
+                         Category="c", BT=date(2030, 12, 31), Supplier=None))
+    for i in range(rows):
+        session.add(Order(DateReg=datetime(2024, 1, 1).date(), Amount=1, Status=True, Employee=1, Medicine=1))
+    session.commit()
+    session.expunge_all()
+    order_ctrl = OrderController(session)
+
+    query_counter.clear()
+    page = order_ctrl.get_page(limit=100)
+    assert len(page) == rows
+    assert all(row.Employee == "Ivanov Ivan" and row.Medicine == "Aspirin" for row in page)
+    assert len(query_counter) == 1
+
+def test_create_and_delete_order_emit_changes(session):
+    from core.events import changes
+    from models.medicine import Medicine
+    session.add(Medicine(id=1, MName="Aspirin", Price=10, Count=100, Description="d",
+                         Category="c", BT=date(2030, 12, 31), Supplier=None))
+    session.commit()
+    received = []
+
+    def on_orders(kind, ids):
+        received.append(('orders', kind, ids))
+
+    def on_medicines(kind, ids):
+        received.append(('medicines', kind, ids))
+
+    changes.subscribe('orders', on_orders)
+    changes.subscribe('medicines', on_medicines)
+    try:
+        order_ctrl = OrderController(session)
+        order = order_ctrl.create_order({
+            'DateReg': datetime.strptime('1999-12-31', '%Y-%m-%d').date(),
+            'Amount': 10, 'Status': True, 'Employee': 1, 'Medicine': 1,
+        })
+        order_ctrl.delete_order(order.id)
+    finally:
+        changes.unsubscribe('orders', on_orders)
+        changes.unsubscribe('medicines', on_medicines)
+
+    # Вкладкам сообщаются только затронутые строки
+    assert received == [
+        ('orders', changes.INSERTED, [order.id]),
+        ('medicines', changes.UPDATED, [1]),
+        ('orders', changes.DELETED, [order.id]),
+        ('medicines', changes.UPDATED, [1]),  # удаленный заказ вернул медикамент на склад
+    ]
+
+
+def add_medicines(session, counts):
+    from models.medicine import Medicine
+    session.add_all(Medicine(id=i, MName=f"M{i}", Price=10, Count=count, Supplier=None)
+                    for i, count in enumerate(counts, start=1))
+    session.commit()
+
+
+def test_checkout_many_lines_one_transaction(session, query_counter):
+    from models.medicine import Medicine
+    add_medicines(session, [10, 10, 10, 10, 10, 10, 10, 10])
+    order_ctrl = OrderController(session)
+    query_counter.clear()
+    lines = [{'Medicine': i, 'Amount': i} for i in range(8, 0, -1)] + [{'Medicine': 1, 'Amount': 1}]
+    order_ids = order_ctrl.checkout(lines, employee_id=1)
+    # SELECT ... FOR UPDATE, один UPDATE остатков, пакетный INSERT заказов, сводка продаж, журнал движения
+    assert len(query_counter) == 5
+    assert "ORDER BY medicines.id" in query_counter[0]
+    assert len(order_ids) == 8
+    counts = {m.id: m.Count for m in session.query(Medicine)}
+    assert counts == {1: 8, 2: 8, 3: 7, 4: 6, 5: 5, 6: 4, 7: 3, 8: 2}
+    amounts = {o.Medicine: o.Amount for o in session.query(Order).filter(Order.id.in_(order_ids))}
+    assert amounts[1] == 2 and amounts[8] == 8
+
+
+@pytest.mark.parametrize("stock_locking", [OrderController.PESSIMISTIC, OrderController.OPTIMISTIC])
+def test_checkout_insufficient_stock_changes_nothing(session, stock_locking):
+    from models.medicine import Medicine
+    add_medicines(session, [5, 1])
+    order_ctrl = OrderController(session, stock_locking=stock_locking)
+    with pytest.raises(ValueError):
+        order_ctrl.checkout([{'Medicine': 1, 'Amount': 2}, {'Medicine': 2, 'Amount': 2}], employee_id=1)
+    with pytest.raises(ValueError):
+        order_ctrl.checkout([{'Medicine': 1, 'Amount': 2}, {'Medicine': 99, 'Amount': 1}], employee_id=1)
+    assert session.query(Order).count() == 0
+    assert [m.Count for m in session.query(Medicine).order_by(Medicine.id)] == [5, 1]
+
+
+def test_checkout_optimistic_conditional_update(session, query_counter):
+    from models.medicine import Medicine
+    add_medicines(session, [10, 10, 10])
+    order_ctrl = OrderController(session, stock_locking=OrderController.OPTIMISTIC)
+    query_counter.clear()
+    order_ids = order_ctrl.checkout([{'Medicine': i, 'Amount': i} for i in (1, 2, 3)], employee_id=1)
+    # Без SELECT ... FOR UPDATE: условный UPDATE остатков, пакетный INSERT заказов, сводка продаж, журнал движения
+    assert len(query_counter) == 4
+    assert query_counter[0].startswith("UPDATE medicines") and "medicines.\"Count\" >=" in query_counter[0]
+    assert len(order_ids) == 3
+    assert [m.Count for m in session.query(Medicine).order_by(Medicine.id)] == [9, 8, 7]
+
+
+def test_checkout_retries_on_lock_error(session, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+    from models.medicine import Medicine
+    add_medicines(session, [10])
+    order_ctrl = OrderController(session, stock_locking=OrderController.OPTIMISTIC)
+    insert_orders = order_ctrl._insert_orders
+    failures = []
+
+    def deadlock_once(rows):
+        if not failures:
+            failures.append(1)
+            raise OperationalError("INSERT", {}, Exception("Deadlock found when trying to get lock"))
+        return insert_orders(rows)
+
+    monkeypatch.setattr(order_ctrl, "_insert_orders", deadlock_once)
+    order_ctrl.checkout([{'Medicine': 1, 'Amount': 4}], employee_id=1)
+    # Первая попытка откачена целиком, остаток списан один раз
+    assert failures == [1]
+    assert session.query(Order).count() == 1
+    assert session.get(Medicine, 1).Count == 6
+
+
+def test_total_costs_in_one_query(session, query_counter):
+    from models.medicine import Medicine
+    session.add_all([Medicine(id=1, MName="M1", Price=10, Count=100), Medicine(id=2, MName="M2", Price=3, Count=100)])
+    session.add_all(Order(id=i, DateReg=datetime(2024, 1, 1).date(), Amount=i, Status=True,
+                          Employee=1, Medicine=1 + i % 2) for i in range(1, 101))
+    session.commit()
+    order_ctrl = OrderController(session)
+
+    query_counter.clear()
+    totals = order_ctrl.get_total_costs(list(range(1, 101)))
+    assert len(query_counter) == 1
+    assert totals[1] == 3 and totals[2] == 20 and len(totals) == 100
+    assert order_ctrl.get_total_cost(4) == 40
+    assert session.get(Order, 4).get_total_cost() == 40
+    with pytest.raises(ValueError):
+        order_ctrl.get_total_cost(1000)
+
+    # Сохраненная цена продажи важнее текущей цены медикамента
+    session.get(Order, 4).Price = 7
+    session.commit()
+    assert order_ctrl.get_total_costs([4]) == {4: 28}
+    assert session.get(Order, 4).get_total_cost() == 28
+
+
+def test_delete_many_returns_stock(session, query_counter):
+    from controllers.SalesController import SalesController
+    from controllers.StockController import StockController
+    from models.medicine import Medicine
+    add_medicines(session, [100, 100])
+    StockController(session).record({1: 100, 2: 100}, StockController.OPENING)
+    session.commit()
+    order_ctrl = OrderController(session)
+    order_ids = [order_id for i in range(50)
+                 for order_id in order_ctrl.checkout([{'Medicine': 1 + i % 2, 'Amount': 1 + i % 3}], employee_id=1,
+                                                     date_reg=date(2024, 1, 1 + i % 5))]
+    kept = order_ids[:10]
+    query_counter.clear()
+    assert order_ctrl.delete_many(order_ids[10:] + [order_ids[10], 99999]) == 40
+    # Количества по медикаментам, сводка продаж, остатки, журнал движения, DELETE
+    assert len(query_counter) == 5
+    assert sorted(o.id for o in session.query(Order)) == kept
+    sold = {m: sum(1 + i % 3 for i in range(10) if 1 + i % 2 == m) for m in (1, 2)}
+    assert {m.id: m.Count for m in session.query(Medicine)} == {m: 100 - sold[m] for m in (1, 2)}
+    assert {row[0]: row[1] for row in SalesController(session).get_totals(group_by='Medicine')} == sold
+    assert StockController(session).reconcile() == {}
+    assert order_ctrl.delete_many([]) == 0
@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from controllers.ShipmentController import ShipmentController
+from core.reorder import ReorderEngine
+from models.medicine import Medicine
+from models.order import Order
+from models.shipment import Shipment
+from models.shipment_item import ShipmentItem
+from models.supplier import Supplier
+
+TODAY = date(2025, 6, 1)
+
+
+@pytest.fixture
+def catalog(session):
+    session.add_all([
+        Supplier(id=1, CompName="Fast", Address="a", Number="1", INN="1", LeadTime=2),
+        Supplier(id=2, CompName="Slow", Address="b", Number="2", INN="2", LeadTime=20),
+    ])
+    session.add_all([
+        Medicine(id=1, MName="Hot", Price=10, Count=5, Supplier=1),       # 3 в день, хватит меньше чем на 9 дней
+        Medicine(id=2, MName="Stocked", Price=10, Count=500, Supplier=1),  # 3 в день, запаса много
+        Medicine(id=3, MName="Slow lane", Price=10, Count=20, Supplier=2),  # 1 в день, поставка 20 дней
+        Medicine(id=4, MName="Unsold", Price=10, Count=0, Supplier=2),     # продаж не было
+        Medicine(id=5, MName="No supplier", Price=10, Count=0, Supplier=None),
+    ])
+    for day in range(30):
+        sale_date = TODAY - timedelta(days=day + 1)
+        session.add_all([Order(DateReg=sale_date, Amount=3, Status=True, Employee=1, Medicine=1),
+                         Order(DateReg=sale_date, Amount=3, Status=True, Employee=1, Medicine=2),
+                         Order(DateReg=sale_date, Amount=1, Status=True, Employee=1, Medicine=3),
+                         Order(DateReg=sale_date, Amount=5, Status=True, Employee=1, Medicine=5)])
+    # Старые продажи за окном не учитываются
+    session.add(Order(DateReg=TODAY - timedelta(days=90), Amount=1000, Status=True, Employee=1, Medicine=4))
+    session.commit()
+
+
+def test_plan_by_velocity_and_lead_time(session, catalog):
+    engine = ReorderEngine(session, ShipmentController(session), window_days=30, review_days=14, safety_days=7)
+    # Hot: 3 * (2 + 7 + 14) - 5 = 64; Slow lane: 1 * (20 + 7 + 14) - 20 = 21
+    assert engine.plan(TODAY) == {1: [(1, 64)], 2: [(3, 21)]}
+
+
+def test_run_creates_draft_shipments_once(session, catalog):
+    engine = ReorderEngine(session, ShipmentController(session), window_days=30, review_days=14, safety_days=7)
+    shipment_ids = engine.run(employee_id=1, today=TODAY)
+    shipments = session.query(Shipment).filter(Shipment.id.in_(shipment_ids)).order_by(Shipment.Supplier).all()
+    assert [(s.Supplier, s.Status, s.Price) for s in shipments] == [(1, False, 640), (2, False, 210)]
+    assert session.get(Medicine, 1).Count == 5  # черновик не меняет остаток
+    assert {(i.Medicine, i.Quantity) for i in session.query(ShipmentItem)} == {(1, 64), (3, 21)}
+    # Непринятые поставки учитываются: повторный запуск ничего не заказывает
+    assert engine.run(employee_id=1, today=TODAY) == []
+
+
+def test_abandoned_drafts_not_on_order(session, catalog):
+    engine = ReorderEngine(session, ShipmentController(session), window_days=30, review_days=14, safety_days=7)
+    assert engine.run(employee_id=1, today=TODAY - timedelta(days=3)) != []
+    # Черновик Fast (срок поставки 2 дня) трехдневной давности брошен, Slow (20 дней) – еще ждет
+    assert engine.plan(TODAY) == {1: [(1, 64)]}
+
+
+def test_explicit_zero_settings(session, catalog):
+    engine = ReorderEngine(session, ShipmentController(session), window_days=30, review_days=0, safety_days=0)
+    # Hot: 3 * 2 - 5 = 1; Slow lane: 1 * 20 - 20 = 0
+    assert engine.plan(TODAY) == {1: [(1, 1)]}
+    with pytest.raises(ValueError):
+        ReorderEngine(session, ShipmentController(session), window_days=0)
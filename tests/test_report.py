@@ -0,0 +1,61 @@
+import csv
+from datetime import date
+
+import pytest
+
+from core.report import OrderReport
+from models.employee import Employee
+from models.medicine import Medicine
+from models.order import Order
+
+
+@pytest.fixture
+def orders(session):
+    session.add(Employee(id=1, FName="Ivan", LName="Ivanov", Number="1", Position="p",
+                         Login="ivan", Pass="x", DTB=date(1990, 1, 1), Admin=False))
+    session.add(Medicine(id=1, MName="Aspirin", Price=15, Count=100, Supplier=None))
+    session.add_all(Order(DateReg=date(2024, 1, 1 + i % 28), Amount=i % 3 + 1, Status=i % 2 == 0,
+                          Employee=1, Medicine=1) for i in range(25))
+    session.commit()
+
+
+def test_csv_report_streams_rows(session, orders, query_counter, tmp_path):
+    path = str(tmp_path / "orders.csv")
+    progress = []
+    report = OrderReport(session, chunk_size=10)
+    query_counter.clear()
+    assert report.export(path, lambda written, total: progress.append((written, total))) == 25
+    # COUNT для индикатора и один потоковый SELECT с JOIN
+    assert len(query_counter) == 2
+    assert progress == [(10, 25), (20, 25), (25, 25)]
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f, delimiter=';'))
+    assert rows[0] == OrderReport.HEADERS
+    assert rows[1] == ['1', '2024-01-01', 'Ivanov Ivan', 'Aspirin', '15', '1', '15', 'Выполнено']
+    assert rows[3][5:7] == ['3', '45']
+    assert len(rows) == 26
+
+
+def test_report_uses_sale_price(session, orders):
+    # Цена сменилась после продажи: стоимость – по цене продажи, у заказов без нее – по текущей
+    session.query(Order).filter(Order.id == 1).update({Order.Price: 10})
+    session.query(Medicine).update({Medicine.Price: 20})
+    session.commit()
+    rows = list(OrderReport(session).rows())
+    assert rows[0][4:7] == (10, 1, 10)
+    assert rows[1][4:7] == (20, 2, 40)
+
+
+def test_report_date_range(session, orders, tmp_path):
+    report = OrderReport(session, date_from=date(2024, 1, 2), date_to=date(2024, 1, 3))
+    assert report.count() == 2
+    assert [row[1] for row in report.rows()] == [date(2024, 1, 2), date(2024, 1, 3)]
+
+
+def test_xlsx_report(session, orders, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = str(tmp_path / "orders.xlsx")
+    assert OrderReport(session).export(path) == 25
+    rows = list(openpyxl.load_workbook(path).active.values)
+    assert rows[0] == tuple(OrderReport.HEADERS)
+    assert len(rows) == 26 and rows[1][2:7] == ('Ivanov Ivan', 'Aspirin', 15, 1, 15)
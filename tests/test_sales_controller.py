@@ -0,0 +1,82 @@
+from datetime import date
+
+import pytest
+
+from controllers.OrderController import OrderController
+from controllers.SalesController import SalesController
+from models.daily_sales import DailySales
+from models.medicine import Medicine
+
+
+@pytest.fixture
+def medicines(session):
+    session.add_all([
+        Medicine(id=1, MName="Aspirin", Price=10, Count=100, Supplier=None),
+        Medicine(id=2, MName="Analgin", Price=25, Count=100, Supplier=None),
+    ])
+    session.commit()
+
+
+def rollup(session):
+    return {(row.Date, row.Medicine, row.Employee): (row.Units, row.Revenue)
+            for row in session.query(DailySales).filter(DailySales.Units != 0)}
+
+
+def test_orders_maintain_daily_sales(session, medicines):
+    order_ctrl = OrderController(session)
+    day = date(2024, 3, 1)
+    order_ctrl.checkout([{'Medicine': 1, 'Amount': 2}, {'Medicine': 2, 'Amount': 1}], employee_id=1, date_reg=day)
+    order_ctrl.checkout([{'Medicine': 1, 'Amount': 3}], employee_id=1, date_reg=day)
+    order = order_ctrl.create_order({'DateReg': day, 'Amount': 4, 'Status': True, 'Employee': 2, 'Medicine': 2})
+    assert rollup(session) == {
+        (day, 1, 1): (5, 50),
+        (day, 2, 1): (1, 25),
+        (day, 2, 2): (4, 100),
+    }
+
+    # Изменение переносит заказ в другую строку сводки, удаление вычитает его
+    order_ctrl.update_order(order.id, {'Amount': 2, 'DateReg': date(2024, 3, 2)})
+    assert rollup(session)[(date(2024, 3, 2), 2, 2)] == (2, 50)
+    assert (day, 2, 2) not in rollup(session)
+    order_ctrl.delete_order(order.id)
+    assert (date(2024, 3, 2), 2, 2) not in rollup(session)
+
+    sales = SalesController(session)
+    assert [tuple(row) for row in sales.get_totals(group_by='Medicine')] == [(1, 5, 50), (2, 1, 25)]
+    assert [tuple(row) for row in sales.get_totals(date_from=date(2024, 3, 2))] == []
+    with pytest.raises(ValueError):
+        sales.get_totals(group_by='Price')
+
+
+def test_backfill_matches_incremental(session, medicines):
+    order_ctrl = OrderController(session)
+    for i in range(25):
+        order_ctrl.checkout([{'Medicine': 1 + i % 2, 'Amount': 1 + i % 3}], employee_id=1 + i % 3,
+                            date_reg=date(2024, 1, 1 + i % 4))
+    incremental = rollup(session)
+
+    assert SalesController(session).backfill(batch_size=7) == 25
+    assert rollup(session) == incremental
+
+
+def test_price_change_keeps_rollup_consistent(session, medicines):
+    order_ctrl = OrderController(session)
+    day = date(2024, 3, 1)
+    first, second = order_ctrl.checkout([{'Medicine': 1, 'Amount': 2}, {'Medicine': 2, 'Amount': 1}],
+                                        employee_id=1, date_reg=day)
+    kept, = order_ctrl.checkout([{'Medicine': 1, 'Amount': 3}], employee_id=1, date_reg=day)
+    session.query(Medicine).update({Medicine.Price: Medicine.Price * 2})
+    session.commit()
+
+    # Отмена и изменение – по цене продажи, без «фантомной» выручки
+    order_ctrl.delete_order(second)
+    order_ctrl.delete_many([first])
+    order_ctrl.update_order(kept, {'Amount': 1})
+    assert session.query(DailySales.Medicine, DailySales.Units, DailySales.Revenue).order_by(
+        DailySales.Medicine).all() == [(1, 1, 10), (2, 0, 0)]
+    # Смена медикамента – по его текущей цене
+    order_ctrl.update_order(kept, {'Medicine': 2})
+    assert rollup(session) == {(day, 2, 1): (1, 50)}
+
+    assert SalesController(session).backfill() == 1
+    assert rollup(session) == {(day, 2, 1): (1, 50)}
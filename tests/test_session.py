@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy.orm import sessionmaker, scoped_session
+
+from controllers.SupplierController import SupplierController
+from core.session import unit_of_work, UnitOfWorkController
+from models.supplier import Supplier
+
+
+@pytest.fixture
+def registry(session):
+    """scoped_session поверх той же in-memory БД, что и фикстура session."""
+    registry = scoped_session(sessionmaker(bind=session.get_bind(), expire_on_commit=False))
+    yield registry
+    registry.remove()
+
+
+def supplier_data(i):
+    return {'CompName': f"Supplier {i}", 'Address': "Lenina 1", 'Number': "111", 'INN': f"77{i}"}
+
+
+def test_each_call_is_own_unit_of_work(registry):
+    ctrl = UnitOfWorkController(SupplierController(registry))
+    for i in range(20):
+        ctrl.create_supplier(supplier_data(i))
+        suppliers = ctrl.get_all()
+        # После вызова сессия потока закрыта и удалена: identity map не накапливается
+        assert not registry.registry.has()
+    assert len(suppliers) == 20
+    # Объекты остаются читаемыми после закрытия сессии
+    assert suppliers[0].CompName == "Supplier 0"
+
+
+def test_unit_of_work_rolls_back_on_error(registry):
+    ctrl = SupplierController(registry)
+    with pytest.raises(ValueError):
+        with unit_of_work(registry):
+            ctrl.db.add(Supplier(**supplier_data(1)))
+            raise ValueError("boom")
+    assert not registry.registry.has()
+    assert UnitOfWorkController(ctrl).get_all() == []
+
+
+def test_nested_unit_of_work_shares_session(registry):
+    with unit_of_work(registry) as outer:
+        with unit_of_work(registry) as inner:
+            assert inner is outer
+        # Вложенная единица работы не закрывает сессию внешней
+        assert registry.registry.has()
+    assert not registry.registry.has()
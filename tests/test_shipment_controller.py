@@ -25,7 +25,7 @@ def test_create_shipment(controller, session):
     medicine = Medicine(id = 1, MName = "Test MName",
                         Price = 100, Count = 100,
                         Description = "Test Description",
-                        Category = "Test Category", BT = "Test BT",
+                        Category = "Test Category", BT = date(2030, 12, 31),
                         Supplier = 1)
     session.add_all([supplier, employee, medicine])
     session.commit()
@@ -142,7 +142,7 @@ def test_delete_shipment(controller, session):
     medicine = Medicine(id=1, MName="Test MName",
                         Price=100, Count=100,
                         Description="Test Description",
-                        Category="Test Category", BT="Test BT",
+                        Category="Test Category", BT=date(2030, 12, 31),
                         Supplier=1)
     session.add_all([supplier, employee, medicine])
     session.commit()
@@ -223,4 +223,97 @@ def test_get_all_shipments(controller, session):
         # Поля, которые ДОЛЖНЫ быть загружены
         assert "id" not in unloaded
         assert "Supplier" not in unloaded
-        assert "DateReg" not in unloaded
\ No newline at end of file
+        assert "DateReg" not in unloaded
+@pytest.mark.parametrize("rows", [3, 30])
+def test_get_page_single_query(controller, session, query_counter, rows):
+    session.add(Supplier(id=1, CompName="Test Supplier", Address="Test Address",
+                         Number="Test Number", INN="Test INN"))
+    session.add(Employee(id=1, FName="Test FName", LName="Test LName", Number="Test Number",
+                         Position="Test Position", Login="Test Login", Pass="Test Pass",
+                         DTB=datetime.strptime('1999-12-31', '%Y-%m-%d').date(), Admin=False))
+    for i in range(rows):
+        session.add(Shipment(Supplier=1, Employee=1, DateReg=date(2023, 1, 1), Price=i, Status=True))
+    session.commit()
+    session.expunge_all()
+
+    query_counter.clear()
+    page = controller.get_page(limit=100, sort_field='Supplier')
+    assert len(page) == rows
+    assert all(row.Supplier == "Test Supplier" for row in page)
+    assert all(row.Employee == "Test LName Test FName" for row in page)
+    assert len(query_counter) == 1
+
+
+@pytest.mark.parametrize("lines", [1, 10, 100])
+def test_create_shipment_batched(controller, session, query_counter, lines):
+    session.add(Supplier(id=1, CompName="Test Supplier", Address="Test Address",
+                         Number="Test Number", INN="Test INN"))
+    session.add(Employee(id=1, FName="Test FName", LName="Test LName", Number="Test Number",
+                         Position="Test Position", Login="Test Login", Pass="Test Pass",
+                         DTB=datetime.strptime('1999-12-31', '%Y-%m-%d').date(), Admin=False))
+    session.add_all(Medicine(id=i, MName=f"M{i}", Price=i, Count=10, Supplier=1) for i in range(1, lines + 1))
+    session.commit()
+
+    query_counter.clear()
+    items = [{"id": i, "Count": 2} for i in range(1, lines + 1)]
+    shipment = controller.create_shipment(
+        {"Supplier": 1, "Employee": 1, "DateReg": date.today(), "Status": True}, items)
+    # SELECT ... IN, INSERT поставки, пакетный INSERT позиций, UPDATE ... CASE, журнал движения, refresh
+    assert len(query_counter) == 6
+    assert shipment.Price == sum(2 * i for i in range(1, lines + 1))
+    assert session.query(ShipmentItem).filter_by(Shipment=shipment.id).count() == lines
+    assert {m.Count for m in session.query(Medicine)} == {12}
+
+
+def test_create_shipment_unknown_medicine_rolls_back(controller, session):
+    session.add(Medicine(id=1, MName="M1", Price=5, Count=10))
+    session.commit()
+    with pytest.raises(ValueError):
+        controller.create_shipment({"Supplier": 1, "Employee": 1, "DateReg": date.today(), "Status": True},
+                                   [{"id": 1, "Count": 1}, {"id": 99, "Count": 1}])
+    assert session.query(Shipment).count() == 0
+    assert session.get(Medicine, 1).Count == 10
+
+
+def test_total_quantities_one_grouped_query(controller, session, query_counter):
+    session.add_all(Medicine(id=i, MName=f"M{i}", Price=i, Count=10) for i in range(1, 4))
+    session.add_all(Shipment(id=i, DateReg=date.today(), Price=0, Status=False, Supplier=1, Employee=1)
+                    for i in range(1, 4))
+    session.add_all([ShipmentItem(Shipment=1, Medicine=1, Quantity=5), ShipmentItem(Shipment=1, Medicine=2, Quantity=7),
+                     ShipmentItem(Shipment=2, Medicine=3, Quantity=1)])
+    session.commit()
+
+    query_counter.clear()
+    assert controller.get_total_quantities([1, 2, 3]) == {1: 12, 2: 1, 3: 0}
+    assert len(query_counter) == 1
+    assert controller.get_total_quantity(1) == 12
+    # То же выражение в запросе и на объекте
+    assert [s.id for s in session.query(Shipment).filter(Shipment.total_quantity > 5)] == [1]
+    assert session.get(Shipment, 2).total_quantity == 1
+    with pytest.raises(ValueError):
+        controller.get_total_quantity(99)
+
+
+def test_delete_many_shipments(controller, session, query_counter):
+    from controllers.StockController import StockController
+    session.add_all(Medicine(id=i, MName=f"M{i}", Price=i, Count=0, Supplier=None) for i in (1, 2))
+    session.commit()
+    posted = [controller.create_shipment({"Supplier": 1, "Employee": 1, "DateReg": date.today(), "Status": True},
+                                         [{"id": 1, "Count": 5}, {"id": 2, "Count": 3}]).id for _ in range(3)]
+    draft = controller.create_shipment({"Supplier": 1, "Employee": 1, "DateReg": date.today(), "Status": False},
+                                       [{"id": 1, "Count": 50}]).id
+    query_counter.clear()
+    assert controller.delete_many(posted[1:] + [draft]) == 3
+    # Количества проведенных, остатки, журнал движения, DELETE позиций, DELETE поставок
+    assert len(query_counter) == 5
+    assert [s.id for s in session.query(Shipment)] == posted[:1]
+    assert session.query(ShipmentItem).count() == 2
+    assert [m.Count for m in session.query(Medicine).order_by(Medicine.id)] == [5, 3]
+    assert StockController(session).reconcile() == {}
+
+    # Медикаменты проведенной поставки уже проданы – ничего не удаляется
+    session.query(Medicine).filter(Medicine.id == 1).update({Medicine.Count: 2})
+    session.commit()
+    with pytest.raises(ValueError):
+        controller.delete_many(posted[:1])
+    assert session.query(Shipment).count() == 1
@@ -1,3 +1,4 @@
+from datetime import date
 import pytest
 from sqlalchemy import inspect
 from models.shipment_item import ShipmentItem
@@ -28,22 +29,22 @@ def setup_data(session):
     medicine = Medicine(id=1, MName="Test Medicine",
                         Price=100, Count=100,
                         Description="Test Description",
-                        Category="Test Category", BT="Test BT",
+                        Category="Test Category", BT=date(2030, 12, 31),
                         Supplier=1)
     medicine2 = Medicine(id=2, MName="Test Medicine2",
                         Price=100, Count=100,
                         Description="Test Description",
-                        Category="Test Category", BT="Test BT",
+                        Category="Test Category", BT=date(2030, 12, 31),
                         Supplier=1)
     shipment = Shipment(
         Supplier=supplier.id,
         Employee=employee.id,
         DateReg=date.today(),
-        Amount=100,
+        Price=100,
         Status=True
     )
 
-    session.add_all([supplier, employee, medicine, shipment])
+    session.add_all([supplier, employee, medicine, medicine2, shipment])
     session.commit()
     return {
         "shipment_id": shipment.id,
@@ -70,7 +71,7 @@ def test_create_shipmentitem(item_controller, session, setup_data):
     assert created_item.Quantity == 10
 
     # Проверяем запись в БД
-    db_item = session.get(ShipmentItem, created_item.Shipment)
+    db_item = session.get(ShipmentItem, (created_item.Shipment, created_item.Medicine))
     assert db_item is not None
 
 
@@ -84,13 +85,15 @@ def test_get_shipmentitem_by_id(item_controller, session, setup_data):
     session.add(item)
     session.commit()
 
-    # Получаем существующий объект
-    result = item_controller.get_shipmentitem_by_id(item.Shipment)
+    # Получаем существующий объект по составному ключу и первую позицию поставки
+    result = item_controller.get_shipmentitem_by_id(item.Shipment, item.Medicine)
     assert result is not None
     assert result.Quantity == 15
+    assert item_controller.get_shipmentitem_by_id(item.Shipment).Quantity == 15
 
     # Проверяем несуществующий ID
     assert item_controller.get_shipmentitem_by_id(999) is None
+    assert item_controller.get_shipmentitem_by_id(item.Shipment, setup_data["medicine2_id"]) is None
 
 
 def test_update_shipmentitem(item_controller, session, setup_data):
@@ -107,12 +110,13 @@ def test_update_shipmentitem(item_controller, session, setup_data):
     update_data = {"Quantity": 25}
     updated = item_controller.update_shipmentitem(
         item.Shipment,
-        update_data
+        update_data,
+        medicine_id=item.Medicine
     )
 
     # Проверяем обновление
     assert updated.Quantity == 25
-    db_item = session.get(ShipmentItem, item.Shipment)
+    db_item = session.get(ShipmentItem, (item.Shipment, item.Medicine))
     assert db_item.Quantity == 25
 
     # Проверяем несуществующий ID
@@ -130,11 +134,11 @@ def test_delete_shipmentitem(item_controller, session, setup_data):
     session.commit()
 
     # Удаляем объект
-    deleted = item_controller.delete_shipmentitem(item.Shipment)
+    deleted = item_controller.delete_shipmentitem(item.Shipment, item.Medicine)
     assert deleted is not None
 
     # Проверяем удаление
-    assert session.get(ShipmentItem, item.Shipment) is None
+    assert session.get(ShipmentItem, (setup_data["shipment_id"], setup_data["medicine_id"])) is None
 
     # Проверяем несуществующий ID
     assert item_controller.delete_shipmentitem(999) is None
@@ -167,7 +171,6 @@ def test_get_all_shipmentitems(item_controller, session, setup_data):
         unloaded = insp.unloaded
 
         # Проверяем загруженные поля
-        assert "id" not in unloaded
         assert "Shipment" not in unloaded
         assert "Medicine" not in unloaded
         assert "Quantity" not in unloaded
@@ -182,4 +185,89 @@ def test_get_all_shipmentitems(item_controller, session, setup_data):
     # Проверяем содержимое
     quantities = {item.Quantity for item in result}
     assert 5 in quantities
-    assert 10 in quantities
\ No newline at end of file
+    assert 10 in quantities
+
+def test_items_for_shipments_single_query(item_controller, session, setup_data, query_counter):
+    second = Shipment(Supplier=1, Employee=1, DateReg=date.today(), Price=0, Status=False)
+    session.add(second)
+    session.flush()
+    session.add_all([
+        ShipmentItem(Shipment=setup_data["shipment_id"], Medicine=1, Quantity=5),
+        ShipmentItem(Shipment=setup_data["shipment_id"], Medicine=2, Quantity=7),
+        ShipmentItem(Shipment=second.id, Medicine=2, Quantity=3),
+    ])
+    second_id = second.id
+    session.commit()
+    session.expire_all()
+
+    query_counter.clear()
+    items = item_controller.get_items_for_shipments([setup_data["shipment_id"], second_id, 999])
+    names = {shipment_id: [(item.medicine.MName, item.Quantity) for item in shipment_items]
+             for shipment_id, shipment_items in items.items()}
+    # Названия медикаментов загружены тем же запросом
+    assert len(query_counter) == 1
+    assert names == {setup_data["shipment_id"]: [("Test Medicine", 5), ("Test Medicine2", 7)],
+                     second_id: [("Test Medicine2", 3)], 999: []}
+    assert item_controller.get_items_for_shipments([]) == {}
+
+
+def test_receipts_for_medicines_single_query(item_controller, session, setup_data, query_counter):
+    older = Shipment(Supplier=1, Employee=1, DateReg=date(2024, 1, 1), Price=0, Status=True)
+    draft = Shipment(Supplier=1, Employee=1, DateReg=date(2024, 2, 1), Price=0, Status=False)
+    session.add_all([older, draft])
+    session.flush()
+    session.add_all([
+        ShipmentItem(Shipment=setup_data["shipment_id"], Medicine=2, Quantity=7),
+        ShipmentItem(Shipment=older.id, Medicine=2, Quantity=4),
+        ShipmentItem(Shipment=draft.id, Medicine=2, Quantity=9),
+        ShipmentItem(Shipment=older.id, Medicine=1, Quantity=1),
+    ])
+    older_id = older.id
+    session.commit()
+
+    query_counter.clear()
+    receipts = item_controller.get_receipts_for_medicines([1, 2, 3])
+    assert len(query_counter) == 1
+    assert {m: [(r.Shipment, r.Quantity) for r in rows] for m, rows in receipts.items()} == {
+        1: [(older_id, 1)],
+        2: [(setup_data["shipment_id"], 7), (older_id, 4)],  # новые первыми, без черновика
+        3: [],
+    }
+    assert receipts[2][0].Supplier == "Test Supplier"
+    assert len(item_controller.get_receipts_for_medicines([2], posted_only=False)[2]) == 3
+
+
+def test_posted_shipment_items_move_stock(item_controller, session, setup_data):
+    from models.stock_movement import StockMovement
+    shipment_id = setup_data["shipment_id"]
+    draft = Shipment(Supplier=1, Employee=1, DateReg=date.today(), Price=0, Status=False)
+    session.add(draft)
+    session.commit()
+    draft_id = draft.id
+
+    def counts():
+        session.expire_all()
+        return [m.Count for m in session.query(Medicine).order_by(Medicine.id)]
+
+    item_controller.create_shipmentitem({"Shipment": shipment_id, "Medicine": 1, "Quantity": 10})
+    item_controller.create_shipmentitem({"Shipment": draft_id, "Medicine": 1, "Quantity": 50})
+    assert counts() == [110, 100]  # черновик остатки не меняет
+    # Позиция переносится на другой медикамент с другим количеством
+    item_controller.update_shipmentitem(shipment_id, {"Medicine": 2, "Quantity": 4}, medicine_id=1)
+    assert counts() == [100, 104]
+    item_controller.delete_shipmentitem(shipment_id, 2)
+    assert counts() == [100, 100]
+    assert [(m.Medicine, m.Delta, m.Reason, m.Shipment) for m in session.query(StockMovement).order_by(StockMovement.id)] == [
+        (1, 10, "receipt", shipment_id),
+        (2, 4, "receipt", shipment_id),
+        (1, -10, "receipt_cancel", shipment_id),
+        (2, -4, "receipt_cancel", shipment_id),
+    ]
+
+    # Уже проданное списать нельзя – позиция остается
+    item_controller.create_shipmentitem({"Shipment": shipment_id, "Medicine": 1, "Quantity": 5})
+    session.query(Medicine).filter(Medicine.id == 1).update({Medicine.Count: 0})
+    session.commit()
+    with pytest.raises(ValueError):
+        item_controller.delete_shipmentitem(shipment_id, 1)
+    assert item_controller.get_shipmentitem_by_id(shipment_id, 1) is not None
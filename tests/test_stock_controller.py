@@ -0,0 +1,103 @@
+from datetime import date
+
+import pytest
+
+from controllers.MedicineController import MedicineController
+from controllers.OrderController import OrderController
+from controllers.ShipmentController import ShipmentController
+from controllers.StockController import StockController
+from models.medicine import Medicine
+from models.stock_movement import StockMovement
+from models.supplier import Supplier
+
+
+@pytest.fixture
+def medicines(session):
+    session.add(Supplier(id=1, CompName="S", Address="a", Number="1", INN="1"))
+    session.commit()
+    ctrl = MedicineController(session)
+    for i in range(1, 4):
+        ctrl.create_medicine({'MName': f"M{i}", 'Price': 10 * i, 'Count': 10, 'Description': "d",
+                              'Category': "c", 'BT': date(2030, 1, 1), 'Supplier': 1})
+
+
+def ledger(session):
+    return [(row.Medicine, row.Delta, row.Reason, row.Order, row.Shipment)
+            for row in session.query(StockMovement).order_by(StockMovement.id)]
+
+
+def test_movements_follow_sales_and_receipts(session, medicines):
+    orders = OrderController(session)
+    shipments = ShipmentController(session)
+    order_ids = orders.checkout([{'Medicine': 1, 'Amount': 3}, {'Medicine': 2, 'Amount': 1}], employee_id=1)
+    shipment = shipments.create_shipment(
+        {"Supplier": 1, "Employee": 1, "DateReg": date.today(), "Status": True}, [{"id": 3, "Count": 5}])
+    orders.update_order(order_ids[0], {'Amount': 5})
+    orders.delete_order(order_ids[1])
+    shipments.delete_shipment(shipment.id)
+
+    assert ledger(session)[3:] == [
+        (1, -3, StockController.SALE, order_ids[0], None),
+        (2, -1, StockController.SALE, order_ids[1], None),
+        (3, 5, StockController.RECEIPT, None, shipment.id),
+        (1, -2, StockController.SALE, order_ids[0], None),
+        (2, 1, StockController.SALE_CANCEL, order_ids[1], None),
+        (3, -5, StockController.RECEIPT_CANCEL, None, shipment.id),
+    ]
+    assert [m.Count for m in session.query(Medicine).order_by(Medicine.id)] == [5, 10, 10]
+    assert StockController(session).reconcile(batch_size=2) == {}
+
+
+def test_draft_shipment_posts_stock_on_status_change(session, medicines):
+    shipments = ShipmentController(session)
+    shipment = shipments.create_shipment(
+        {"Supplier": 1, "Employee": 1, "DateReg": date.today(), "Status": False}, [{"id": 1, "Count": 4}])
+    assert session.get(Medicine, 1).Count == 10
+    shipments.update_shipment(shipment.id, {"Status": True})
+    assert session.get(Medicine, 1).Count == 14
+    assert ledger(session)[-1] == (1, 4, StockController.RECEIPT, None, shipment.id)
+
+
+def test_cannot_return_more_than_in_stock(session, medicines):
+    shipments = ShipmentController(session)
+    shipment = shipments.create_shipment(
+        {"Supplier": 1, "Employee": 1, "DateReg": date.today(), "Status": True}, [{"id": 1, "Count": 4}])
+    OrderController(session).checkout([{'Medicine': 1, 'Amount': 12}], employee_id=1)
+    with pytest.raises(ValueError):
+        shipments.delete_shipment(shipment.id)
+    assert shipments.get_shipment_by_id(shipment.id) is not None
+    assert session.get(Medicine, 1).Count == 2
+
+
+def test_reconcile_reports_mismatches(session, medicines):
+    MedicineController(session).update_medicine(2, {'Price': 20, 'Count': 7})
+    session.query(Medicine).filter(Medicine.id.in_([1, 3])).update({Medicine.Count: Medicine.Count + 1})
+    session.commit()
+    stock = StockController(session)
+    assert stock.reconcile(batch_size=1) == {1: (11, 10), 3: (11, 10)}
+    assert [row.Delta for row in stock.get_movements(2)] == [-3, 10]
+
+
+def test_adjustment_keeps_concurrent_sale(session, medicines):
+    ctrl = MedicineController(session)
+    medicine = session.get(Medicine, 1)
+    assert medicine.Count == 10
+    # Продажа с другой кассы после того, как остаток был прочитан
+    session.query(Medicine).filter(Medicine.id == 1).update(
+        {Medicine.Count: Medicine.Count - 4}, synchronize_session=False)
+    StockController(session).record({1: -4}, StockController.SALE)
+
+    # Правка 10 -> 12 применяется как +2 к текущему остатку
+    assert ctrl.update_medicine(1, {'Price': 10, 'Count': 12}).Count == 8
+    assert [row.Delta for row in StockController(session).get_movements(1)] == [2, -4, 10]
+    assert StockController(session).reconcile() == {}
+
+
+def test_partial_update_without_count(session, medicines):
+    ctrl = MedicineController(session)
+    assert ctrl.update_medicine(1, {'Price': 15}).Count == 10
+    assert ctrl.update_medicine(1, {'Count': 12}).Price == 15
+    with pytest.raises(ValueError):
+        ctrl.update_medicine(1, {'Price': -1})
+    # Правка без Count не пишет движение в журнал
+    assert [row.Delta for row in StockController(session).get_movements(1)] == [2, 10]
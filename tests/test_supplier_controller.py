@@ -134,3 +134,66 @@ def test_delete_supplier_not_found(session):
     controller = SupplierController(session)
     with pytest.raises(Exception):
         controller.delete_supplier(10101)
+
+def test_search_suppliers(session):
+    controller = SupplierController(session)
+    pharma = controller.create_supplier({'CompName': "PharmaCorp", 'Address': "Lenina 1",
+                                         'Number': "111", 'INN': "7701"})
+    controller.create_supplier({'CompName': "MedSuppliers", 'Address': "Mira 2",
+                                'Number': "222", 'INN': "7702"})
+    # Поиск без учета регистра по любому из полей, все слова должны найтись
+    assert controller.search("pharma") == [pharma.id]
+    assert len(controller.search("770")) == 2
+    assert controller.search("770 lenina") == [pharma.id]
+    assert controller.search("770", limit=1, offset=1) != controller.search("770", limit=1)
+    assert controller.search("") == []
+
+def test_get_all_cached_until_changed(session, query_counter):
+    controller = SupplierController(session)
+    controller.create_supplier({'CompName': "Alpha", 'Address': "a", 'Number': "1", 'INN': "1"})
+    assert [s.CompName for s in controller.get_all()] == ["Alpha"]
+    query_counter.clear()
+    controller.get_all()
+    assert query_counter == []
+    controller.create_supplier({'CompName': "Beta", 'Address': "b", 'Number': "2", 'INN': "2"})
+    assert [s.CompName for s in controller.get_all()] == ["Alpha", "Beta"]
+    assert controller.cache_stats()['misses'] == 2
+
+
+def test_delete_many_suppliers(session, query_counter):
+    from datetime import date
+    from models.medicine import Medicine
+    from models.shipment import Shipment
+    from models.shipment_item import ShipmentItem
+    session.add_all(Supplier(id=i, CompName=f"S{i}", Address="a", Number="1", INN="1") for i in (1, 2, 3))
+    session.add_all(Medicine(id=i, MName=f"M{i}", Price=10, Count=5, Supplier=i) for i in (1, 2, 3))
+    session.add_all(Shipment(id=i, Supplier=i, Employee=1, DateReg=date(2024, 1, 1), Price=10, Status=True)
+                    for i in (1, 2, 3))
+    session.add_all(ShipmentItem(Shipment=i, Medicine=i, Quantity=1) for i in (1, 2, 3))
+    session.commit()
+
+    query_counter.clear()
+    assert SupplierController(session).delete_many([1, 2]) == 2
+    # Медикаменты, позиции поставок, поставки, поставщики
+    assert len(query_counter) == 4
+    assert [s.id for s in session.query(Supplier)] == [3]
+    assert {m.id: m.Supplier for m in session.query(Medicine)} == {1: None, 2: None, 3: 3}
+    assert [s.id for s in session.query(Shipment)] == [3]
+    assert [i.Shipment for i in session.query(ShipmentItem)] == [3]
+    assert [m.Count for m in session.query(Medicine)] == [5, 5, 5]  # остатки не меняются
+
+
+def test_delete_many_emits_integer_ids(session):
+    from core.events import changes
+    session.add_all(Supplier(id=i, CompName=f"S{i}", Address="a", Number="1", INN="1") for i in (1, 2))
+    session.commit()
+    events = []
+    handler = lambda kind, ids: events.append((kind, ids))
+    changes.subscribe(Supplier.__tablename__, handler)
+    try:
+        # Так id приходят из текста ячеек таблицы
+        assert SupplierController(session).delete_many(['1', '1']) == 1
+    finally:
+        changes.unsubscribe(Supplier.__tablename__, handler)
+    assert events == [(changes.DELETED, [1])]
+    assert [s.id for s in session.query(Supplier)] == [2]